@@ -20,9 +20,78 @@ class IpaConfig(NautobotAppConfig):
     required_settings = []
     min_version = "3.0.2"
     max_version = "3.9999.9999"
-    default_settings = {}
+    default_settings = {
+        # Network driver name -> API platform driver class, see `ipa.collectors.registry`.
+        "drivers": {
+            "citrix_netscaler": "ipa.collectors.netscaler.NitroDriver",
+            "cisco_meraki": "ipa.collectors.meraki.MerakiOrganizationCollector",
+            "cisco_vmanage": "ipa.collectors.vmanage.VManageClient",
+            "cisco_apic": "ipa.collectors.apic.ApicFabricCollector",
+            "wti": "ipa.collectors.wti.WtiDriver",
+        },
+        # Per-process HTTP connection pool shared by every driver, one pool per controller host.
+        "connection_pool": {
+            "pool_size": 20,
+            "keepalive": 60,
+        },
+        # Codec for configuration snapshot blobs, "gzip" or "zstd" (needs the `zstandard` package).
+        "snapshot_compression": "gzip",
+        # Records written per INSERT ... ON CONFLICT statement by the bulk upsert API.
+        "bulk_upsert_chunk_size": 1000,
+        # Per-process cache of API list and detail responses, invalidated when their model changes.
+        # A `ttl` of 0 disables it.
+        "response_cache": {
+            "ttl": 60,
+            "max_entries": 512,
+        },
+        # Sharded API backup job: controllers are packed into Celery tasks of up to `shard_size`
+        # devices, sent to `queue`, which workers other than the job's must serve. The job waits
+        # `timeout` seconds for them, so it refuses to run when `queue` is its own queue (when None).
+        "collection_shards": {
+            "shard_size": 500,
+            "queue": "ipa-backups",
+            "timeout": 3600,
+        },
+        # Devices recorded as done per INSERT by backup jobs, which `resume` skips when rerun.
+        "checkpoint_batch_size": 100,
+        # Circuit per controller (per organization for Meraki), shared by every worker: after
+        # `failure_threshold` consecutive failed calls, calls fail at once for `reset_timeout` seconds,
+        # then a single call probes the controller. A `failure_threshold` of 0 disables it.
+        "circuit_breaker": {
+            "failure_threshold": 5,
+            "reset_timeout": 60,
+            "failure_window": 300,
+        },
+        # Seconds per call assumed by backup plans for platforms without calls in `ApiCallSummary`.
+        "planner_default_latency": 0.5,
+        # Rows fetched per round trip of the server-side cursor of the streaming export API.
+        "export_chunk_size": 2000,
+        # Token buckets shared by every worker, in requests per second per controller (per
+        # organization for Meraki). `default` applies to platforms without their own entry.
+        "rate_limits": {
+            "default": {"rate": 20, "burst": 40},
+            "cisco_meraki": {"rate": 10, "burst": 10},
+            "cisco_vmanage": {"rate": 50, "burst": 100},
+            "citrix_netscaler": {"rate": 50, "burst": 100},
+            "cisco_apic": {"rate": 40, "burst": 80},
+        },
+    }
     caching_config = {}
     docs_view_name = "plugins:ipa:docs"
 
+    def ready(self):
+        """Invalidate the cached API responses of ipa models when they change."""
+        super().ready()
+        from django.db.models.signals import (  # pylint: disable=import-outside-toplevel
+            m2m_changed,
+            post_delete,
+            post_save,
+        )
+
+        from ipa.cache import invalidate  # pylint: disable=import-outside-toplevel
+
+        for signal in (post_save, post_delete, m2m_changed):
+            signal.connect(invalidate, dispatch_uid=f"ipa-cache-{id(signal)}")
+
 
 config = IpaConfig  # pylint:disable=invalid-name
@@ -0,0 +1,55 @@
+"""Streaming NDJSON and CSV export of querysets."""
+
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from ipa.utils import get_app_setting
+
+EXPORT_FORMAT_QUERY_PARAM = "export_format"
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def export_fields(model):
+    """Return the names of the concrete, public fields of `model`; foreign keys export the related primary key."""
+    return [field.name for field in model._meta.concrete_fields if not field.name.startswith("_")]
+
+
+def ndjson_lines(rows):
+    """Yield every row as a line of JSON."""
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(row) + "\n"
+
+
+class _Line:  # pylint: disable=too-few-public-methods
+    """Pseudo-buffer handing back what `csv.writer` writes to it."""
+
+    def write(self, value):
+        """Return `value` instead of storing it."""
+        return value
+
+
+def csv_lines(rows, fields):
+    """Yield a header line with `fields`, then every row as a CSV line; JSON values are serialized."""
+    writer = csv.writer(_Line())
+    yield writer.writerow(fields)
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield writer.writerow(
+            [encoder.encode(value) if isinstance(value, (dict, list)) else value for value in row.values()]
+        )
+
+
+def stream_export(queryset, fields, export_format, filename):
+    """Return a response streaming the `fields` of every object of `queryset` in `export_format`.
+
+    Rows are read as dicts through a server-side cursor, `export_chunk_size` at a time, and written
+    out as they are read, so memory use does not grow with the size of the export.
+    """
+    rows = queryset.values(*fields).iterator(chunk_size=get_app_setting("export_chunk_size"))
+    lines = csv_lines(rows, fields) if export_format == "csv" else ndjson_lines(rows)
+    response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[export_format])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{export_format}"'
+    return response
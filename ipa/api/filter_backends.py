@@ -0,0 +1,21 @@
+"""API filter backends for ipa."""
+
+from nautobot.core.api.filter_backends import NautobotFilterBackend
+
+from ipa.api.export import EXPORT_FORMAT_QUERY_PARAM
+from ipa.api.pagination import CURSOR_QUERY_PARAM
+from ipa.api.serializers import EXCLUDE_QUERY_PARAM, FIELDS_QUERY_PARAM
+
+# Query parameters of ipa viewsets that are not filterset filters.
+NON_FILTER_QUERY_PARAMS = (CURSOR_QUERY_PARAM, FIELDS_QUERY_PARAM, EXCLUDE_QUERY_PARAM, EXPORT_FORMAT_QUERY_PARAM)
+
+
+class IpaFilterBackend(NautobotFilterBackend):
+    """Filter backend leaving the pagination, sparse fieldset and export parameters out of strict filtering."""
+
+    def get_filterset_kwargs(self, request, queryset, view):
+        """Remove the `NON_FILTER_QUERY_PARAMS` from the filterset data."""
+        kwargs = super().get_filterset_kwargs(request, queryset, view)
+        for param in NON_FILTER_QUERY_PARAMS:
+            kwargs["data"].pop(param, None)
+        return kwargs
@@ -0,0 +1,99 @@
+"""API pagination for ipa."""
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from nautobot.core.api.pagination import OptionalLimitOffsetPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+CURSOR_QUERY_PARAM = "cursor"
+
+
+def encode_cursor(values):
+    """Return the opaque cursor of the keyset `values` of the last row of a page."""
+    return base64.urlsafe_b64encode(json.dumps([str(value) for value in values]).encode()).decode()
+
+
+def decode_cursor(cursor, size):
+    """Return the `size` keyset values encoded in `cursor`, raising `ValueError` when it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError as error:
+        raise ValueError(f"Invalid cursor {cursor!r}") from error
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(value, str) for value in values):
+        raise ValueError(f"Invalid cursor {cursor!r}")
+    return values
+
+
+def keyset_after(fields, values):
+    """Return the filter selecting the rows sorting after `values` in the order of `fields`."""
+    condition = Q()
+    for index, field in enumerate(fields):
+        condition |= Q(**dict(zip(fields[:index], values[:index])), **{f"{field}__gt": values[index]})
+    return condition
+
+
+def keyset_value(row, field):
+    """Return `field` of `row`, a model instance or a dict from `QuerySet.values()`."""
+    return row[field] if isinstance(row, dict) else getattr(row, field)
+
+
+class KeysetPagination(OptionalLimitOffsetPagination):
+    """Offset pagination, or keyset pagination when the request has a `cursor` parameter.
+
+    Keyset pages are ordered by `keyset`, which must be unique, and each one starts after the last
+    row of the previous page: `?cursor=` requests the first page and the `next` link carries the
+    cursor of the following one. Pages are read through the index on `keyset` instead of skipping
+    `offset` rows, and the total `count` is not computed, so walking a large table takes the same
+    time per page from the first to the last one. Keyset pages ignore `sort` and only link forward.
+    """
+
+    keyset = ("name", "id")
+
+    def __init__(self):
+        """Initialize the paginator in offset mode."""
+        super().__init__()
+        self.request = None
+        self.limit = None
+        self.cursor = None
+        self.next_cursor = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return the requested page of `queryset`."""
+        if CURSOR_QUERY_PARAM not in request.query_params or "text/csv" in request.accepted_media_type:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.cursor = request.query_params[CURSOR_QUERY_PARAM]
+        queryset = queryset.order_by(*self.keyset)
+        if self.cursor:
+            try:
+                queryset = queryset.filter(keyset_after(self.keyset, decode_cursor(self.cursor, len(self.keyset))))
+            except ValueError as error:
+                raise NotFound(str(error)) from error
+        if not self.limit:
+            return list(queryset)
+        page = list(queryset[: self.limit + 1])
+        if len(page) > self.limit:
+            page = page[: self.limit]
+            self.next_cursor = encode_cursor([keyset_value(page[-1], field) for field in self.keyset])
+        return page
+
+    def get_next_link(self):
+        """Return the link to the next page, if any."""
+        if self.cursor is None:
+            return super().get_next_link()
+        if self.next_cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, CURSOR_QUERY_PARAM, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        """Return the page, without `count` and `previous` for keyset pages."""
+        if self.cursor is None:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([("next", self.get_next_link()), ("results", data)]))
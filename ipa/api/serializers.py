@@ -1,11 +1,56 @@
 """API serializers for ipa."""
 
-from nautobot.apps.api import NautobotModelSerializer, TaggedModelSerializerMixin
+from collections import Counter
+
+from nautobot.apps.api import BaseModelSerializer, NautobotModelSerializer, TaggedModelSerializerMixin
+from rest_framework import serializers
 
 from ipa import models
 
+FIELDS_QUERY_PARAM = "fields"
+EXCLUDE_QUERY_PARAM = "exclude"
+
+
+def requested_fields(request):
+    """Return the field names listed by the `fields` query parameter, None without it, and those of `exclude`.
+
+    Both parameters take comma-separated names and may be repeated.
+    """
+
+    def names(param):
+        return [
+            name.strip() for value in request.query_params.getlist(param) for name in value.split(",") if name.strip()
+        ]
+
+    fields = names(FIELDS_QUERY_PARAM) if FIELDS_QUERY_PARAM in request.query_params else None
+    return fields, names(EXCLUDE_QUERY_PARAM)
+
 
-class IpaExampleModelSerializer(NautobotModelSerializer, TaggedModelSerializerMixin):  # pylint: disable=too-many-ancestors
+class SparseFieldsMixin:  # pylint: disable=too-few-public-methods
+    """Serializer mixin limiting GET responses to the fields named by `?fields=`, minus those of `?exclude=`.
+
+    Pruned fields are neither rendered nor prefetched by the viewset. Nested serializers share the
+    request of their parent but keep all their fields.
+    """
+
+    @property
+    def fields(self):
+        """Return the serializer fields, pruned for the request."""
+        fields = super().fields
+        request = self.context.get("request") if hasattr(self, "_context") else None
+        top_level = self.root is self or (
+            self.parent is self.root and isinstance(self.root, serializers.ListSerializer)
+        )
+        if request is None or request.method != "GET" or not top_level:
+            return fields
+        only, exclude = requested_fields(request)
+        for name in list(fields):
+            if (only is not None and name not in only) or name in exclude:
+                del fields[name]
+        return fields
+
+
+class IpaExampleModelSerializer(SparseFieldsMixin, NautobotModelSerializer, TaggedModelSerializerMixin):  # pylint: disable=too-many-ancestors
     """IpaExampleModel Serializer."""
 
     class Meta:
@@ -16,3 +61,38 @@ class IpaExampleModelSerializer(NautobotModelSerializer, TaggedModelSerializerMi
 
         # Option for disabling write for certain fields:
         # read_only_fields = []
+
+
+class IpaExampleModelUpsertSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """One IpaExampleModel record of a bulk upsert, identified by its name."""
+
+    name = serializers.CharField(max_length=models.IpaExampleModel._meta.get_field("name").max_length)
+    description = serializers.CharField(
+        max_length=models.IpaExampleModel._meta.get_field("description").max_length, allow_blank=True, default=""
+    )
+
+
+class IpaExampleModelUpsertListSerializer(serializers.ListSerializer):  # pylint: disable=abstract-method
+    """The records of a bulk upsert, each name at most once."""
+
+    child = IpaExampleModelUpsertSerializer()
+
+    def validate(self, attrs):
+        """Reject names given more than once, as one statement cannot write the same record twice."""
+        names = Counter(row["name"] for row in attrs)
+        duplicates = [name for name, count in names.items() if count > 1]
+        if duplicates:
+            raise serializers.ValidationError(f"Duplicate names: {', '.join(sorted(duplicates))}")
+        return attrs
+
+
+class ApiCallSummarySerializer(BaseModelSerializer):
+    """ApiCallSummary Serializer."""
+
+    mean_duration = serializers.FloatField(read_only=True)
+
+    class Meta:
+        """Meta attributes."""
+
+        model = models.ApiCallSummary
+        fields = "__all__"
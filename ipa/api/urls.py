@@ -7,6 +7,7 @@ from ipa.api import views
 router = OrderedDefaultRouter()
 # add the name of your api endpoint, usually hyphenated model name in plural, e.g. "my-model-classes"
 router.register("ipaexamplemodel", views.IpaExampleModelViewSet)
+router.register("api-call-summaries", views.ApiCallSummaryViewSet)
 
 app_name = "ipa-api"
 urlpatterns = router.urls
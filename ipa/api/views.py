@@ -1,17 +1,193 @@
 """API views for ipa."""
 
-from nautobot.apps.api import NautobotModelViewSet
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import PermissionDenied as DjangoPermissionDenied
+from django.db import connection
+from django.db.models import Max, Sum
+from nautobot.apps.api import NautobotModelViewSet, ReadOnlyModelViewSet
+from nautobot.core.api.filter_backends import NautobotOrderingFilter
+from rest_framework import serializers as drf_serializers
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
 
-from ipa import filters, models
-from ipa.api import serializers
+from ipa import bulk, cache, filters, models
+from ipa.api import export, serializers
+from ipa.api.filter_backends import IpaFilterBackend
+from ipa.api.pagination import KeysetPagination
 
+# Serializer fields rendering a model value the same way the JSON renderer encodes it.
+LEAN_FIELD_TYPES = (
+    drf_serializers.BooleanField,
+    drf_serializers.CharField,
+    drf_serializers.FloatField,
+    drf_serializers.IntegerField,
+    drf_serializers.UUIDField,
+)
 
-class IpaExampleModelViewSet(NautobotModelViewSet):  # pylint: disable=too-many-ancestors
+
+class SparseFieldsViewSetMixin:
+    """Viewset mixin for serializers using `SparseFieldsMixin`.
+
+    Names given to `?fields=` or `?exclude=` that the serializer does not have are rejected. Lists
+    limited by `?fields=` to flat model fields are built from `QuerySet.values()` without
+    instantiating models or running the serializer.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        """Reject unknown field names."""
+        super().initial(request, *args, **kwargs)
+        if request.method != "GET":
+            return
+        fields, exclude = serializers.requested_fields(request)
+        unknown = {*(fields or ()), *exclude} - set(self.get_serializer_class()().fields)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}"})
+
+    def get_lean_fields(self):
+        """Return the names of the fields of a lean list, or None when the list needs the serializer."""
+        if serializers.requested_fields(self.request)[0] is None or "text/csv" in self.request.accepted_media_type:
+            return None
+        fields = self.get_serializer().fields
+        for name, field in fields.items():
+            if not isinstance(field, LEAN_FIELD_TYPES) or field.source != name:
+                return None
+            try:
+                model_field = self.queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete or model_field.is_relation:
+                return None
+        return list(fields)
+
+    def list(self, request, *args, **kwargs):
+        """List the objects, as plain rows when only flat fields are requested."""
+        names = self.get_lean_fields()
+        if not names:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        # Keyset pagination reads the keys of the last row of the page.
+        keys = [key for key in getattr(self.paginator, "keyset", ()) if key not in names]
+        page = self.paginate_queryset(queryset.values(*names, *keys))
+        rows = [{name: row[name] for name in names} for row in (queryset.values(*names) if page is None else page)]
+        if page is None:
+            return Response(rows)
+        return self.get_paginated_response(rows)
+
+
+class CachedReadViewSetMixin:
+    """Viewset mixin serving list and detail responses from `ipa.cache.response_cache`.
+
+    Responses are cached per URL, query parameters and user permissions until an object of the
+    model changes. Responses nesting related objects with `?depth=`, or adding relationships or
+    computed fields with `?include=`, are not cached, as the changes of those objects do not
+    invalidate them, nor are responses rendered inside a transaction, which may include changes
+    that are rolled back later.
+    """
+
+    def cached(self, render, request, *args, **kwargs):
+        """Return the cached response of `request`, or render and cache it."""
+        depth = request.query_params.get("depth", "0")
+        nested = depth != "0" or "include" in request.query_params
+        if not cache.response_cache.ttl or nested or connection.in_atomic_block:
+            return render(request, *args, **kwargs)
+        key = cache.response_key(request, self.queryset.model)
+        data = cache.response_cache.get(key)
+        if data is not None:
+            return Response(data, headers={"X-Cache": "HIT"})
+        response = render(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.response_cache.set(key, response.data)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """List the objects, from the cache when possible."""
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return one object, from the cache when possible."""
+        return self.cached(super().retrieve, request, *args, **kwargs)
+
+
+class ExportViewSetMixin:  # pylint: disable=too-few-public-methods
+    """Viewset mixin adding an `export` action streaming every filtered object in one response."""
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """Stream the filtered objects as NDJSON, or as CSV with `?export_format=csv`.
+
+        Flat model fields are exported, limited by `?fields=` and `?exclude=`.
+        """
+        export_format = request.query_params.get(export.EXPORT_FORMAT_QUERY_PARAM, "ndjson")
+        if export_format not in export.CONTENT_TYPES:
+            raise ValidationError({export.EXPORT_FORMAT_QUERY_PARAM: f"Unknown export format {export_format!r}"})
+        model = self.queryset.model
+        fields, exclude = serializers.requested_fields(request)
+        available = export.export_fields(model)
+        unknown = {*(fields or ()), *exclude} - set(available)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}"})
+        fields = [name for name in fields or available if name not in exclude]
+        queryset = self.filter_queryset(self.queryset.all()).prefetch_related(None)
+        return export.stream_export(queryset, fields, export_format, model._meta.verbose_name_plural)
+
+
+class IpaExampleModelViewSet(
+    ExportViewSetMixin, CachedReadViewSetMixin, SparseFieldsViewSetMixin, NautobotModelViewSet
+):  # pylint: disable=too-many-ancestors
     """IpaExampleModel viewset."""
 
     queryset = models.IpaExampleModel.objects.all()
     serializer_class = serializers.IpaExampleModelSerializer
     filterset_class = filters.IpaExampleModelFilterSet
+    filter_backends = [IpaFilterBackend, NautobotOrderingFilter]
+    pagination_class = KeysetPagination
 
     # Option for modifying the default HTTP methods:
     # http_method_names = ["get", "post", "put", "patch", "delete", "head", "options", "trace"]
+
+    @action(detail=False, methods=["post"], url_path="bulk-upsert")
+    def bulk_upsert(self, request):
+        """Create or update the posted records by name and return how many were created, updated and unchanged.
+
+        Both the add and change permissions are required, and every record written must match
+        their constraints; otherwise nothing is written.
+        """
+        if not request.user.has_perms(["ipa.add_ipaexamplemodel", "ipa.change_ipaexamplemodel"]):
+            raise PermissionDenied()
+        serializer = serializers.IpaExampleModelUpsertListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            return Response(bulk.upsert_examples(serializer.validated_data, user=request.user))
+        except DjangoPermissionDenied as error:
+            raise PermissionDenied(str(error)) from error
+
+
+class ApiCallSummaryViewSet(ExportViewSetMixin, CachedReadViewSetMixin, ReadOnlyModelViewSet):  # pylint: disable=too-many-ancestors
+    """API call statistics per job, controller and endpoint, slowest first."""
+
+    queryset = models.ApiCallSummary.objects.select_related("job_result")
+    serializer_class = serializers.ApiCallSummarySerializer
+    filterset_class = filters.ApiCallSummaryFilterSet
+    filter_backends = [IpaFilterBackend, NautobotOrderingFilter]
+
+    @action(detail=False, methods=["get"])
+    def controllers(self, request):
+        """Return the filtered statistics totalled per controller, slowest first."""
+        totals = (
+            self.filter_queryset(self.get_queryset())
+            .order_by()
+            .values("platform", "controller")
+            .annotate(
+                calls=Sum("calls"),
+                errors=Sum("errors"),
+                retries=Sum("retries"),
+                duration=Sum("duration"),
+                max_duration=Max("max_duration"),
+                throttled=Sum("throttled"),
+                bytes_received=Sum("bytes_received"),
+            )
+            .order_by("-duration")
+        )
+        return Response(list(totals))
@@ -0,0 +1,49 @@
+"""Storage of the API call statistics recorded by the collectors."""
+
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.utils import timezone
+
+from ipa.collectors.instrumentation import recorder as default_recorder
+from ipa.models import ApiCallSummary
+
+
+def save_call_stats(stats, job_result=None):
+    """Add `stats`, as returned by `ApiCallRecorder.drain()`, to the summaries of `job_result`."""
+    now = timezone.now()
+    for (platform, controller, method, endpoint), call in stats.items():
+        with transaction.atomic():
+            summary, _ = ApiCallSummary.objects.select_for_update().get_or_create(
+                job_result=job_result,
+                platform=platform,
+                controller=controller,
+                method=method,
+                endpoint=endpoint,
+                defaults={"last_called": now},
+            )
+            summary.calls += call.calls
+            summary.errors += call.errors
+            summary.retries += call.retries
+            summary.duration += call.duration
+            summary.max_duration = max(summary.max_duration, call.max_duration)
+            summary.throttled += call.throttled
+            summary.bytes_received += call.bytes_received
+            summary.status_codes = dict(Counter(summary.status_codes) + call.status_codes)
+            summary.last_called = now
+            summary.save()
+
+
+@contextmanager
+def record_api_calls(job_result=None, recorder=None):
+    """Store the API calls made while the block runs as the summaries of `job_result`.
+
+    Calls recorded before the block, outside any job, are stored without a job first.
+    """
+    recorder = recorder or default_recorder
+    save_call_stats(recorder.drain())
+    try:
+        yield recorder
+    finally:
+        save_call_stats(recorder.drain(), job_result)
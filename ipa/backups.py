@@ -0,0 +1,147 @@
+"""Incremental backups of API-managed devices driven by per-device fingerprints."""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+
+from django.utils import timezone
+
+from ipa.choices import FingerprintSourceChoices
+from ipa.metrics import COLLECTION_FAILURES, DEVICES_COLLECTED
+from ipa.models import DeviceFingerprint
+from ipa.utils import bulk_upsert
+
+
+def canonical_json(payload):
+    """Serialize `payload` to compact JSON bytes with sorted keys, so equal configurations serialize equally."""
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode()
+
+
+def content_hash(payload):
+    """Return a SHA-256 of `payload` that ignores key order and formatting."""
+    return hashlib.sha256(canonical_json(payload)).hexdigest()
+
+
+@dataclass
+class BackupSummary:
+    """Targets written, skipped before fetching, and skipped after fetching in one run."""
+
+    changed: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+
+    @property
+    def fetched(self):
+        """Number of targets whose configuration was fetched."""
+        return len(self.changed) + len(self.unchanged)
+
+
+class IncrementalBackup:
+    """Back up only the devices behind a controller whose fingerprint has changed.
+
+    Drivers that can report a cheap fingerprint (an ETag or a controller revision counter)
+    through `fingerprints()` let unchanged devices skip both the fetch and the write. For
+    the others, the fetched payload is hashed and unchanged devices skip the write only.
+    """
+
+    def __init__(self, driver, writer, force=False, progress=None):
+        """Initialize the backup.
+
+        Args:
+            driver (BaseDriver): Driver of the controller to back up.
+            writer (Callable[[str, dict], None]): Persists the payload of one changed target.
+            force (bool): Fetch and write every target, ignoring stored fingerprints.
+            progress (Callable[[list[str]], None]): Called with the targets done, as they are
+                skipped, found unchanged or written.
+        """
+        self.driver = driver
+        self.writer = writer
+        self.force = force
+        self.progress = progress or (lambda targets: None)
+
+    def stored(self):
+        """Return the stored `{target: DeviceFingerprint}` for the driver's controller."""
+        queryset = DeviceFingerprint.objects.filter(platform=self.driver.platform, controller=self.driver.host)
+        return {fingerprint.target: fingerprint for fingerprint in queryset}
+
+    @staticmethod
+    def _matches(previous, fingerprint):
+        """Whether a stored `DeviceFingerprint` equals a `(source, value)` fingerprint; an unknown value never does."""
+        return (
+            previous is not None
+            and fingerprint[1] is not None
+            and (previous.source, previous.fingerprint) == tuple(fingerprint)
+        )
+
+    def _count(self, result, amount=1):
+        """Add `amount` devices processed with `result` to the `ipa_devices_collected` metric."""
+        DEVICES_COLLECTED.labels(self.driver.platform or "", self.driver.host, result).inc(amount)
+
+    def run(self, targets=None):
+        """Back up `targets`, or every device behind the controller, returning a `BackupSummary`.
+
+        Devices are counted in the `ipa_devices_collected` metric as they are processed, and
+        errors aborting the backup in `ipa_collection_failures`.
+        """
+        try:
+            return self._run(targets)
+        except Exception:
+            COLLECTION_FAILURES.labels(self.driver.platform or "", self.driver.host).inc()
+            raise
+
+    def _run(self, targets):
+        """Back up `targets`; see `run()`."""
+        now = timezone.now()
+        summary = BackupSummary()
+        stored = self.stored()
+        reported = self.driver.fingerprints(targets)
+        if targets is not None:
+            wanted = set(targets)
+            reported = {target: value for target, value in reported.items() if target in wanted}
+
+        fetch = targets
+        if reported and not self.force:
+            summary.skipped = sorted(
+                target for target, value in reported.items() if self._matches(stored.get(target), value)
+            )
+            skipped = set(summary.skipped)
+            self._count("skipped", len(skipped))
+            self.progress(summary.skipped)
+            fetch = [target for target in (reported if targets is None else targets) if target not in skipped]
+
+        updates = []
+        if fetch is None or fetch:
+            for target, payload in self.driver.collect(fetch):
+                source, value = reported.get(target) or (None, None)
+                if value is None:
+                    source, value = FingerprintSourceChoices.CONTENT, content_hash(payload)
+                if not self.force and self._matches(stored.get(target), (source, value)):
+                    summary.unchanged.append(target)
+                    self._count("unchanged")
+                    self.progress([target])
+                    continue
+                self.writer(target, payload)
+                summary.changed.append(target)
+                self._count("changed")
+                self.progress([target])
+                updates.append(
+                    DeviceFingerprint(
+                        platform=self.driver.platform,
+                        controller=self.driver.host,
+                        target=target,
+                        source=source,
+                        fingerprint=value,
+                        last_checked=now,
+                        last_changed=now,
+                    )
+                )
+
+        bulk_upsert(
+            DeviceFingerprint,
+            updates,
+            unique_fields=["platform", "controller", "target"],
+            update_fields=["source", "fingerprint", "last_checked", "last_changed"],
+        )
+        checked = [stored[target].pk for target in summary.skipped + summary.unchanged]
+        DeviceFingerprint.objects.filter(pk__in=checked).update(last_checked=now)
+        return summary
@@ -0,0 +1 @@
+"""Benchmarks and mock controllers for ipa collectors."""
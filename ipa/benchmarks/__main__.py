@@ -0,0 +1,7 @@
+"""Run the collector benchmark suite with `python -m ipa.benchmarks`."""
+
+import sys
+
+from ipa.benchmarks.suite import main
+
+sys.exit(main())
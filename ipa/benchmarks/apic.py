@@ -0,0 +1,59 @@
+"""Compare per-node APIC queries with fabric-wide class queries against a mock APIC.
+
+Run with `python -m ipa.benchmarks.apic --nodes 400 --latency 0.02`.
+"""
+
+import argparse
+import time
+
+from ipa.benchmarks.mock_apic import MockApic
+from ipa.collectors.apic import ApicFabricCollector, node_from_dn
+
+
+def _collector(mock, page_size):
+    """Return a collector pointed at the mock APIC."""
+    return ApicFabricCollector(mock.host, "admin", mock.password, scheme="http", page_size=page_size)
+
+
+def per_node(mock, page_size=50):
+    """Collect every node with one MO query per node, as the per-device dispatcher does."""
+    collector = _collector(mock, page_size)
+    nodes = [node_from_dn(item["topSystem"]["attributes"]["dn"]) for item in mock.fabric]
+    return {node: collector.get_node_backup(pod, node) for pod, node in nodes}
+
+
+def class_query(mock, page_size=50):
+    """Collect every node with paginated fabric-wide subtree class queries."""
+    return dict(_collector(mock, page_size).iter_node_backups())
+
+
+def run(nodes=400, interfaces=48, latency=0.02, page_size=50):
+    """Benchmark both strategies and return `{strategy: {"calls", "seconds", "nodes"}}`."""
+    results = {}
+    for name, strategy in (("per_node", per_node), ("class_query", class_query)):
+        with MockApic(nodes=nodes, interfaces=interfaces, latency=latency) as mock:
+            start = time.perf_counter()
+            backups = strategy(mock, page_size)
+            results[name] = {
+                "calls": sum(mock.calls.values()),
+                "seconds": round(time.perf_counter() - start, 3),
+                "nodes": len(backups),
+            }
+    return results
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=400)
+    parser.add_argument("--interfaces", type=int, default=48)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to every mock response.")
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+    results = run(args.nodes, args.interfaces, args.latency, args.page_size)
+    for name, result in results.items():
+        print(f"{name:<12} calls={result['calls']:<6} seconds={result['seconds']:<8} nodes={result['nodes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Local mock APIC serving a synthetic ACI fabric."""
+
+import json
+import re
+import secrets
+from urllib.parse import parse_qs, urlparse
+from xml.etree.ElementTree import Element, SubElement, tostring  # noqa: S405
+
+from ipa.benchmarks.mock_server import MockController, MockHandler
+
+NODE_MO_RE = re.compile(r"^/api/mo/topology/pod-(?P<pod>\d+)/node-(?P<node>\d+)/sys\.(json|xml)$")
+NODE_FILTER_RE = re.compile(r'eq\(topSystem\.id,"(\d+)"\)')
+
+
+def build_fabric(nodes, interfaces=48, pods=1):
+    """Return `topSystem` objects, with interface children, for a synthetic fabric ordered by DN."""
+    fabric = []
+    for index in range(nodes):
+        pod, node = index % pods + 1, 101 + index
+        dn = f"topology/pod-{pod}/node-{node}/sys"
+        children = [
+            {"l1PhysIf": {"attributes": {"dn": f"{dn}/phys-[eth1/{port}]", "id": f"eth1/{port}", "adminSt": "up"}}}
+            for port in range(1, interfaces + 1)
+        ]
+        attributes = {"dn": dn, "id": str(node), "name": f"leaf-{node}", "podId": str(pod), "role": "leaf"}
+        fabric.append({"topSystem": {"attributes": attributes, "children": children}})
+    return sorted(fabric, key=lambda item: item["topSystem"]["attributes"]["dn"])
+
+
+def render_xml(payload):
+    """Render an APIC JSON response as the equivalent XML document."""
+
+    def add(parent, item):
+        ((tag, mo),) = item.items()
+        element = SubElement(parent, tag, mo.get("attributes", {}))
+        for child in mo.get("children", ()):
+            add(element, child)
+
+    root = Element("imdata", {"totalCount": payload["totalCount"]})
+    for item in payload["imdata"]:
+        add(root, item)
+    return tostring(root, xml_declaration=True, encoding="UTF-8")
+
+
+class MockApicHandler(MockHandler):
+    """Answer `aaaLogin`, paginated `topSystem` and `aaaModLR` class queries and per-node MO queries."""
+
+    def _reply(self, status, payload):
+        """Send a JSON, or XML for `.xml` paths, response."""
+        xml = urlparse(self.path).path.endswith(".xml")
+        body = render_xml(payload) if xml else json.dumps(payload).encode()
+        headers = {}
+        if status == 200 and self.path.startswith("/api/aaaLogin"):
+            headers["Set-Cookie"] = f"APIC-cookie={payload['imdata'][0]['aaaLogin']['attributes']['token']}"
+        self.send(status, body, "application/xml" if xml else "application/json", headers)
+
+    def _authorized(self):
+        """Whether the request carries a token issued by this mock."""
+        return self.cookie("APIC-cookie") in self.server.mock.tokens
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle `aaaLogin`."""
+        mock = self.server.mock
+        body = json.loads(self.read_body())
+        mock.record("aaaLogin")
+        if body["aaaUser"]["attributes"]["pwd"] != mock.password:
+            self._reply(401, {"totalCount": "0", "imdata": [{"error": {"attributes": {"code": "401"}}}]})
+            return
+        token = secrets.token_hex(16)
+        mock.tokens.add(token)
+        self._reply(200, {"totalCount": "1", "imdata": [{"aaaLogin": {"attributes": {"token": token}}}]})
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle class and MO queries."""
+        mock = self.server.mock
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if not self._authorized():
+            mock.record("denied")
+            self._reply(403, {"totalCount": "0", "imdata": []})
+            return
+        if self.send_error_if_injected():
+            return
+        page, size = int(query.get("page", ["0"])[0]), int(query.get("page-size", ["100000"])[0])
+        if url.path in ("/api/class/topSystem.json", "/api/class/topSystem.xml"):
+            mock.record("class")
+            nodes = mock.fabric
+            if "query-target-filter" in query:
+                wanted = set(NODE_FILTER_RE.findall(query["query-target-filter"][0]))
+                nodes = [item for item in nodes if item["topSystem"]["attributes"]["id"] in wanted]
+            if "rsp-subtree" not in query:
+                nodes = [{"topSystem": {"attributes": item["topSystem"]["attributes"]}} for item in nodes]
+            imdata = nodes[page * size : (page + 1) * size]
+            self._reply(200, {"totalCount": str(len(nodes)), "imdata": imdata})
+            return
+        if url.path == "/api/class/aaaModLR.json":
+            mock.record("audit")
+            records = mock.audit[::-1]
+            self._reply(200, {"totalCount": str(len(records)), "imdata": records[page * size : (page + 1) * size]})
+            return
+        match = NODE_MO_RE.match(url.path)
+        if match:
+            mock.record("mo")
+            dn = f"topology/pod-{match['pod']}/node-{match['node']}/sys"
+            imdata = [item for item in mock.fabric if item["topSystem"]["attributes"]["dn"] == dn]
+            self._reply(200, {"totalCount": str(len(imdata)), "imdata": imdata})
+            return
+        self._reply(400, {"totalCount": "0", "imdata": []})
+
+
+class MockApic(MockController):
+    """Threaded mock APIC, usable as a context manager."""
+
+    handler_class = MockApicHandler
+
+    def __init__(self, nodes=100, interfaces=48, pods=1, password="admin", **kwargs):  # noqa: S107  # pylint: disable=too-many-arguments
+        """Build the synthetic fabric; `kwargs` set the injected latency and errors."""
+        super().__init__(**kwargs)
+        self.fabric = build_fabric(nodes, interfaces, pods)
+        self.password = password
+        self.tokens = set()
+        self.audit = []
+
+    def change(self, affected):
+        """Record a configuration change of the object at DN `affected` in the audit log."""
+        with self._lock:
+            record_id = str(4294967296 + len(self.audit))
+            self.audit.append(
+                {"aaaModLR": {"attributes": {"id": record_id, "affected": affected, "ind": "modification"}}}
+            )
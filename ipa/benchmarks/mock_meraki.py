@@ -0,0 +1,72 @@
+"""Local mock Meraki dashboard serving one synthetic organization."""
+
+import re
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from ipa.benchmarks.mock_server import MockController, MockHandler
+
+ORGANIZATION_ID = "1"
+LISTING_RE = re.compile(r"^/api/v1/organizations/(?P<organization>[^/]+)/(?P<listing>[\w/]+)$")
+# Devices per network; every network holds switches and one appliance.
+NETWORK_SIZE = 10
+
+
+def build_organization(devices):
+    """Return the listings of a synthetic organization with `devices` switches and appliances, keyed by path."""
+    inventory, ports, exclusions = [], [], []
+    for index in range(devices):
+        serial = f"Q2XX-{index // 10000:04d}-{index % 10000:04d}"
+        network = f"N_{index // NETWORK_SIZE}"
+        appliance = index % NETWORK_SIZE == 0
+        inventory.append({"serial": serial, "networkId": network, "model": "MX85" if appliance else "MS250-48"})
+        if appliance:
+            exclusions.append({"networkId": network, "custom": [{"protocol": "tcp", "destination": "10.0.0.0/8"}]})
+        else:
+            ports.append({"serial": serial, "ports": [{"portId": str(port), "enabled": True} for port in range(1, 49)]})
+    return {
+        "devices": inventory,
+        "switch/ports/bySwitch": ports,
+        "appliance/trafficShaping/vpnExclusions/byNetwork": exclusions,
+    }
+
+
+class MockMerakiHandler(MockHandler):
+    """Answer the organization-wide listings, paginated with `perPage` and `startingAfter`."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle a listing page."""
+        mock = self.server.mock
+        url = urlparse(self.path)
+        match = LISTING_RE.match(url.path)
+        if self.headers.get("Authorization") != f"Bearer {mock.api_key}":
+            mock.record("denied")
+            self.send_json(401, {"errors": ["Invalid API key"]})
+            return
+        if not match or match["organization"] != ORGANIZATION_ID or match["listing"] not in mock.listings:
+            self.send_json(404, {"errors": ["Not found"]})
+            return
+        if self.send_error_if_injected():
+            return
+        mock.record(match["listing"])
+        query = parse_qs(url.query)
+        per_page = int(query.get("perPage", ["1000"])[0])
+        start = int(query.get("startingAfter", ["0"])[0])
+        items = mock.listings[match["listing"]]
+        headers = {}
+        if start + per_page < len(items):
+            cursor = urlencode({"perPage": per_page, "startingAfter": start + per_page})
+            headers["Link"] = f'<http://{self.headers["Host"]}{url.path}?{cursor}>; rel=next'
+        self.send_json(200, items[start : start + per_page], headers)
+
+
+class MockMeraki(MockController):
+    """Threaded mock dashboard; injected errors are 429s, as the dashboard throttles rather than fails."""
+
+    handler_class = MockMerakiHandler
+    error_status = 429
+
+    def __init__(self, devices=100, api_key="key", **kwargs):
+        """Build the synthetic organization; `kwargs` set the injected latency and errors."""
+        super().__init__(**kwargs)
+        self.api_key = api_key
+        self.listings = build_organization(devices)
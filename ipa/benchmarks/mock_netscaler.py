@@ -0,0 +1,86 @@
+"""Local mock NetScaler serving the Nitro API for many appliances at once."""
+
+import json
+import re
+import secrets
+from functools import lru_cache
+
+from ipa.benchmarks.mock_server import MockController, MockHandler
+
+RESOURCE_RE = re.compile(r"^/nitro/v1/config/(?P<resource>\w+)$")
+# Resources Nitro returns as a single object rather than a listing.
+SINGLETONS = ("nsrunningconfig", "nshostname", "nsversion", "nsconfig")
+
+
+def appliance_hosts(count, port):
+    """Return `count` distinct appliance addresses served by the mock on `port`.
+
+    Each appliance gets its own loopback address, so clients pool connections per appliance
+    as they would in production. Linux routes the whole of 127.0.0.0/8 to the loopback interface.
+    """
+    return [
+        f"127.{(index + 1) // 65536 % 256}.{(index + 1) // 256 % 256}.{(index + 1) % 256}:{port}"
+        for index in range(count)
+    ]
+
+
+@lru_cache
+def build_resource(resource, items=10):
+    """Return the synthetic content of a Nitro config `resource`."""
+    if resource == "nsrunningconfig":
+        return {"response": "\n".join(f"add server srv-{index} 10.1.0.{index}" for index in range(200))}
+    if resource in SINGLETONS:
+        return {"hostname": "adc", "version": "NetScaler NS14.1", "lastconfigchangedtime": "Mon Jan  1 00:00:00 2024"}
+    return [{"name": f"{resource}-{index}", "state": "ENABLED"} for index in range(items)]
+
+
+class MockNetScalerHandler(MockHandler):
+    """Answer Nitro logins and config resource reads."""
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle `login`."""
+        mock = self.server.mock
+        body = json.loads(self.read_body())
+        mock.record("login")
+        if body["login"]["password"] != mock.password:
+            self.send_json(401, {"errorcode": 354, "message": "Invalid username or password"})
+            return
+        token = secrets.token_hex(8)
+        mock.tokens.add(token)
+        self.send_json(201, {"errorcode": 0, "message": "Done", "sessionid": token})
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle a config resource read."""
+        mock = self.server.mock
+        match = RESOURCE_RE.match(self.path.split("?")[0])
+        if self.cookie("NITRO_AUTH_TOKEN") not in mock.tokens:
+            self.send_json(401, {"errorcode": 444, "message": "Invalid session"})
+            return
+        if not match:
+            self.send_json(404, {"errorcode": 257, "message": "Unknown resource"})
+            return
+        if self.send_error_if_injected():
+            return
+        mock.record("resource")
+        resource = match["resource"]
+        self.send_json(200, {"errorcode": 0, "message": "Done", resource: build_resource(resource)})
+
+
+class MockNetScaler(MockController):
+    """Threaded mock answering for every appliance returned by `appliance_hosts`."""
+
+    handler_class = MockNetScalerHandler
+    # Listen on every address, so each 127/8 appliance address reaches the mock.
+    address = "0.0.0.0"  # noqa: S104
+
+    def __init__(self, devices=100, password="nsroot", **kwargs):  # noqa: S107
+        """Initialize the mock; `devices` is the number of appliances handed out by `hosts`."""
+        super().__init__(**kwargs)
+        self.devices = devices
+        self.password = password
+        self.tokens = set()
+
+    @property
+    def hosts(self):
+        """Addresses of the mock appliances."""
+        return appliance_hosts(self.devices, self.server.server_address[1])
@@ -0,0 +1,141 @@
+"""Shared plumbing for the mock controllers used by tests and benchmarks."""
+
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server accepting the bursts of connections opened by concurrent collectors."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class MockController:  # pylint: disable=too-many-instance-attributes
+    """Threaded mock controller with injected latency and errors, usable as a context manager.
+
+    Subclasses set `handler_class`. Every response is delayed by `latency` seconds, and a
+    share `error_rate` of requests is answered with `error_status` instead. Handling times
+    are recorded so benchmarks can report latency percentiles as seen by the controller.
+    """
+
+    handler_class = None
+    error_status = 503
+    address = "127.0.0.1"
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        """Initialize the mock; `seed` makes the injected errors reproducible."""
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = Counter()
+        self.timings = []
+        self._random = random.Random(seed)  # noqa: S311
+        self._lock = threading.Lock()
+        self.server = MockHTTPServer((self.address, 0), self.handler_class)
+        self.server.mock = self
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def host(self):
+        """`host:port` the mock listens on."""
+        host, port = self.server.server_address
+        return f"{host}:{port}"
+
+    def record(self, kind):
+        """Count one call of `kind`."""
+        with self._lock:
+            self.calls[kind] += 1
+
+    def observe(self, seconds):
+        """Record the handling time of one request."""
+        with self._lock:
+            self.timings.append(seconds)
+
+    def should_fail(self):
+        """Whether the current request gets an injected error."""
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def stats(self):
+        """Return the calls and request timings recorded so far."""
+        with self._lock:
+            return {"calls": dict(self.calls), "timings": list(self.timings)}
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        """Start the mock."""
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        """Stop the mock."""
+        self.stop()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Request handler for `MockController` subclasses, speaking kept-alive HTTP/1.1."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def parse_request(self):
+        """Start the handling clock once the request line and headers are read."""
+        self.started = time.perf_counter()  # pylint: disable=attribute-defined-outside-init
+        return super().parse_request()
+
+    def read_body(self):
+        """Return the request body."""
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def send(self, status, body=b"", content_type="application/json", headers=None):
+        """Send a complete response after the mock's latency, recording how long it took.
+
+        The timing is recorded before anything is written, so it is counted by the time the client has the response.
+        """
+        mock = self.server.mock
+        if mock.latency:
+            time.sleep(mock.latency)
+        mock.observe(time.perf_counter() - self.started)
+        self.send_response(status)
+        for name, value in {"Content-Type": content_type, "Content-Length": str(len(body)), **(headers or {})}.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload, headers=None):
+        """Send `payload` as JSON."""
+        self.send(status, json.dumps(payload).encode(), headers=headers)
+
+    def send_error_if_injected(self):
+        """Answer with the mock's error status, honoring the error rate; return whether it did."""
+        mock = self.server.mock
+        if not mock.should_fail():
+            return False
+        mock.record("error")
+        self.send(mock.error_status, headers={"Retry-After": "0"})
+        return True
+
+    def cookie(self, name):
+        """Return the value of cookie `name` sent by the client."""
+        for cookie in self.headers.get("Cookie", "").split(";"):
+            key, _, value = cookie.strip().partition("=")
+            if key == name:
+                return value
+        return None
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Silence per-request logging."""
@@ -0,0 +1,85 @@
+"""Local mock vManage serving the login handshake, the device inventory and running configurations."""
+
+import secrets
+from urllib.parse import parse_qs, urlparse
+
+from ipa.benchmarks.mock_server import MockController, MockHandler
+
+LOGIN_PAGE = b"<html><body>login</body></html>"
+
+
+def system_ip(index):
+    """System IP of the synthetic device number `index`."""
+    return f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"
+
+
+def build_config(device_id, lines=200):
+    """Return a synthetic running configuration of about `lines` lines."""
+    interfaces = "".join(
+        f"interface GigabitEthernet{port}\n description uplink-{port}\n no shutdown\n!\n" for port in range(lines // 4)
+    )
+    return f"system\n system-ip {device_id}\n host-name edge-{device_id}\n!\n{interfaces}"
+
+
+class MockVManageHandler(MockHandler):
+    """Answer `j_security_check`, the XSRF token and the `device` and `device/config` dataservice calls."""
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle `j_security_check`."""
+        mock = self.server.mock
+        form = parse_qs(self.read_body().decode())
+        mock.record("login")
+        if form.get("j_password") != [mock.password]:
+            self.send(200, LOGIN_PAGE, "text/html")
+            return
+        jsessionid = secrets.token_hex(8)
+        mock.sessions[jsessionid] = secrets.token_hex(8)
+        self.send(200, headers={"Set-Cookie": f"JSESSIONID={jsessionid}; Path=/"})
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle the XSRF token and authenticated dataservice calls."""
+        mock = self.server.mock
+        url = urlparse(self.path)
+        token = mock.sessions.get(self.cookie("JSESSIONID"))
+        if token is None:
+            self.send(200, LOGIN_PAGE, "text/html")
+            return
+        if url.path == "/dataservice/client/token":
+            mock.record("token")
+            self.send(200, token.encode(), "text/plain")
+            return
+        if self.headers.get("X-XSRF-TOKEN") != token:
+            self.send(403)
+            return
+        if url.path == "/dataservice/device":
+            mock.record("device")
+            self.send_json(200, {"data": [{"system-ip": device_id} for device_id in mock.devices]})
+        elif url.path == "/dataservice/device/config":
+            self._config(parse_qs(url.query).get("deviceId", [""])[0])
+        else:
+            self.send(404)
+
+    def _config(self, device_id):
+        """Send the running configuration of `device_id`."""
+        mock = self.server.mock
+        if self.send_error_if_injected():
+            return
+        mock.record("config")
+        if device_id not in mock.devices:
+            self.send(400)
+            return
+        self.send(200, build_config(device_id, mock.config_lines).encode(), "text/plain")
+
+
+class MockVManage(MockController):
+    """Threaded mock vManage managing `devices` WAN edges."""
+
+    handler_class = MockVManageHandler
+
+    def __init__(self, devices=100, password="admin", config_lines=200, **kwargs):  # noqa: S107
+        """Build the synthetic inventory; `kwargs` set the injected latency and errors."""
+        super().__init__(**kwargs)
+        self.password = password
+        self.config_lines = config_lines
+        self.devices = {system_ip(index): None for index in range(devices)}
+        self.sessions = {}
@@ -0,0 +1,277 @@
+"""Benchmark every collector at scale against local mock controllers.
+
+Run with `invoke benchmark` or `python -m ipa.benchmarks --devices 100 1000 10000 --latency 0.005`.
+
+Each case runs the mock controller and the collector in two separate processes, so the
+collector's throughput and peak memory are measured on their own. Request latencies are
+measured by the mock, from the request being read to the response being written, and
+include the injected latency. Cases run unthrottled and without a circuit breaker, as the
+distributed rate limiter and the breaker are tested on their own, and a breaker would stop
+calling a mock injecting errors.
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache.backends.locmem import LocMemCache
+
+from ipa.benchmarks.mock_apic import MockApic
+from ipa.benchmarks.mock_meraki import ORGANIZATION_ID, MockMeraki
+from ipa.benchmarks.mock_netscaler import MockNetScaler, appliance_hosts
+from ipa.benchmarks.mock_vmanage import MockVManage
+from ipa.collectors.apic import FILTER_BATCH, ApicError, ApicFabricCollector
+from ipa.collectors.breaker import CircuitBreaker
+from ipa.collectors.meraki import MerakiOrganizationCollector
+from ipa.collectors.netscaler import NitroAppliance, NitroEngine, collect_appliances
+from ipa.collectors.pool import SessionPool
+from ipa.collectors.vmanage import VManageClient, VManageError, VManageSessionCache
+
+DEFAULT_DEVICES = (100, 1000)
+# Fields of a result compared against the baseline, and whether a higher value is better.
+REGRESSION_FIELDS = {"throughput": True, "peak_rss_mb": False}
+# Breaker letting every call through, whatever its outcome.
+NO_BREAKER = CircuitBreaker(settings={"failure_threshold": 0})
+
+
+class Unthrottled:
+    """Rate limiter stand-in letting every call through."""
+
+    def acquire(self, platform, key):
+        """Take a token immediately."""
+
+    async def acquire_async(self, platform, key):
+        """Take a token immediately."""
+
+    def block(self, platform, key, seconds):
+        """Ignore `Retry-After`; the mocks ask for no wait."""
+
+
+def collect_apic(port, devices, workers):  # pylint: disable=unused-argument
+    """Back up every node of the fabric, one `FILTER_BATCH` of nodes at a time."""
+    collector = ApicFabricCollector(
+        f"127.0.0.1:{port}",
+        "admin",
+        "admin",
+        scheme="http",
+        pool=SessionPool(),
+        rate_limiter=Unthrottled(),
+        breaker=NO_BREAKER,
+    )
+    node_ids = [str(101 + index) for index in range(devices)]
+    collected = errors = 0
+    for start in range(0, devices, FILTER_BATCH):
+        batch = node_ids[start : start + FILTER_BATCH]
+        try:
+            collected += sum(1 for _ in collector.collect(batch))
+        except ApicError:
+            errors += len(batch)
+    return collected, errors
+
+
+def collect_meraki(port, devices, workers):  # pylint: disable=unused-argument
+    """Back up the whole organization with its organization-wide listings."""
+    collector = MerakiOrganizationCollector(
+        f"127.0.0.1:{port}",
+        password="key",  # noqa: S106
+        scheme="http",
+        organization_ids=[ORGANIZATION_ID],
+        pool=SessionPool(),
+        rate_limiter=Unthrottled(),
+        breaker=NO_BREAKER,
+    )
+    collected = sum(1 for _ in collector.collect())
+    return collected, devices - collected
+
+
+def collect_netscaler(port, devices, workers):  # pylint: disable=unused-argument
+    """Collect every appliance concurrently in one event loop."""
+    appliances = [NitroAppliance(host, "nsroot", "nsroot", scheme="http") for host in appliance_hosts(devices, port)]
+    # An engine of its own: the process-wide one reads the app settings, which need Django.
+    engine = NitroEngine()
+    try:
+        results = collect_appliances(
+            appliances, engine=engine, pool=SessionPool(), rate_limiter=Unthrottled(), breaker=NO_BREAKER
+        )
+    finally:
+        engine.close()
+    errors = sum(1 for result in results if result.failed)
+    return len(results) - errors, errors
+
+
+def collect_vmanage(port, devices, workers):  # pylint: disable=unused-argument
+    """Fetch the inventory, then every running configuration from `workers` threads sharing one session."""
+    pool, rate_limiter = SessionPool(pool_size=workers), Unthrottled()
+    token_cache = VManageSessionCache(cache=LocMemCache("ipa-benchmark", {}))
+
+    def client():
+        return VManageClient(
+            f"127.0.0.1:{port}",
+            "admin",
+            "admin",
+            scheme="http",
+            token_cache=token_cache,
+            pool=pool,
+            rate_limiter=rate_limiter,
+            breaker=NO_BREAKER,
+        )
+
+    def fetch(device_id):
+        try:
+            client().get_device_config(device_id)
+        except VManageError:
+            return False
+        return True
+
+    targets = [device["system-ip"] for device in client().get_devices()]
+    with ThreadPoolExecutor(workers) as executor:
+        fetched = list(executor.map(fetch, targets))
+    return fetched.count(True), fetched.count(False)
+
+
+# `{collector: (mock factory, collect function)}`; both receive the number of devices.
+COLLECTORS = {
+    "apic": (lambda devices, **kwargs: MockApic(nodes=devices, interfaces=8, **kwargs), collect_apic),
+    "meraki": (MockMeraki, collect_meraki),
+    "netscaler": (MockNetScaler, collect_netscaler),
+    "vmanage": (MockVManage, collect_vmanage),
+}
+
+
+def peak_rss_mb():
+    """Peak resident memory of the current process, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kibibytes, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(timings, pct):
+    """Return the `pct` percentile of `timings`, in milliseconds."""
+    if len(timings) < 2:
+        return round(1000 * timings[0], 2) if timings else None
+    return round(1000 * statistics.quantiles(timings, n=100, method="inclusive")[pct - 1], 2)
+
+
+def _serve(collector, devices, latency, error_rate, conn):
+    """Run the mock controller of `collector` until the parent asks for its statistics."""
+    factory, _ = COLLECTORS[collector]
+    with factory(devices=devices, latency=latency, error_rate=error_rate) as mock:
+        conn.send(mock.server.server_address[1])
+        conn.recv()
+        conn.send(mock.stats())
+
+
+def _measure(collector, port, devices, workers, conn):
+    """Run the collector against the mock listening on `port` and report how it went."""
+    _, collect = COLLECTORS[collector]
+    start = time.perf_counter()
+    collected, errors = collect(port, devices, workers)
+    conn.send(
+        {
+            "collected": collected,
+            "errors": errors,
+            "seconds": time.perf_counter() - start,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+    )
+
+
+def _start(context, target, *args):
+    """Start `target(*args, conn)` in a new process and return the process and the parent's end of its pipe."""
+    parent, child = context.Pipe()
+    process = context.Process(target=target, args=(*args, child))
+    process.start()
+    child.close()
+    return process, parent
+
+
+def run_case(collector, devices, latency=0.0, error_rate=0.0, workers=20):  # pylint: disable=too-many-arguments
+    """Benchmark one collector against `devices` mock devices and return its result."""
+    context = multiprocessing.get_context("spawn")
+    server, server_conn = _start(context, _serve, collector, devices, latency, error_rate)
+    try:
+        port = server_conn.recv()
+        client, client_conn = _start(context, _measure, collector, port, devices, workers)
+        try:
+            measured = client_conn.recv()
+        except EOFError:
+            raise RuntimeError(f"The {collector} benchmark with {devices} devices crashed") from None
+        finally:
+            client.join()
+        server_conn.send("stop")
+        stats = server_conn.recv()
+    finally:
+        server.join(timeout=10)
+        if server.is_alive():
+            server.terminate()
+    timings = stats["timings"]
+    return {
+        "collector": collector,
+        "devices": devices,
+        "collected": measured["collected"],
+        "errors": measured["errors"],
+        "requests": len(timings),
+        "injected_errors": stats["calls"].get("error", 0),
+        "seconds": round(measured["seconds"], 3),
+        "throughput": round(measured["collected"] / measured["seconds"], 1),
+        "p50_ms": percentile(timings, 50),
+        "p99_ms": percentile(timings, 99),
+        "peak_rss_mb": measured["peak_rss_mb"],
+    }
+
+
+def regressions(results, baseline, tolerance=0.2):
+    """Return a message for every result more than `tolerance` worse than the same case in `baseline`."""
+    previous = {(result["collector"], result["devices"]): result for result in baseline}
+    found = []
+    for result in results:
+        reference = previous.get((result["collector"], result["devices"]))
+        if reference is None:
+            continue
+        for name, higher_is_better in REGRESSION_FIELDS.items():
+            value, expected = result[name], reference[name]
+            limit = expected * (1 - tolerance) if higher_is_better else expected * (1 + tolerance)
+            if (value < limit) if higher_is_better else (value > limit):
+                found.append(f"{result['collector']} with {result['devices']} devices: {name} {value} vs {expected}")
+    return found
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--collectors", nargs="+", choices=sorted(COLLECTORS), default=sorted(COLLECTORS))
+    parser.add_argument("--devices", nargs="+", type=int, default=DEFAULT_DEVICES, help="Device counts to run.")
+    parser.add_argument("--latency", type=float, default=0.005, help="Seconds added to every mock response.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of mock responses that are errors.")
+    parser.add_argument("--workers", type=int, default=20, help="Threads fetching vManage configurations.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Results file to compare against; exit non-zero on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression against the baseline.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for collector in args.collectors:
+        for devices in args.devices:
+            result = run_case(collector, devices, args.latency, args.error_rate, args.workers)
+            results.append(result)
+            print(
+                f"{collector:<10} devices={devices:<6} errors={result['errors']:<5} requests={result['requests']:<7} "
+                f"seconds={result['seconds']:<8} devices/s={result['throughput']:<8} p50={result['p50_ms']}ms "
+                f"p99={result['p99_ms']}ms peak_rss={result['peak_rss_mb']}MiB",
+                flush=True,
+            )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline:
+            found = regressions(results, json.load(baseline), args.tolerance)
+        for message in found:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
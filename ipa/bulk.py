@@ -0,0 +1,143 @@
+"""Set-based upsert of IpaExampleModel records for bulk synchronization."""
+
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from nautobot.extras.choices import ObjectChangeActionChoices
+from nautobot.extras.constants import CHANGELOG_MAX_CHANGE_CONTEXT_DETAIL
+from nautobot.extras.models import ObjectChange
+from nautobot.extras.signals import change_context_state
+
+from ipa.cache import invalidate_on_commit
+from ipa.models import IpaExampleModel
+from ipa.utils import bulk_upsert, get_app_setting
+
+# Fields written by an upsert, besides the `name` identifying the record.
+UPSERT_FIELDS = ("description",)
+
+
+def chunked(items, size):
+    """Yield successive lists of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def log_changes(changes):
+    """Create the changelog entries of `(instance, action)` pairs in one query, when change logging is active.
+
+    Entries are attributed to the user and request of the current change context, as the signal
+    handlers would, which `bulk_create` does not trigger.
+    """
+    change_context = change_context_state.get()
+    if change_context is None or not changes:
+        return
+    entries = []
+    for instance, action in changes:
+        entry = instance.to_objectchange(action)
+        entry.user = change_context.get_user(instance)
+        if entry.user is not None:
+            entry.user_name = entry.user.username
+        entry.request_id = change_context.change_id
+        entry.change_context = change_context.context
+        entry.change_context_detail = change_context.context_detail[:CHANGELOG_MAX_CHANGE_CONTEXT_DETAIL]
+        entries.append(entry)
+    ObjectChange.objects.bulk_create(entries)
+
+
+def denied_names(user, changes):
+    """Return the names of the `(instance, action)` changes whose stored record `user` may not add or change.
+
+    Records are checked against the constraints of the user's object permissions, the add
+    constraints for created records and the change constraints for updated ones.
+    """
+    denied = set()
+    for action, permission in (
+        (ObjectChangeActionChoices.ACTION_CREATE, "add"),
+        (ObjectChangeActionChoices.ACTION_UPDATE, "change"),
+    ):
+        instances = [instance for instance, change in changes if change == action]
+        if not instances:
+            continue
+        allowed = set(
+            IpaExampleModel.objects.restrict(user, permission)
+            .filter(pk__in=[instance.pk for instance in instances])
+            .values_list("pk", flat=True)
+        )
+        denied.update(instance.name for instance in instances if instance.pk not in allowed)
+    return sorted(denied)
+
+
+def upsert_examples(rows, chunk_size=None, user=None):
+    """Create or update an IpaExampleModel for every row of `rows`, matching existing records by `name`.
+
+    Each row is a dict with a `name` and the `UPSERT_FIELDS` to set. Rows are processed in chunks
+    of `chunk_size` (the `bulk_upsert_chunk_size` setting by default): one query looks up the
+    existing records of a chunk, one `INSERT ... ON CONFLICT (name) DO UPDATE` writes the new and
+    changed ones (an update and an insert on MySQL, see `bulk_upsert()`) and one more query logs
+    their changes. Rows matching their record are not written. Every chunk is written in one
+    transaction.
+
+    When `user` is given, records are written as the API writes single objects: the records
+    updated must match the constraints of the user's change permissions before and after the
+    write, and the records created those of the add permissions.
+
+    Raises:
+        PermissionDenied: Some rows may not be written by `user`; none is written.
+
+    Returns:
+        dict: The number of records `created`, `updated` and left `unchanged`.
+    """
+    chunk_size = chunk_size or get_app_setting("bulk_upsert_chunk_size")
+    counts = {"created": 0, "updated": 0, "unchanged": 0}
+    with transaction.atomic():
+        for chunk in chunked(rows, chunk_size):
+            upsert_chunk(chunk, counts, user)
+    return counts
+
+
+def upsert_chunk(chunk, counts, user=None):
+    """Write the rows of one chunk of `upsert_examples()`, adding them to `counts`."""
+    existing = IpaExampleModel.objects.in_bulk([row["name"] for row in chunk], field_name="name")
+    changes = []
+    for row in chunk:
+        instance = existing.get(row["name"])
+        values = {name: row.get(name, "") for name in UPSERT_FIELDS}
+        if instance is None:
+            changes.append((IpaExampleModel(name=row["name"], **values), ObjectChangeActionChoices.ACTION_CREATE))
+            counts["created"] += 1
+        elif any(getattr(instance, name) != value for name, value in values.items()):
+            for name, value in values.items():
+                setattr(instance, name, value)
+            changes.append((instance, ObjectChangeActionChoices.ACTION_UPDATE))
+            counts["updated"] += 1
+        else:
+            counts["unchanged"] += 1
+    if not changes:
+        return
+    if user is not None:
+        # Updated records as stored, before the write.
+        updates = [change for change in changes if change[1] == ObjectChangeActionChoices.ACTION_UPDATE]
+        check_permissions(user, updates)
+    # The insert stamps `created` on every instance; only new records keep it in the database.
+    created = {instance.pk: instance.created for instance, _ in changes}
+    bulk_upsert(
+        IpaExampleModel,
+        [instance for instance, _ in changes],
+        unique_fields=["name"],
+        update_fields=[*UPSERT_FIELDS, "last_updated"],
+    )
+    if user is not None:
+        # Every record as written.
+        check_permissions(user, changes)
+    for instance, action in changes:
+        if action == ObjectChangeActionChoices.ACTION_UPDATE:
+            instance.created = created[instance.pk]
+    log_changes(changes)
+    # bulk_create() sends no post_save signal.
+    invalidate_on_commit(IpaExampleModel)
+
+
+def check_permissions(user, changes):
+    """Raise `PermissionDenied` naming the records of `changes` that `user` may not write."""
+    denied = denied_names(user, changes)
+    if denied:
+        raise PermissionDenied(f"Not allowed to write: {', '.join(denied)}")
@@ -0,0 +1,153 @@
+"""Cache of ipa API read responses, invalidated by model version counters.
+
+Every ipa model has a version counter in the Django cache, shared by every web worker and
+bumped when a transaction saving or deleting one of its objects commits. Cached responses are
+keyed by that version, so a change makes every cached response of the model unreachable at
+once, while responses of the other models stay cached. Entries are held per process, evicted
+least recently used first beyond `max_entries` and expire after `ttl` seconds regardless.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from nautobot.extras.models import TaggedItem
+from nautobot.users.models import ObjectPermission
+
+from ipa.utils import get_app_setting
+
+VERSION_KEY = "ipa:cache-version:{}"
+
+
+def model_version(model):
+    """Return the version counter of `model`.
+
+    Counters start from the current time, so a counter evicted from the cache does not restart
+    from a version that responses were cached under.
+    """
+    return cache.get_or_set(VERSION_KEY.format(model._meta.label_lower), time.time_ns, timeout=None)
+
+
+def bump_version(model):
+    """Invalidate the cached responses of `model` now; see `invalidate_on_commit()`."""
+    key = VERSION_KEY.format(model._meta.label_lower)
+    cache.add(key, time.time_ns(), timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr().
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate_on_commit(model):
+    """Invalidate the cached responses of `model` once the current transaction commits.
+
+    Bumping earlier would let a concurrent request cache the data preceding the commit under
+    the new version.
+    """
+    transaction.on_commit(lambda: bump_version(model))
+
+
+def invalidate(sender, **kwargs):
+    """Signal receiver invalidating ipa models saved, deleted, tagged or with changed many-to-many fields."""
+    instance = kwargs.get("instance")
+    if sender._meta.app_label == "ipa":
+        invalidate_on_commit(sender)
+    elif instance is not None and instance._meta.app_label == "ipa":
+        # m2m_changed is sent by the through model, e.g. the tagged items of a tag change.
+        invalidate_on_commit(type(instance))
+    elif isinstance(instance, TaggedItem):
+        # Tagged items saved or deleted on their own, e.g. when their tag is deleted.
+        content_type = ContentType.objects.get_for_id(instance.content_type_id)
+        if content_type.app_label == "ipa":
+            invalidate_on_commit(content_type.model_class())
+
+
+def permission_fingerprint(user):
+    """Return a digest of the permissions of `user`, shared by users with the same permissions."""
+    if user.is_superuser:
+        return "superuser"
+    if not user.is_authenticated:
+        return "anonymous"
+    permissions = (
+        ObjectPermission.objects.filter(Q(users=user) | Q(groups__user=user), enabled=True)
+        .distinct()
+        .order_by("pk")
+        .values_list("pk", "last_updated")
+    )
+    return hashlib.sha256(repr(list(permissions)).encode()).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU of response data with a time to live."""
+
+    def __init__(self, max_entries=None, ttl=None):
+        """Initialize an empty cache; `max_entries` and `ttl` default to the `response_cache` setting."""
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_entries(self):
+        """Number of responses kept."""
+        return self._max_entries if self._max_entries is not None else get_app_setting("response_cache")["max_entries"]
+
+    @property
+    def ttl(self):
+        """Seconds a response is served from the cache, 0 to disable caching."""
+        return self._ttl if self._ttl is not None else get_app_setting("response_cache")["ttl"]
+
+    def get(self, key):
+        """Return the data cached under `key`, None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, data = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, data):
+        """Cache `data` under `key`, evicting the least recently used entries beyond `max_entries`."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def response_key(request, model):
+    """Return the cache key of a read `request` for objects of `model`.
+
+    The key covers the scheme, host and path, as responses link to objects by absolute URL, the
+    query parameters in any order, the negotiated media type and API version, the permissions of
+    the user and the version of `model`.
+    """
+    params = sorted((name, value) for name in request.query_params for value in request.query_params.getlist(name))
+    parts = (
+        model._meta.label_lower,
+        model_version(model),
+        request.build_absolute_uri(request.path),
+        params,
+        request.accepted_media_type,
+        request.version,
+        permission_fingerprint(request.user),
+    )
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
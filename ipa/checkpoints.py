@@ -0,0 +1,63 @@
+"""Per-device progress of backup jobs, so that an interrupted job can be resumed."""
+
+from collections import defaultdict
+
+from django.utils import timezone
+
+from ipa.models import CollectionCheckpoint
+from ipa.utils import get_app_setting
+
+
+class Checkpointer:
+    """Record the devices a job has backed up, `checkpoint_batch_size` per INSERT.
+
+    Devices are buffered until a batch is full or `flush()` is called; a job interrupted
+    loses at most the devices of the unflushed batch of each running shard.
+    """
+
+    def __init__(self, job_result, batch_size=None):
+        """Record checkpoints under `job_result`; without one, checkpoints are dropped."""
+        self.job_result = job_result
+        self.batch_size = batch_size or get_app_setting("checkpoint_batch_size")
+        self.pending = []
+
+    def add(self, device_pks):
+        """Record the devices with primary keys `device_pks` as done."""
+        if self.job_result is None:
+            return
+        now = timezone.now()
+        self.pending.extend(
+            CollectionCheckpoint(job_result=self.job_result, device_id=pk, completed=now) for pk in device_pks
+        )
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def for_targets(self, devices, device_target):
+        """Return a callable recording the `devices` whose target, as returned by `device_target(device)`, is done."""
+        devices_by_target = defaultdict(list)
+        for device in devices:
+            devices_by_target[device_target(device)].append(device.pk)
+
+        def progress(targets):
+            self.add(pk for target in targets for pk in devices_by_target.get(target, ()))
+
+        return progress
+
+    def flush(self):
+        """Write the buffered checkpoints."""
+        if self.pending:
+            CollectionCheckpoint.objects.bulk_create(self.pending, ignore_conflicts=True)
+            self.pending = []
+
+
+def carry_over(previous, job_result):
+    """Copy the checkpoints of `previous` to `job_result`, which resumes it, and return their device primary keys.
+
+    The resumed run then holds every device done so far, so it can be resumed in turn.
+    """
+    checkpoints = CollectionCheckpoint.objects.filter(job_result=previous).values_list("device_id", "completed")
+    copies = [CollectionCheckpoint(job_result=job_result, device_id=pk, completed=when) for pk, when in checkpoints]
+    CollectionCheckpoint.objects.bulk_create(
+        copies, batch_size=get_app_setting("checkpoint_batch_size"), ignore_conflicts=True
+    )
+    return {checkpoint.device_id for checkpoint in copies}
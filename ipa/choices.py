@@ -0,0 +1,29 @@
+"""Choice sets for ipa."""
+
+from nautobot.apps.choices import ChoiceSet
+
+
+class FingerprintSourceChoices(ChoiceSet):
+    """Where a device fingerprint comes from, from cheapest to most expensive to obtain."""
+
+    ETAG = "etag"
+    REVISION = "revision"
+    CONTENT = "content"
+
+    CHOICES = (
+        (ETAG, "ETag"),
+        (REVISION, "Controller revision"),
+        (CONTENT, "Content hash"),
+    )
+
+
+class CompressionChoices(ChoiceSet):
+    """Codecs used to compress configuration blobs."""
+
+    ZSTD = "zstd"
+    GZIP = "gzip"
+
+    CHOICES = (
+        (ZSTD, "Zstandard"),
+        (GZIP, "gzip"),
+    )
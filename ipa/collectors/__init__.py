@@ -0,0 +1 @@
+"""Controller API collectors for ipa."""
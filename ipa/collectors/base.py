@@ -0,0 +1,156 @@
+"""Base class for API platform drivers."""
+
+import math
+import time
+
+from ipa.collectors.breaker import breaker as default_breaker
+from ipa.collectors.instrumentation import endpoint_template
+from ipa.collectors.instrumentation import recorder as default_recorder
+from ipa.collectors.pool import get_pool
+from ipa.collectors.ratelimit import rate_limiter as default_rate_limiter
+from ipa.collectors.ratelimit import retry_after
+
+
+def pages(items, per_page):
+    """Number of pages a listing of `items` takes at `per_page` items per page, at least one."""
+    return max(1, math.ceil(items / per_page))
+
+
+class BaseDriver:  # pylint: disable=too-many-instance-attributes
+    """Common plumbing for API platform drivers.
+
+    A driver talks to one controller host. Its HTTP session comes from the process-wide
+    `SessionPool`, so every driver instance for the same host shares warm connections.
+    Every request is charged to the distributed rate limiter first, and throttled
+    responses block the bucket for as long as the controller asks. Calls to a controller
+    whose circuit is open fail at once with `CircuitOpen`; exceptions and server errors
+    count towards opening it, every other response closes it. Every request is
+    recorded, with its duration, size, status and time spent throttled. Subclasses set
+    `platform` to the Nautobot network driver they serve and implement `collect()`.
+    """
+
+    platform = None
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        host,
+        username=None,
+        password=None,
+        *,
+        scheme="https",
+        verify_ssl=True,
+        pool=None,
+        timeout=60,
+        rate_limiter=None,
+        recorder=None,
+        breaker=None,
+    ):
+        """Bind the driver to a controller and its pooled session."""
+        self.host = host
+        self.username = username
+        self.password = password
+        self.scheme = scheme
+        self.verify_ssl = verify_ssl
+        self.timeout = timeout
+        self.pool = pool or get_pool()
+        self.rate_limiter = rate_limiter or default_rate_limiter
+        self.recorder = recorder or default_recorder
+        self.breaker = breaker or default_breaker
+
+    @property
+    def session(self):
+        """Pooled `requests.Session` shared by every driver talking to this controller."""
+        return self.pool.get_session(self.scheme, self.host, self.verify_ssl)
+
+    @property
+    def base_url(self):
+        """Root URL of the controller."""
+        return f"{self.scheme}://{self.host}"
+
+    def rate_limit_key(self, url):  # pylint: disable=unused-argument
+        """Key of the rate-limit bucket and circuit charged for `url`; one of each per controller by default."""
+        return self.host
+
+    def endpoint(self, url):
+        """Endpoint template `url` is recorded under, e.g. `/api/v1/organizations/{id}/devices`."""
+        return endpoint_template(url)
+
+    def request(self, method, path, retry=False, **kwargs):
+        """Send one rate-limited HTTP request to the controller over the pooled session.
+
+        `retry` marks a request repeating an earlier one, e.g. after a 429 or a new login.
+        Durations of streamed responses stop when the headers arrive; their size is taken
+        from `Content-Length`.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        url = path if "://" in path else f"{self.base_url}{path}"
+        key = self.rate_limit_key(url)
+        failures = self.breaker.before_call(self.platform, key)
+        start = time.perf_counter()
+        self.rate_limiter.acquire(self.platform, key)
+        sent = time.perf_counter()
+        call = {"retry": retry, "throttled": sent - start}
+        try:
+            response = self.session.request(method, url, verify=self.verify_ssl, **kwargs)
+        except Exception:
+            self.recorder.record(
+                self.platform,
+                self.host,
+                method,
+                self.endpoint(url),
+                status=0,
+                duration=time.perf_counter() - sent,
+                **call,
+            )
+            self.breaker.failure(self.platform, key)
+            raise
+        if kwargs.get("stream"):
+            size = int(response.headers.get("Content-Length") or 0)
+        else:
+            size = len(response.content)
+        self.recorder.record(
+            self.platform,
+            self.host,
+            method,
+            self.endpoint(url),
+            status=response.status_code,
+            duration=time.perf_counter() - sent,
+            size=size,
+            **call,
+        )
+        delay = retry_after(response.status_code, response.headers.get("Retry-After"))
+        if delay is not None:
+            self.rate_limiter.block(self.platform, key, delay)
+        self.breaker.record(self.platform, key, response.status_code, failures, throttled=delay is not None)
+        return response
+
+    @classmethod
+    def device_target(cls, device):
+        """Return the target identifying the Nautobot `device` behind the controller.
+
+        None means the device cannot be told apart, and the whole controller is backed up.
+        """
+        return device.name
+
+    def fingerprints(self, targets=None):  # pylint: disable=unused-argument
+        """Return `{target: (source, value)}` fingerprints obtained without fetching configurations.
+
+        `source` is a `FingerprintSourceChoices` value. Drivers without a cheap fingerprint
+        return nothing, and backups fall back to hashing the fetched payload. A `value` of
+        None marks a target whose fingerprint is unknown: it is always fetched, then hashed.
+        """
+        return {}
+
+    def collect(self, targets=None):
+        """Yield `(target, payload)` backups for `targets`, or for everything behind the controller."""
+        raise NotImplementedError
+
+    def plan_calls(self, targets=None, devices=0):  # pylint: disable=unused-argument
+        """Return the `Counter` of `(method, endpoint)` calls a backup of `targets` makes, None when unknown.
+
+        Backups are planned as if every target changed, so the counts are an upper bound:
+        targets a fingerprint finds unchanged skip their fetch. Endpoints are templates, as
+        recorded in `ApiCallSummary`. `devices` is the number of Nautobot devices behind the
+        controller, which sizes listings and whole-controller backups.
+        """
+        return None
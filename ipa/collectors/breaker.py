@@ -0,0 +1,116 @@
+"""Per-controller circuit breaker shared by every API driver through the Django cache."""
+
+from django.core.cache import cache as default_cache
+
+from ipa.utils import get_app_setting
+
+BREAKER_PREFIX = "ipa:breaker"
+# Responses from this status on count as a failure of the controller, unless they ask to back off.
+SERVER_ERROR_STATUS = 500
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a controller whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Circuits in the Django cache, one per platform and controller (or organization).
+
+    After `failure_threshold` consecutive failed calls, by any worker, the circuit opens and
+    every call to the controller raises `CircuitOpen` at once instead of waiting for its
+    timeouts. Once `reset_timeout` seconds have passed it is half-open: a single call, from
+    whichever worker gets there first, probes the controller while the others keep failing
+    fast, and its outcome closes or reopens the circuit. A failure count lapses
+    `failure_window` seconds after the last failure. Settings come from `circuit_breaker`;
+    a `failure_threshold` of 0 disables the breaker.
+    """
+
+    def __init__(self, cache=None, settings=None):
+        """Initialize the breaker; `cache` defaults to the Django cache shared by every worker."""
+        self._cache = cache
+        self._settings = settings
+
+    @property
+    def cache(self):
+        """Cache holding the circuits."""
+        return self._cache or default_cache
+
+    @property
+    def settings(self):
+        """The `{"failure_threshold": ..., "reset_timeout": ..., "failure_window": ...}` applied."""
+        return self._settings if self._settings is not None else get_app_setting("circuit_breaker")
+
+    @staticmethod
+    def key(platform, key, suffix):
+        """Cache key of the `suffix` entry (`failures`, `open` or `probe`) of the circuit for `key` on `platform`."""
+        return f"{BREAKER_PREFIX}:{platform}:{key}:{suffix}"
+
+    def before_call(self, platform, key):
+        """Raise `CircuitOpen` unless a call to `key` may go ahead; return the failures counted so far.
+
+        The count is handed back to `success()`, which only writes to the cache when it was not 0.
+        """
+        threshold = self.settings["failure_threshold"]
+        if not threshold:
+            return 0
+        failures_key, open_key = self.key(platform, key, "failures"), self.key(platform, key, "open")
+        state = self.cache.get_many([failures_key, open_key])
+        if state.get(open_key):
+            raise CircuitOpen(f"Circuit of {platform} {key} is open after {threshold} consecutive failures")
+        failures = state.get(failures_key) or 0
+        if failures >= threshold:
+            # Half-open: only the worker adding the probe entry calls the controller.
+            timeout = self.settings["reset_timeout"]
+            if not self.cache.add(self.key(platform, key, "probe"), True, timeout=timeout):
+                raise CircuitOpen(f"Circuit of {platform} {key} is half-open, another call is probing it")
+        return failures
+
+    def success(self, platform, key, failures):
+        """Close the circuit for `key` after a call answered, given the `failures` returned by `before_call()`."""
+        if failures and self.settings["failure_threshold"]:
+            self.cache.delete_many([self.key(platform, key, "failures"), self.key(platform, key, "probe")])
+
+    def failure(self, platform, key):
+        """Count a failed call to `key`, opening its circuit when the threshold is reached."""
+        settings = self.settings
+        threshold = settings["failure_threshold"]
+        if not threshold:
+            return
+        failures_key, window = self.key(platform, key, "failures"), settings["failure_window"]
+        self.cache.add(failures_key, 0, timeout=window)
+        try:
+            failures = self.cache.incr(failures_key)
+        except ValueError:
+            # The count lapsed between the two calls.
+            failures = 1
+            self.cache.set(failures_key, failures, timeout=window)
+        if failures >= threshold:
+            self.cache.set(self.key(platform, key, "open"), True, timeout=settings["reset_timeout"])
+            self.cache.delete(self.key(platform, key, "probe"))
+            # Keep the count past the open state, so that the circuit turns half-open rather than closed.
+            window += settings["reset_timeout"]
+        self.cache.touch(failures_key, timeout=window)
+
+    def record(self, platform, key, status, failures, throttled=False):
+        """Count a call to `key` answered with `status` as a failure or a success.
+
+        Server errors fail, except `throttled` ones: a controller asking to back off is up.
+        """
+        if status >= SERVER_ERROR_STATUS and not throttled:
+            self.failure(platform, key)
+        else:
+            self.success(platform, key, failures)
+
+    def state(self, platform, key):
+        """Return `"closed"`, `"open"` or `"half-open"` for the circuit of `key`."""
+        threshold = self.settings["failure_threshold"]
+        if not threshold:
+            return "closed"
+        failures_key, open_key = self.key(platform, key, "failures"), self.key(platform, key, "open")
+        state = self.cache.get_many([failures_key, open_key])
+        if state.get(open_key):
+            return "open"
+        return "half-open" if (state.get(failures_key) or 0) >= threshold else "closed"
+
+
+breaker = CircuitBreaker()
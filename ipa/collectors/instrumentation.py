@@ -0,0 +1,122 @@
+"""In-process aggregation of the API calls made by every driver, also exported to Prometheus."""
+
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from prometheus_client import Counter as PrometheusCounter
+from prometheus_client import Histogram
+
+# Path segments, or dash-separated parts of segments, identifying one object rather than an
+# endpoint: numbers (`node-101`, `/organizations/549236`), UUIDs and long hex or serial tokens.
+ENDPOINT_ID_RE = re.compile(
+    r"(?<=[/-])(?:\d+|[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}|[0-9a-fA-F]{16,}|[A-Z0-9]{4}-[A-Z0-9]{4}-[A-Z0-9]{4})(?=[/.\]-]|$)"
+)
+
+REQUEST_LABELS = ("platform", "controller")
+REQUEST_DURATION = Histogram(
+    "ipa_api_request_duration_seconds",
+    "Time waiting for controller API responses.",
+    REQUEST_LABELS,
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+RATE_LIMIT_WAIT = Histogram(
+    "ipa_rate_limit_wait_seconds",
+    "Time controller API requests waited for the rate limiter.",
+    REQUEST_LABELS,
+    buckets=(0.001, 0.01, 0.1, 0.5, 1, 5, 15, 60, 300),
+)
+REQUEST_FAILURES = PrometheusCounter(
+    "ipa_api_request_failures",
+    "Controller API requests failing to connect or answered with 4xx/5xx.",
+    REQUEST_LABELS,
+)
+REQUEST_RETRIES = PrometheusCounter(
+    "ipa_api_request_retries", "Controller API requests repeating an earlier one.", REQUEST_LABELS
+)
+RESPONSE_BYTES = PrometheusCounter("ipa_api_response_bytes", "Bytes received from controller APIs.", REQUEST_LABELS)
+
+
+def endpoint_template(url):
+    """Return the path of `url` with object identifiers replaced by `{id}`, dropping the query string.
+
+    `/api/mo/topology/pod-1/node-101/sys.json` becomes `/api/mo/topology/pod-{id}/node-{id}/sys.json`,
+    so calls to the same endpoint for different objects are aggregated together.
+    """
+    return ENDPOINT_ID_RE.sub("{id}", urlsplit(url).path) or "/"
+
+
+@dataclass
+class CallStats:  # pylint: disable=too-many-instance-attributes
+    """Aggregated calls to one endpoint of one controller."""
+
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    duration: float = 0.0
+    max_duration: float = 0.0
+    throttled: float = 0.0
+    bytes_received: int = 0
+    status_codes: Counter = field(default_factory=Counter)
+
+    def add(self, status, duration, size=0, retry=False, throttled=0.0):  # pylint: disable=too-many-arguments
+        """Account for one call."""
+        self.calls += 1
+        self.errors += status == 0 or status >= 400
+        self.retries += bool(retry)
+        self.duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        self.throttled += throttled
+        self.bytes_received += size or 0
+        self.status_codes[str(status)] += 1
+
+
+class ApiCallRecorder:
+    """Thread-safe aggregation of API calls by `(platform, controller, method, endpoint)`.
+
+    Drivers record every call they send, with its duration, size, status and whether it
+    retried an earlier call. Aggregating in memory keeps recording cheap enough to stay on
+    for every call; `drain()` hands the totals over for storage, typically once per job.
+    Every call is also observed by the Prometheus metrics, labelled by platform and controller.
+    """
+
+    def __init__(self):
+        """Initialize an empty recorder."""
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, platform, controller, method, endpoint, **call):  # pylint: disable=too-many-arguments
+        """Account for one call; `call` holds `status`, `duration` and optionally `size`, `retry` and `throttled`."""
+        key = (platform or "", controller, method.upper(), endpoint)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = CallStats()
+            stats.add(**call)
+        labels = (platform or "", controller)
+        REQUEST_DURATION.labels(*labels).observe(call["duration"])
+        RATE_LIMIT_WAIT.labels(*labels).observe(call.get("throttled", 0.0))
+        if call["status"] == 0 or call["status"] >= 400:
+            REQUEST_FAILURES.labels(*labels).inc()
+        if call.get("retry"):
+            REQUEST_RETRIES.labels(*labels).inc()
+        RESPONSE_BYTES.labels(*labels).inc(call.get("size") or 0)
+
+    def snapshot(self):
+        """Return a copy of the totals recorded so far, keyed by `(platform, controller, method, endpoint)`."""
+        with self._lock:
+            return {
+                key: CallStats(**{**vars(stats), "status_codes": Counter(stats.status_codes)})
+                for key, stats in self._stats.items()
+            }
+
+    def drain(self):
+        """Return the totals recorded so far and start over."""
+        with self._lock:
+            stats, self._stats = self._stats, {}
+        return stats
+
+
+recorder = ApiCallRecorder()
@@ -0,0 +1,145 @@
+"""Organization-wide bulk collector for the Cisco Meraki dashboard API."""
+
+import re
+from collections import Counter, defaultdict
+
+from ipa.collectors.base import BaseDriver, pages
+
+MERAKI_HOST = "api.meraki.com"
+MERAKI_BASE_PATH = "/api/v1"
+
+# Organization-level listings fetched once per organization. Each section maps to the
+# endpoint path, the item key used to fan results out to devices ("serial" for a single
+# device, "networkId" for every device of a network) and the largest page size allowed.
+# Only configuration is backed up: status listings, such as uplink or VPN statuses, change
+# on every run and would make every device look changed to incremental backups. Other
+# appliance settings, such as VLANs and firewall rules, are only listed per network.
+ORGANIZATION_ENDPOINTS = {
+    "switch_ports": ("/organizations/{organization_id}/switch/ports/bySwitch", "serial", 50),
+    "appliance_vpn_exclusions": (
+        "/organizations/{organization_id}/appliance/trafficShaping/vpnExclusions/byNetwork",
+        "networkId",
+        1000,
+    ),
+}
+DEVICES_ENDPOINT = ("/organizations/{organization_id}/devices", "serial", 1000)
+# The dashboard enforces its rate limit per organization.
+ORGANIZATION_RE = re.compile(r"/organizations/([^/?]+)")
+
+
+class MerakiError(Exception):
+    """Raised when the dashboard API returns an error."""
+
+
+class MerakiOrganizationCollector(BaseDriver):
+    """Collect device backups for whole organizations with a handful of paginated calls.
+
+    Instead of one set of calls per device, every section is read from a single
+    organization-level listing and split by serial (or network) into per-device payloads,
+    so the number of calls grows with organizations and pages rather than with devices.
+    The dashboard API key is passed as `password`.
+    """
+
+    platform = "cisco_meraki"
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        host=MERAKI_HOST,
+        username=None,
+        password=None,
+        *,
+        organization_ids=(),
+        endpoints=None,
+        base_path=MERAKI_BASE_PATH,
+        max_retries=5,
+        **kwargs,
+    ):
+        """Initialize the collector with a dashboard API key for the organizations in `organization_ids`."""
+        super().__init__(host, username, password, **kwargs)
+        if not organization_ids:
+            # Nothing would be collected, and backups would report success for every device.
+            raise ValueError("Set organization_ids in the extra config of the Meraki external integration")
+        self.organization_ids = tuple(organization_ids)
+        self.endpoints = ORGANIZATION_ENDPOINTS if endpoints is None else endpoints
+        self.base_path = base_path.rstrip("/")
+        self.max_retries = max_retries
+
+    @classmethod
+    def device_target(cls, device):
+        """Return the serial number of `device`, which the dashboard identifies devices by."""
+        return device.serial or None
+
+    def rate_limit_key(self, url):
+        """Charge calls to the organization they address, as the dashboard does."""
+        match = ORGANIZATION_RE.search(url)
+        return f"org:{match.group(1)}" if match else self.host
+
+    def _get(self, url, params=None):
+        """GET `url`, retrying 429 responses once the rate limiter has waited out `Retry-After`."""
+        headers = {"Authorization": f"Bearer {self.password}", "Accept": "application/json"}
+        for attempt in range(self.max_retries + 1):
+            response = self.request("GET", url, retry=attempt > 0, params=params, headers=headers)
+            if response.status_code != 429 or attempt == self.max_retries:
+                break
+        if not response.ok:
+            raise MerakiError(f"GET {url} returned {response.status_code}: {response.text[:200]}")
+        return response
+
+    def paginate(self, path, per_page=1000, params=None):
+        """Yield the items of a paginated listing one page at a time, following `Link: rel=next`."""
+        url = f"{self.base_path}{path}"
+        params = {**(params or {}), "perPage": per_page}
+        while url:
+            response = self._get(url, params=params)
+            yield from response.json()
+            # The next link already carries every query parameter, including the cursor.
+            url, params = response.links.get("next", {}).get("url"), None
+
+    def collect_organization(self, organization_id, serials=None):
+        """Return a `{serial: {section: data}}` mapping for every device of an organization.
+
+        Args:
+            organization_id (str): Dashboard organization ID.
+            serials (Iterable[str]): Restrict the result to these serials. Items for other
+                devices are dropped as the pages stream in.
+        """
+        wanted = set(serials) if serials is not None else None
+        backups = {}
+        networks = defaultdict(list)
+        path, key, per_page = DEVICES_ENDPOINT
+        for device in self.paginate(path.format(organization_id=organization_id), per_page):
+            if wanted is not None and device[key] not in wanted:
+                continue
+            backups[device[key]] = {"device": device}
+            if device.get("networkId"):
+                networks[device["networkId"]].append(device[key])
+
+        for section, (path, key, per_page) in self.endpoints.items():
+            for item in self.paginate(path.format(organization_id=organization_id), per_page):
+                targets = networks.get(item.get(key), ()) if key == "networkId" else (item.get(key),)
+                for serial in targets:
+                    if serial in backups:
+                        backups[serial].setdefault(section, []).append(item)
+        return backups
+
+    def iter_backups(self, organization_ids, serials=None):
+        """Yield `(serial, payload)` for every device across `organization_ids`."""
+        for organization_id in organization_ids:
+            yield from self.collect_organization(organization_id, serials=serials).items()
+
+    def collect(self, targets=None):
+        """Yield `(serial, payload)` for the serials in `targets` across the configured organizations."""
+        yield from self.iter_backups(self.organization_ids, serials=targets)
+
+    def plan_calls(self, targets=None, devices=0):
+        """Return the pages of every organization-level listing, sized by the `devices` of the organizations.
+
+        Listings return every device of an organization whatever the `targets`, so the
+        number of calls does not depend on them.
+        """
+        calls = Counter()
+        for organization_id in self.organization_ids:
+            for path, _, per_page in (DEVICES_ENDPOINT, *self.endpoints.values()):
+                url = f"{self.base_path}{path.format(organization_id=organization_id)}"
+                calls["GET", self.endpoint(url)] += pages(devices, per_page)
+        return calls
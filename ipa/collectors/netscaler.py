@@ -0,0 +1,536 @@
+"""Asyncio Nitro API collector for Citrix NetScaler ADC appliances."""
+
+import asyncio
+import atexit
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import aiohttp
+
+from ipa.choices import FingerprintSourceChoices
+from ipa.collectors.base import BaseDriver
+from ipa.collectors.breaker import CircuitOpen
+from ipa.collectors.breaker import breaker as default_breaker
+from ipa.collectors.instrumentation import recorder as default_recorder
+from ipa.collectors.ratelimit import rate_limiter as default_rate_limiter
+from ipa.collectors.ratelimit import retry_after
+from ipa.parsing import CHUNK_SIZE, JsonItemParser
+from ipa.utils import get_app_setting
+
+NITRO_CONFIG_PATH = "/nitro/v1/config"
+NITRO_AUTH_COOKIE = "NITRO_AUTH_TOKEN"
+# Idle timeout, in seconds, requested for every Nitro session at login.
+NITRO_SESSION_TIMEOUT = 900
+# Nitro errorcode returned when the session token is unknown or has expired.
+NITRO_INVALID_SESSION = 444
+NITRO_PLATFORM = "citrix_netscaler"
+
+DEFAULT_RESOURCES = (
+    "nsrunningconfig",
+    "nshostname",
+    "nsversion",
+    "nsip",
+    "lbvserver",
+    "csvserver",
+    "servicegroup",
+    "server",
+    "sslcertkey",
+)
+
+
+class NitroError(Exception):
+    """Raised when a Nitro API call fails."""
+
+    def __init__(self, message, errorcode=None, status=None):
+        """Keep the Nitro errorcode and HTTP status alongside the message."""
+        super().__init__(message)
+        self.errorcode = errorcode
+        self.status = status
+
+
+class NitroSessionExpired(NitroError):
+    """Raised when the appliance no longer accepts the session token."""
+
+
+@dataclass(frozen=True)
+class NitroAppliance:
+    """Connection details for one NetScaler ADC."""
+
+    host: str
+    username: str
+    password: str = field(repr=False)
+    scheme: str = "https"
+    verify_ssl: bool = True
+
+    @property
+    def base_url(self):
+        """Root URL of the Nitro configuration API."""
+        return f"{self.scheme}://{self.host}{NITRO_CONFIG_PATH}"
+
+
+@dataclass
+class NitroResult:
+    """Resources collected from one appliance, with per-resource errors."""
+
+    host: str
+    resources: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+
+    @property
+    def failed(self):
+        """Whether any resource, or the login itself, failed."""
+        return bool(self.errors)
+
+
+class NitroSessionCache:
+    """Process-wide cache of Nitro session tokens keyed by appliance and user.
+
+    Tokens are kept slightly shorter than the idle timeout requested at login and every
+    successful call extends them, mirroring how the appliance tracks session activity.
+    """
+
+    def __init__(self, margin=60):
+        """Initialize an empty cache; `margin` seconds are shaved off every expiry."""
+        self.margin = margin
+        self._tokens = {}
+
+    def get(self, key):
+        """Return the cached token for `key`, or None when missing or expired."""
+        token, expires = self._tokens.get(key, (None, 0))
+        if expires <= time.monotonic():
+            return None
+        return token
+
+    def set(self, key, token, timeout=NITRO_SESSION_TIMEOUT):
+        """Store `token` as valid for `timeout` seconds of inactivity."""
+        self._tokens[key] = (token, time.monotonic() + timeout - self.margin)
+
+    def invalidate(self, key, token=None):
+        """Forget the token for `key`, unless it has already been replaced by a newer one."""
+        if token is None or self._tokens.get(key, (None, 0))[0] == token:
+            self._tokens.pop(key, None)
+
+    def clear(self):
+        """Forget every cached token."""
+        self._tokens.clear()
+
+
+session_cache = NitroSessionCache()
+
+
+class NitroClient:  # pylint: disable=too-many-instance-attributes
+    """Nitro API client for one appliance, running on a shared aiohttp session."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        appliance,
+        session,
+        *,
+        token_cache=None,
+        timeout=NITRO_SESSION_TIMEOUT,
+        ssl_context=None,
+        rate_limiter=None,
+        recorder=None,
+        breaker=None,
+        on_item=None,
+    ):
+        """Bind the client to an appliance and a pooled `aiohttp.ClientSession`.
+
+        `on_item(host, resource, item)`, when given, receives the objects of listings as they are
+        decoded, instead of the result keeping them.
+        """
+        self.appliance = appliance
+        self.session = session
+        self.token_cache = token_cache if token_cache is not None else session_cache
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self.rate_limiter = rate_limiter or default_rate_limiter
+        self.recorder = recorder or default_recorder
+        self.breaker = breaker or default_breaker
+        self.on_item = on_item
+        self._login_lock = asyncio.Lock()
+
+    @property
+    def cache_key(self):
+        """Key identifying this appliance session in the token cache."""
+        return (self.appliance.scheme, self.appliance.host, self.appliance.username)
+
+    async def login(self):
+        """Return a valid session token, logging in only when none is cached."""
+        async with self._login_lock:
+            token = self.token_cache.get(self.cache_key)
+            if token:
+                return token
+            payload = {
+                "login": {
+                    "username": self.appliance.username,
+                    "password": self.appliance.password,
+                    "timeout": self.timeout,
+                }
+            }
+            data = await self._request("POST", "login", json=payload)
+            token = data["sessionid"]
+            self.token_cache.set(self.cache_key, token, self.timeout)
+            return token
+
+    async def get_resource(self, resource):
+        """Fetch one Nitro config resource, logging in again once if the session expired."""
+        token = await self.login()
+        try:
+            data = await self._request("GET", resource, token=token)
+        except NitroSessionExpired:
+            self.token_cache.invalidate(self.cache_key, token)
+            token = await self.login()
+            data = await self._request("GET", resource, token=token, retry=True)
+        self.token_cache.set(self.cache_key, token, self.timeout)
+        return data.get(resource)
+
+    async def get_resources(self, resources=DEFAULT_RESOURCES):
+        """Fetch many resources concurrently over the appliance's pooled connections."""
+        result = NitroResult(host=self.appliance.host)
+        try:
+            await self.login()
+        except (NitroError, CircuitOpen, aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            result.errors["login"] = str(exc) or exc.__class__.__name__
+            return result
+        responses = await asyncio.gather(*(self.get_resource(name) for name in resources), return_exceptions=True)
+        for name, response in zip(resources, responses):
+            if isinstance(response, (NitroError, CircuitOpen, aiohttp.ClientError, asyncio.TimeoutError)):
+                result.errors[name] = str(response) or response.__class__.__name__
+            elif isinstance(response, BaseException):
+                raise response
+            else:
+                result.resources[name] = response
+        return result
+
+    @staticmethod
+    async def _decode(response, parser):
+        """Yield the objects of a Nitro listing as `parser` decodes them from the body as it arrives.
+
+        Only the chunk being read and the objects it completed are held, and the other members
+        of the body are stored in `parser.meta`. Raises `StreamParseError` when the body is not JSON.
+        """
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            for item in parser.feed(chunk):
+                yield item
+        for item in parser.close():
+            yield item
+
+    async def _read(self, response, resource):
+        """Return the decoded Nitro body, handing the objects of a listing to `on_item` when set.
+
+        The listing then holds the number of objects handed over rather than the objects, so
+        memory is bounded by one chunk of the body whatever the size of the listing.
+        """
+        parser, items, count = JsonItemParser(resource), [], 0
+        async for item in self._decode(response, parser):
+            if self.on_item is None:
+                items.append(item)
+            else:
+                self.on_item(self.appliance.host, resource, item)
+            count += 1
+        data = parser.meta
+        if parser.streamed:
+            data[resource] = items if self.on_item is None else count
+        return data
+
+    async def _request(self, method, resource, token=None, retry=False, **kwargs):  # pylint: disable=too-many-locals
+        """Send one Nitro call and return its decoded body, raising on Nitro errors."""
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Cookie"] = f"{NITRO_AUTH_COOKIE}={token}"
+        host = self.appliance.host
+        failures = await asyncio.to_thread(self.breaker.before_call, NITRO_PLATFORM, host)
+        start = time.perf_counter()
+        await self.rate_limiter.acquire_async(NITRO_PLATFORM, host)
+        call = {"retry": retry, "throttled": time.perf_counter() - start, "status": 0, "size": 0}
+        try:
+            data, delay = await self._send(method, resource, headers, call, **kwargs)
+        except ValueError as exc:
+            # The appliance answered, but not with JSON, e.g. with the HTML error page of a proxy.
+            await asyncio.to_thread(self.breaker.record, NITRO_PLATFORM, host, call["status"], failures)
+            raise NitroError(f"Invalid Nitro response: {exc}", status=call["status"]) from exc
+        except Exception:
+            await asyncio.to_thread(self.breaker.failure, NITRO_PLATFORM, host)
+            raise
+        status = call["status"]
+        if delay is not None:
+            await asyncio.to_thread(self.rate_limiter.block, NITRO_PLATFORM, host, delay)
+        await asyncio.to_thread(self.breaker.record, NITRO_PLATFORM, host, status, failures, delay is not None)
+        errorcode = data.get("errorcode", 0)
+        if status == 401 or errorcode == NITRO_INVALID_SESSION:
+            raise NitroSessionExpired(data.get("message", "Invalid session"), errorcode, status)
+        if errorcode or status >= 400:
+            raise NitroError(data.get("message", f"HTTP {status}"), errorcode, status)
+        return data
+
+    async def _send(self, method, resource, headers, call, **kwargs):
+        """Send one Nitro call, returning its decoded body and `Retry-After` delay.
+
+        The call is recorded with its duration, including decoding the body, and the size
+        announced by `Content-Length`; `call` holds the other fields recorded and receives the status.
+        """
+        url = f"{self.appliance.base_url}/{resource}"
+        if self.ssl_context is not None:
+            ssl = self.ssl_context
+        else:
+            ssl = None if self.appliance.verify_ssl else False
+        sent = time.perf_counter()
+        try:
+            async with self.session.request(method, url, headers=headers, ssl=ssl, **kwargs) as response:
+                call.update(status=response.status, size=response.content_length or 0)
+                data = await self._read(response, resource)
+                delay = retry_after(response.status, response.headers.get("Retry-After"))
+        finally:
+            endpoint = f"{NITRO_CONFIG_PATH}/{resource}"
+            duration = time.perf_counter() - sent
+            self.recorder.record(NITRO_PLATFORM, self.appliance.host, method, endpoint, duration=duration, **call)
+        return data, delay
+
+
+async def collect(  # pylint: disable=too-many-arguments,too-many-locals
+    appliances,
+    resources=DEFAULT_RESOURCES,
+    *,
+    concurrency=200,
+    per_appliance=4,
+    request_timeout=60,
+    keepalive_timeout=NITRO_SESSION_TIMEOUT,
+    token_cache=None,
+    pool=None,
+    rate_limiter=None,
+    recorder=None,
+    breaker=None,
+    session=None,
+    on_item=None,
+):
+    """Collect `resources` from every appliance concurrently.
+
+    Args:
+        appliances (Iterable[NitroAppliance]): Appliances to collect from.
+        resources (Iterable[str]): Nitro config resource names to fetch from each appliance.
+        concurrency (int): Maximum number of appliances being collected at the same time.
+        per_appliance (int): Maximum number of concurrent, kept-alive connections per appliance.
+        request_timeout (int): Total timeout, in seconds, for a single Nitro call.
+        keepalive_timeout (int): Seconds an idle pooled connection is kept open.
+        token_cache (NitroSessionCache): Token cache to use instead of the process-wide one.
+        pool (SessionPool): Session pool providing the keep-alive timeout and per-host TLS contexts.
+        rate_limiter (RateLimiter): Limiter charged before every call instead of the process-wide one.
+        recorder (ApiCallRecorder): Recorder of every call instead of the process-wide one.
+        breaker (CircuitBreaker): Circuit breaker consulted before every call instead of the process-wide one.
+        session (aiohttp.ClientSession): Session, and connection pool, to collect over, such as the one of a
+            `NitroEngine`. It is left open, and `per_appliance`, `request_timeout` and `keepalive_timeout`
+            are ignored. A session of its own is opened and closed when None.
+        on_item (Callable): Called as `on_item(host, resource, item)`, on the event loop, with every object
+            of a listing as soon as it is decoded. The results then hold the number of objects of each
+            listing instead of the objects, and a resource reported as failed may have handed over part
+            of its objects. The results keep every object when None.
+
+    Returns:
+        list[NitroResult]: One result per appliance, in input order.
+    """
+    resources = tuple(resources)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def _collect_one(session, appliance):
+        async with slots:
+            ssl_context = None
+            if pool is not None and appliance.scheme == "https":
+                ssl_context = pool.ssl_context(appliance.host, appliance.verify_ssl)
+            client = NitroClient(
+                appliance,
+                session,
+                token_cache=token_cache,
+                ssl_context=ssl_context,
+                rate_limiter=rate_limiter,
+                recorder=recorder,
+                breaker=breaker,
+                on_item=on_item,
+            )
+            return await client.get_resources(resources)
+
+    if session is not None:
+        return await asyncio.gather(*(_collect_one(session, appliance) for appliance in appliances))
+    if pool is not None:
+        keepalive_timeout = pool.keepalive
+    async with open_session(concurrency * per_appliance, per_appliance, keepalive_timeout, request_timeout) as session:
+        return await asyncio.gather(*(_collect_one(session, appliance) for appliance in appliances))
+
+
+def open_session(limit, per_appliance, keepalive_timeout, request_timeout):
+    """Return an `aiohttp.ClientSession` keeping at most `per_appliance` connections per appliance alive.
+
+    Must be called from a running event loop. The session never stores cookies: the session
+    token is sent explicitly with every call.
+    """
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=per_appliance, keepalive_timeout=keepalive_timeout)
+    timeout = aiohttp.ClientTimeout(total=request_timeout)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, cookie_jar=aiohttp.DummyCookieJar())
+
+
+class NitroEngine:  # pylint: disable=too-many-instance-attributes
+    """Event loop running in a thread of its own, with one aiohttp session kept open across collections.
+
+    `asyncio.run()` would build a new event loop, and a new connection pool, for every call.
+    Collections from any thread of the process instead run on the engine's loop, so
+    connections to an appliance kept alive by one backup are reused by the next. The engine
+    is rebuilt after a fork, so Celery prefork workers never share a loop or sockets.
+    """
+
+    def __init__(self, limit=800, per_appliance=4, keepalive_timeout=60, request_timeout=60):
+        """Initialize the engine; its loop and session are started on first use."""
+        self.limit = limit
+        self.per_appliance = per_appliance
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        self._loop = None
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Return the running `(loop, session)`, starting them when needed."""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="nitro-engine", daemon=True).start()
+                self._session = asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+                self._loop, self._pid = loop, os.getpid()
+            return self._loop, self._session
+
+    async def _open(self):
+        """Open the session on the engine's loop."""
+        return open_session(self.limit, self.per_appliance, self.keepalive_timeout, self.request_timeout)
+
+    def run(self, function, *args, **kwargs):
+        """Run the coroutine `function(*args, session=..., **kwargs)` on the engine's loop and return its result."""
+        loop, session = self.start()
+        return asyncio.run_coroutine_threadsafe(function(*args, session=session, **kwargs), loop).result()
+
+    def collect(self, appliances, **kwargs):
+        """Collect `appliances` as `collect` does, over the engine's session, and wait for the results."""
+        return self.run(collect, appliances, **kwargs)
+
+    def close(self):
+        """Close the session and stop the loop; the next collection starts them again."""
+        with self._lock:
+            loop, session = self._loop, self._session
+            if loop is not None and self._pid == os.getpid():
+                asyncio.run_coroutine_threadsafe(session.close(), loop).result()
+                loop.call_soon_threadsafe(loop.stop)
+            self._loop = self._session = self._pid = None
+
+
+_engine = None  # pylint: disable=invalid-name
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the process-wide `NitroEngine`, keeping connections alive as long as the `connection_pool` setting."""
+    global _engine  # pylint: disable=global-statement
+    with _engine_lock:
+        if _engine is None:
+            _engine = NitroEngine(keepalive_timeout=get_app_setting("connection_pool")["keepalive"])
+            atexit.register(_engine.close)
+        return _engine
+
+
+def collect_appliances(appliances, engine=None, **kwargs):
+    """Synchronous entry point to `collect`, for use from jobs and Nornir tasks.
+
+    Collections run on `engine`, the process-wide `NitroEngine` by default, and share its connections.
+    """
+    return (engine or get_engine()).collect(appliances, **kwargs)
+
+
+class NitroDriver(BaseDriver):
+    """Registry driver for NetScaler, running the asyncio engine for one or many appliances."""
+
+    platform = NITRO_PLATFORM
+
+    def __init__(self, host, username=None, password=None, *, resources=DEFAULT_RESOURCES, **kwargs):
+        """Initialize the driver for the appliance at `host`."""
+        super().__init__(host, username, password, **kwargs)
+        self.resources = tuple(resources)
+
+    @property
+    def appliance(self):
+        """Connection details handed to the asyncio engine."""
+        return NitroAppliance(self.host, self.username, self.password, scheme=self.scheme, verify_ssl=self.verify_ssl)
+
+    def fingerprints(self, targets=None):
+        """Fingerprint the appliance with the `lastconfigchangedtime` reported by `nsconfig`."""
+        (result,) = collect_appliances(
+            [self.appliance],
+            resources=("nsconfig",),
+            pool=self.pool,
+            rate_limiter=self.rate_limiter,
+            recorder=self.recorder,
+            breaker=self.breaker,
+        )
+        nsconfig = result.resources.get("nsconfig")
+        # Nitro returns singleton resources as an object, but some releases wrap them in a list.
+        if isinstance(nsconfig, list):
+            nsconfig = nsconfig[0] if nsconfig else None
+        changed = (nsconfig or {}).get("lastconfigchangedtime")
+        return {self.host: (FingerprintSourceChoices.REVISION, changed)} if changed else {}
+
+    def plan_calls(self, targets=None, devices=0):
+        """Return the login, the `nsconfig` fingerprint and one GET per resource.
+
+        Sessions are cached per process, so the worker running the backup logs in once at most.
+        """
+        calls = Counter({("POST", f"{NITRO_CONFIG_PATH}/login"): 1})
+        for resource in ("nsconfig", *self.resources):
+            calls["GET", f"{NITRO_CONFIG_PATH}/{resource}"] += 1
+        return calls
+
+    def collect(self, targets=None):
+        """Yield `(host, resources)` for this appliance; `targets` is ignored as an appliance is its own target."""
+        (result,) = self.collect_many([self])
+        if result.failed:
+            raise NitroError(f"Collection from {result.host} failed: {result.errors}")
+        yield result.host, result.resources
+
+    @classmethod
+    def collect_many(cls, drivers):
+        """Collect many appliances concurrently on the process-wide `NitroEngine`.
+
+        Drivers sharing their resources, pool, rate limiter, recorder and breaker are collected
+        together, and groups with another configuration concurrently alongside them.
+
+        Returns:
+            list[NitroResult]: One result per driver, in input order, with the errors of the
+                appliances that failed.
+        """
+        drivers = list(drivers)
+        if not drivers:
+            return []
+        groups = {}
+        for index, driver in enumerate(drivers):
+            key = (driver.resources, driver.pool, driver.rate_limiter, driver.recorder, driver.breaker)
+            groups.setdefault(key, []).append((index, driver))
+
+        async def _collect_groups(session):
+            collections = (
+                collect(
+                    [driver.appliance for _, driver in members],
+                    resources=resources,
+                    pool=pool,
+                    rate_limiter=rate_limiter,
+                    recorder=recorder,
+                    breaker=breaker,
+                    session=session,
+                )
+                for (resources, pool, rate_limiter, recorder, breaker), members in groups.items()
+            )
+            return await asyncio.gather(*collections)
+
+        results = [None] * len(drivers)
+        for members, group_results in zip(groups.values(), get_engine().run(_collect_groups)):
+            for (index, _), result in zip(members, group_results):
+                results[index] = result
+        return results
@@ -0,0 +1,116 @@
+"""Per-process HTTP connection pools shared by every API driver."""
+
+import os
+import socket
+import ssl
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from ipa.utils import get_app_setting
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter with a bounded pool, TCP keep-alive probes and one TLS context per host."""
+
+    def __init__(self, ssl_context=None, keepalive=60, **kwargs):
+        """Initialize the adapter; `keepalive` is the idle time, in seconds, before TCP keep-alive probes."""
+        self.ssl_context = ssl_context
+        self.keepalive = keepalive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        """Enable TCP keep-alive on every pooled socket."""
+        options = [*HTTPConnection.default_socket_options, (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, self.keepalive))
+        super().init_poolmanager(connections, maxsize, block, socket_options=options, **pool_kwargs)
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        """Use the host's shared TLS context instead of building one per connection."""
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        if self.ssl_context is not None and host_params["scheme"] == "https" and cert is None:
+            pool_kwargs["ssl_context"] = self.ssl_context
+        return host_params, pool_kwargs
+
+
+class SessionPool:
+    """One `requests.Session`, with its own bounded connection pool, per controller host.
+
+    Drivers for the same controller share the session, so threads reuse warm kept-alive
+    TCP/TLS connections instead of connecting once per device. Sessions never store
+    cookies: drivers authenticate every request explicitly, which keeps sharing safe.
+    The pool is rebuilt after a fork, so Celery prefork workers never share sockets.
+    """
+
+    def __init__(self, pool_size=20, keepalive=60, block=True):
+        """Initialize an empty pool of at most `pool_size` connections per host."""
+        self.pool_size = pool_size
+        self.keepalive = keepalive
+        self.block = block
+        self._sessions = {}
+        self._ssl_contexts = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        """Drop sessions inherited from a parent process."""
+        if self._pid != os.getpid():
+            self._sessions, self._ssl_contexts, self._pid = {}, {}, os.getpid()
+
+    def ssl_context(self, host, verify_ssl=True):
+        """Return the TLS context shared by every connection to `host`."""
+        with self._lock:
+            self._check_fork()
+            key = (host, verify_ssl)
+            if key not in self._ssl_contexts:
+                context = ssl.create_default_context()
+                if not verify_ssl:
+                    context.check_hostname = False
+                    context.verify_mode = ssl.CERT_NONE
+                self._ssl_contexts[key] = context
+            return self._ssl_contexts[key]
+
+    def get_session(self, scheme, host, verify_ssl=True):
+        """Return the pooled session for `scheme://host`, creating it on first use."""
+        context = self.ssl_context(host, verify_ssl) if scheme == "https" else None
+        with self._lock:
+            self._check_fork()
+            key = (scheme, host, verify_ssl)
+            if key not in self._sessions:
+                session = requests.Session()
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = PooledAdapter(
+                    ssl_context=context,
+                    keepalive=self.keepalive,
+                    pool_connections=1,
+                    pool_maxsize=self.pool_size,
+                    pool_block=self.block,
+                )
+                session.mount(f"{scheme}://", adapter)
+                self._sessions[key] = session
+            return self._sessions[key]
+
+    def close(self):
+        """Close every pooled connection."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_pool = None  # pylint: disable=invalid-name
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide session pool configured by the `connection_pool` setting."""
+    global _pool  # pylint: disable=global-statement
+    with _pool_lock:
+        if _pool is None:
+            options = get_app_setting("connection_pool")
+            _pool = SessionPool(pool_size=options["pool_size"], keepalive=options["keepalive"])
+        return _pool
@@ -0,0 +1,174 @@
+"""Distributed token-bucket rate limiting shared by every API driver."""
+
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from functools import cached_property
+
+from django_redis import get_redis_connection
+
+from ipa.utils import get_app_setting
+
+RATE_LIMIT_PREFIX = "ipa:ratelimit"
+# Statuses a controller uses to throttle; 503 only counts when it carries Retry-After.
+THROTTLED_STATUS = 429
+UNAVAILABLE_STATUS = 503
+
+# Refill and charge one bucket atomically, using the Redis clock so every worker agrees on time.
+#   KEYS[1]  bucket hash
+#   ARGV[1]  refill rate in tokens per second
+#   ARGV[2]  bucket size (burst)
+#   ARGV[3]  tokens to take, 0 to only read the bucket
+#   ARGV[4]  seconds to block the bucket for (Retry-After), 0 for none
+# Returns the seconds to wait before the tokens can be taken (0 when taken) and the tokens left.
+BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local block = tonumber(ARGV[4])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts", "blocked_until")
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+local blocked_until = tonumber(state[3]) or 0
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+if block > 0 then
+    blocked_until = math.max(blocked_until, now + block)
+end
+local wait = 0
+if blocked_until > now then
+    wait = blocked_until - now
+elseif tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now), "blocked_until", tostring(blocked_until))
+local ttl = math.max(burst / rate, blocked_until - now) + 1
+redis.call("PEXPIRE", KEYS[1], math.ceil(ttl * 1000))
+return {tostring(wait), tostring(tokens)}
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when no request slot frees up within the limiter's `max_wait`."""
+
+
+def retry_after(status, value, default=1.0):
+    """Return the seconds a throttled response asks us to back off, or None if it was not throttled.
+
+    Args:
+        status (int): HTTP status of the response.
+        value (str): The `Retry-After` header, either delta-seconds or an HTTP date.
+        default (float): Back-off used for a 429 without a usable `Retry-After`.
+    """
+    if status != THROTTLED_STATUS and not (status == UNAVAILABLE_STATUS and value):
+        return None
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class RateLimiter:
+    """Token buckets in Redis, one per platform and controller (or organization).
+
+    Every worker and thread charges the same bucket before calling a controller, so the
+    fleet as a whole stays under the controller's limit instead of each thread backing off
+    on its own after a 429. A `Retry-After` from any worker blocks the bucket for everyone.
+    Limits come from the `rate_limits` setting, falling back to its `default` entry.
+    """
+
+    def __init__(self, client=None, limits=None, max_wait=300):
+        """Initialize the limiter; `client` defaults to the Redis connection behind the Django cache."""
+        self._client = client
+        self._limits = limits
+        self.max_wait = max_wait
+
+    @cached_property
+    def client(self):
+        """Redis client holding the buckets."""
+        return self._client or get_redis_connection("default")
+
+    @cached_property
+    def _script(self):
+        return self.client.register_script(BUCKET_SCRIPT)
+
+    def limit(self, platform):
+        """Return the `{"rate": ..., "burst": ...}` limit applied to `platform`."""
+        limits = self._limits if self._limits is not None else get_app_setting("rate_limits")
+        return limits.get(platform) or limits["default"]
+
+    @staticmethod
+    def key(platform, key):
+        """Redis key of the bucket for `key` on `platform`."""
+        return f"{RATE_LIMIT_PREFIX}:{platform}:{key}"
+
+    def _call(self, platform, key, requested=1, block=0):
+        """Run the bucket script, returning `(seconds to wait, tokens left)`."""
+        limit = self.limit(platform)
+        wait, tokens = self._script(
+            keys=[self.key(platform, key)], args=[limit["rate"], limit["burst"], requested, block]
+        )
+        return float(wait), float(tokens)
+
+    def try_acquire(self, platform, key):
+        """Take one token if available; return 0, or the seconds to wait before trying again."""
+        return self._call(platform, key)[0]
+
+    def acquire(self, platform, key):
+        """Block until a token is taken from the bucket for `key`."""
+        deadline = time.monotonic() + self.max_wait
+        while wait := self.try_acquire(platform, key):
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(f"No {platform} request slot for {key} within {self.max_wait}s")
+            time.sleep(wait)
+
+    async def acquire_async(self, platform, key):
+        """Wait, without blocking the event loop, until a token is taken from the bucket for `key`."""
+        deadline = time.monotonic() + self.max_wait
+        while wait := await asyncio.to_thread(self.try_acquire, platform, key):
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(f"No {platform} request slot for {key} within {self.max_wait}s")
+            await asyncio.sleep(wait)
+
+    def block(self, platform, key, seconds):
+        """Stop every worker from calling `key` for `seconds`, as asked by a `Retry-After` header."""
+        if seconds and seconds > 0:
+            self._call(platform, key, requested=0, block=seconds)
+
+    def utilization(self, platform, key):
+        """Return the current state of the bucket for `key`.
+
+        `utilization` is the share of the burst in use: 0 means idle, 1 means requests are
+        being paced at the configured rate. `blocked_for` is the remaining Retry-After delay.
+        """
+        limit = self.limit(platform)
+        blocked_for, tokens = self._call(platform, key, requested=0)
+        return {
+            "platform": platform,
+            "key": key,
+            "rate": limit["rate"],
+            "burst": limit["burst"],
+            "tokens": round(tokens, 3),
+            "utilization": round(1 - tokens / limit["burst"], 3),
+            "blocked_for": round(blocked_for, 3),
+        }
+
+    def usage(self):
+        """Return the state of every active bucket, across all workers."""
+        buckets = []
+        for name in self.client.scan_iter(match=f"{RATE_LIMIT_PREFIX}:*", count=500):
+            _, _, platform, key = name.decode().split(":", 3)
+            buckets.append(self.utilization(platform, key))
+        return sorted(buckets, key=lambda bucket: (bucket["platform"], bucket["key"]))
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,61 @@
+"""Registry mapping Nautobot network drivers to ipa API platform drivers."""
+
+import threading
+
+from django.utils.module_loading import import_string
+
+from ipa.utils import get_app_setting
+
+
+class DriverNotFound(KeyError):
+    """Raised when no driver is registered for a platform."""
+
+
+class DriverRegistry:
+    """Resolve API platform drivers by network driver name.
+
+    Drivers come from the `drivers` setting, a `{network_driver: "dotted.path.Driver"}`
+    mapping, and from `register()` calls made by other apps. Dotted paths are imported
+    on first use.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._drivers = {}
+        self._lock = threading.Lock()
+
+    def register(self, platform, driver_class):
+        """Register `driver_class` for `platform`, replacing any configured driver."""
+        with self._lock:
+            self._drivers[platform] = driver_class
+
+    def platforms(self):
+        """Return every platform with a configured or registered driver."""
+        return sorted({*get_app_setting("drivers"), *self._drivers})
+
+    def get(self, platform):
+        """Return the driver class for `platform`."""
+        with self._lock:
+            if platform not in self._drivers:
+                path = get_app_setting("drivers").get(platform)
+                if path is None:
+                    raise DriverNotFound(platform)
+                self._drivers[platform] = import_string(path)
+            return self._drivers[platform]
+
+    def create(self, platform, host, username=None, password=None, **options):
+        """Instantiate the driver for `platform` against `host`."""
+        return self.get(platform)(host, username, password, **options)
+
+
+registry = DriverRegistry()
+
+
+def register_driver(platform):
+    """Class decorator registering an API driver for `platform`."""
+
+    def decorator(driver_class):
+        registry.register(platform, driver_class)
+        return driver_class
+
+    return decorator
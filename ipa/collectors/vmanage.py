@@ -0,0 +1,166 @@
+"""Cisco vManage API client backed by a worker-shared session cache."""
+
+import threading
+from collections import Counter
+
+from django.core.cache import cache as default_cache
+
+from ipa.collectors.base import BaseDriver
+
+# vManage expires idle sessions after 30 minutes; refresh well before that.
+VMANAGE_SESSION_TIMEOUT = 20 * 60
+SESSION_CACHE_PREFIX = "ipa:vmanage:session"
+
+
+class VManageError(Exception):
+    """Raised when vManage rejects a login or an API call."""
+
+
+class VManageSessionCache:
+    """Share vManage JSESSIONID/XSRF token pairs between threads, workers and hosts.
+
+    Sessions live in the Django cache, which is Redis-backed in Nautobot, so one login per
+    vManage and user serves every Celery worker. Logins are serialized with a cache lock
+    so an expiry does not make every worker log in at the same time.
+    """
+
+    def __init__(self, cache=None, timeout=VMANAGE_SESSION_TIMEOUT, lock_timeout=60):
+        """Initialize the session cache on top of a Django cache backend."""
+        self.cache = cache or default_cache
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self._local_lock = threading.Lock()
+
+    @staticmethod
+    def key(host, username):
+        """Cache key of the session for `username` on `host`."""
+        return f"{SESSION_CACHE_PREFIX}:{host}:{username}"
+
+    def get(self, host, username):
+        """Return the cached `{"jsessionid": ..., "token": ...}` session, if any."""
+        return self.cache.get(self.key(host, username))
+
+    def set(self, host, username, session):
+        """Store a freshly authenticated session."""
+        self.cache.set(self.key(host, username), session, self.timeout)
+
+    def touch(self, host, username):
+        """Push back the expiry of a session that was just used successfully."""
+        self.cache.touch(self.key(host, username), self.timeout)
+
+    def invalidate(self, host, username, session):
+        """Drop `session`, unless another worker has already replaced it."""
+        if self.get(host, username) == session:
+            self.cache.delete(self.key(host, username))
+
+    def lock(self, host, username):
+        """Return a lock serializing logins for `username` on `host` across workers."""
+        if hasattr(self.cache, "lock"):
+            return self.cache.lock(f"{self.key(host, username)}:lock", timeout=self.lock_timeout)
+        return self._local_lock
+
+
+session_cache = VManageSessionCache()
+
+
+class VManageClient(BaseDriver):
+    """Minimal vManage REST client that logs in only when the shared session is missing or expired."""
+
+    platform = "cisco_vmanage"
+
+    def __init__(self, host, username=None, password=None, *, token_cache=None, **kwargs):
+        """Initialize the client for one vManage controller."""
+        super().__init__(host, username, password, **kwargs)
+        self.token_cache = token_cache or session_cache
+
+    def _authenticate(self):
+        """Log in with `j_security_check` and fetch the XSRF token, returning the new session."""
+        response = self.request(
+            "POST",
+            "/j_security_check",
+            data={"j_username": self.username, "j_password": self.password},
+            allow_redirects=False,
+        )
+        jsessionid = response.cookies.get("JSESSIONID")
+        # A failed login answers 200 with the HTML login page instead of an error status.
+        if not response.ok or not jsessionid or b"<html" in response.content.lower():
+            raise VManageError(f"Login to {self.host} as {self.username} failed")
+        response = self.request("GET", "/dataservice/client/token", cookies={"JSESSIONID": jsessionid})
+        if not response.ok:
+            raise VManageError(f"Fetching the XSRF token from {self.host} returned {response.status_code}")
+        return {"jsessionid": jsessionid, "token": response.text.strip()}
+
+    def login(self, stale=None):
+        """Return the shared session, logging in only if it is missing or equal to `stale`."""
+        session = self.token_cache.get(self.host, self.username)
+        if session and session != stale:
+            return session
+        with self.token_cache.lock(self.host, self.username):
+            # Another worker may have logged in while we were waiting for the lock.
+            session = self.token_cache.get(self.host, self.username)
+            if session and session != stale:
+                return session
+            session = self._authenticate()
+            self.token_cache.set(self.host, self.username, session)
+            return session
+
+    @staticmethod
+    def _is_expired(response):
+        """Whether vManage rejected the session, either with 401/403 or by serving the login page."""
+        return response.status_code in (401, 403) or "text/html" in response.headers.get("Content-Type", "")
+
+    def dataservice(self, method, path, **kwargs):
+        """Send an authenticated `/dataservice` request, logging in again once if the shared session expired."""
+        session = self.login()
+        response = self._send(method, path, session, **kwargs)
+        if self._is_expired(response):
+            self.token_cache.invalidate(self.host, self.username, session)
+            session = self.login(stale=session)
+            response = self._send(method, path, session, retry=True, **kwargs)
+        if not response.ok or self._is_expired(response):
+            raise VManageError(f"{method} {path} on {self.host} returned {response.status_code}")
+        self.token_cache.touch(self.host, self.username)
+        return response
+
+    def _send(self, method, path, session, retry=False, **kwargs):
+        """Send one request carrying the session cookie and XSRF token."""
+        headers = {**kwargs.pop("headers", {}), "X-XSRF-TOKEN": session["token"]}
+        return self.request(
+            method,
+            f"/dataservice/{path.lstrip('/')}",
+            retry=retry,
+            headers=headers,
+            cookies={"JSESSIONID": session["jsessionid"]},
+            **kwargs,
+        )
+
+    @classmethod
+    def device_target(cls, device):
+        """Return the primary IP address of `device`, expected to be its system IP."""
+        return str(device.primary_ip.host) if device.primary_ip else None
+
+    def get_devices(self):
+        """Return the inventory of every device managed by this vManage."""
+        return self.dataservice("GET", "device").json()["data"]
+
+    def get_device_config(self, device_id):
+        """Return the running configuration of the device with system IP `device_id`."""
+        return self.dataservice("GET", "device/config", params={"deviceId": device_id}).text
+
+    def collect(self, targets=None):
+        """Yield `(system_ip, running_config)` for `targets`, or for every managed device."""
+        if targets is None:
+            targets = [device["system-ip"] for device in self.get_devices() if device.get("system-ip")]
+        for device_id in targets:
+            yield device_id, self.get_device_config(device_id)
+
+    def plan_calls(self, targets=None, devices=0):
+        """Return the login, unless a session is shared, the inventory when needed and one config GET per device."""
+        calls = Counter()
+        if not self.token_cache.get(self.host, self.username):
+            calls["POST", "/j_security_check"] += 1
+            calls["GET", "/dataservice/client/token"] += 1
+        if targets is None:
+            calls["GET", "/dataservice/device"] += 1
+        calls["GET", "/dataservice/device/config"] += devices if targets is None else len(targets)
+        return calls
@@ -0,0 +1,48 @@
+"""Driver for WTI (Western Telematic Inc.) console servers and power controllers."""
+
+from collections import Counter
+
+from ipa.choices import FingerprintSourceChoices
+from ipa.collectors.base import BaseDriver
+
+WTI_CONFIG_PATH = "/api/v2/config"
+DEFAULT_SECTIONS = ("hostname", "interface", "serialports", "syslog", "snmpaccess")
+
+
+class WtiError(Exception):
+    """Raised when a WTI device rejects an API call."""
+
+
+class WtiDriver(BaseDriver):
+    """Collect the configuration sections of one WTI device over its RESTful API."""
+
+    platform = "wti"
+
+    def __init__(self, host, username=None, password=None, *, sections=DEFAULT_SECTIONS, **kwargs):
+        """Initialize the driver for the WTI device at `host`."""
+        super().__init__(host, username, password, **kwargs)
+        self.sections = tuple(sections)
+
+    def get_section(self, section):
+        """Return one decoded configuration section."""
+        response = self.request("GET", f"{WTI_CONFIG_PATH}/{section}", auth=(self.username, self.password))
+        if not response.ok:
+            raise WtiError(f"GET {section} on {self.host} returned {response.status_code}")
+        return response.json()
+
+    def fingerprints(self, targets=None):
+        """Fingerprint the device with the ETag of its configuration, when it sends one."""
+        response = self.request("HEAD", WTI_CONFIG_PATH, auth=(self.username, self.password))
+        etag = response.headers.get("ETag")
+        return {self.host: (FingerprintSourceChoices.ETAG, etag)} if response.ok and etag else {}
+
+    def collect(self, targets=None):
+        """Yield `(host, {section: data})` for this device; a WTI device is its own only target."""
+        yield self.host, {section: self.get_section(section) for section in self.sections}
+
+    def plan_calls(self, targets=None, devices=0):
+        """Return the ETag check and the GET of every configuration section."""
+        calls = Counter({("HEAD", WTI_CONFIG_PATH): 1})
+        for section in self.sections:
+            calls["GET", self.endpoint(f"{WTI_CONFIG_PATH}/{section}")] += 1
+        return calls
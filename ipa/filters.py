@@ -1,13 +1,19 @@
 """Filtering for ipa."""
 
-from nautobot.apps.filters import NameSearchFilterSet, NautobotFilterSet
+from nautobot.apps.filters import BaseFilterSet, NaturalKeyOrPKMultipleChoiceFilter, NautobotFilterSet, SearchFilter
+from nautobot.dcim.models import Device
 
 from ipa import models
+from ipa.collectors.registry import DriverNotFound, registry
 
 
-class IpaExampleModelFilterSet(NautobotFilterSet, NameSearchFilterSet):  # pylint: disable=too-many-ancestors
+class IpaExampleModelFilterSet(NautobotFilterSet):  # pylint: disable=too-many-ancestors
     """Filter for IpaExampleModel."""
 
+    # On PostgreSQL, `icontains` compares `UPPER(field)`, which the trigram GIN indexes of
+    # migration 0005 cover, so searches do not scan the table.
+    q = SearchFilter(filter_predicates={"name": "icontains", "description": "icontains"})
+
     class Meta:
         """Meta attributes for filter."""
 
@@ -15,3 +21,71 @@ class IpaExampleModelFilterSet(NautobotFilterSet, NameSearchFilterSet):  # pylin
 
         # add any fields from the model that you would like to filter your searches by using those
         fields = ["id", "name", "description"]
+
+
+class ApiCallSummaryFilterSet(BaseFilterSet):
+    """Filter for ApiCallSummary."""
+
+    class Meta:
+        """Meta attributes for filter."""
+
+        model = models.ApiCallSummary
+        fields = ["id", "job_result", "platform", "controller", "method", "endpoint"]
+
+
+def device_targets(device):
+    """Return the targets `device` may be recorded under.
+
+    These are its name and serial number, the host of its primary IP that devices with their
+    own API are backed up through, and the target the driver of its controller identifies it by.
+    """
+    targets = {device.name, device.serial}
+    if device.primary_ip:
+        targets.add(str(device.primary_ip.host))
+    group = device.controller_managed_device_group
+    platform = (group.controller.platform if group is not None else None) or device.platform
+    if platform is not None and platform.network_driver:
+        try:
+            targets.add(registry.get(platform.network_driver).device_target(device))
+        except DriverNotFound:
+            pass
+    return targets - {None, ""}
+
+
+class DeviceTargetFilterSet(BaseFilterSet):
+    """Base filter for models identifying a device by the `target` of an API controller."""
+
+    device = NaturalKeyOrPKMultipleChoiceFilter(
+        queryset=Device.objects.select_related(
+            "platform", "primary_ip4", "primary_ip6", "controller_managed_device_group__controller__platform"
+        ),
+        to_field_name="name",
+        method="filter_device",
+        label="Device (name or ID), matched with the target its driver records it under",
+    )
+
+    def filter_device(self, queryset, name, value):  # pylint: disable=unused-argument
+        """Return the objects whose target identifies one of the devices in `value`."""
+        if not value:
+            return queryset
+        return queryset.filter(target__in={target for device in value for target in device_targets(device)})
+
+
+class DeviceFingerprintFilterSet(DeviceTargetFilterSet):
+    """Filter for DeviceFingerprint."""
+
+    class Meta:
+        """Meta attributes for filter."""
+
+        model = models.DeviceFingerprint
+        fields = ["id", "platform", "controller", "target", "source"]
+
+
+class ConfigSnapshotFilterSet(DeviceTargetFilterSet):
+    """Filter for ConfigSnapshot."""
+
+    class Meta:
+        """Meta attributes for filter."""
+
+        model = models.ConfigSnapshot
+        fields = ["id", "platform", "controller", "target", "collected"]
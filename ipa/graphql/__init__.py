@@ -0,0 +1 @@
+"""GraphQL schema types for ipa."""
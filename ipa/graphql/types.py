@@ -0,0 +1,101 @@
+"""GraphQL types of ipa models with batched relations.
+
+The list fields of Nautobot's schema load their objects with one query, optimized with the
+hints of the selected fields. The relations between fingerprints and snapshots share no
+foreign key, so their hints prefetch them with `KeyedRelation`: whatever the number of
+objects listed, each selected relation adds one query, like a DataLoader batching the
+lookups of every object.
+"""
+
+import graphene
+import graphene_django_optimizer as gql_optimizer
+from django.db.models import Prefetch
+from graphene.types.generic import GenericScalar
+from graphene_django_optimizer.query import QueryOptimizer
+from nautobot.core.graphql.types import OptimizedNautobotObjectType
+
+from ipa import filters, models
+from ipa.snapshots import SnapshotStore
+
+
+def prefetch_keyed(name, model):
+    """Return a `prefetch_related` hint loading the `KeyedRelation` `name` of the objects listed.
+
+    The related objects are restricted to those the user may view and load the relations
+    selected under the field in turn.
+    """
+
+    def hint(info, *args):  # pylint: disable=unused-argument
+        # Only the joins and prefetches of the nested selections: deferring fields would defer
+        # the key fields matching the related objects with the objects listed.
+        store = QueryOptimizer(info)._optimize_gql_selections(  # pylint: disable=protected-access
+            info.return_type, info.field_nodes[0]
+        )
+        queryset = model.objects.restrict(info.context.user, "view")
+        return Prefetch(
+            name, queryset=queryset.select_related(*store.select_list).prefetch_related(*store.prefetch_list)
+        )
+
+    return hint
+
+
+class DeviceTargetType(OptimizedNautobotObjectType):
+    """Base type for models identifying a device by the `target` of an API controller."""
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """Meta attributes for type."""
+
+        abstract = True
+
+    def resolve_url(self, info):  # pylint: disable=unused-argument
+        """Return None, ipa has no REST endpoint for these objects."""
+        return None
+
+
+class DeviceFingerprintType(DeviceTargetType):
+    """GraphQL type for DeviceFingerprint."""
+
+    latest_snapshot = graphene.Field(lambda: ConfigSnapshotType)
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """Meta attributes for type."""
+
+        model = models.DeviceFingerprint
+        filterset_class = filters.DeviceFingerprintFilterSet
+        fields = "__all__"
+
+    @gql_optimizer.resolver_hints(
+        prefetch_related=prefetch_keyed("latest_snapshot", models.ConfigSnapshot), only=models.DEVICE_KEY
+    )
+    def resolve_latest_snapshot(self, info):  # pylint: disable=unused-argument
+        """Return the latest snapshot of the device."""
+        return self.latest_snapshot
+
+
+class ConfigSnapshotType(DeviceTargetType):
+    """GraphQL type for ConfigSnapshot; the configuration is decompressed into `config`."""
+
+    fingerprint = graphene.Field(DeviceFingerprintType)
+    config = GenericScalar()
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """Meta attributes for type."""
+
+        model = models.ConfigSnapshot
+        filterset_class = filters.ConfigSnapshotFilterSet
+        exclude = ["blob"]
+
+    @gql_optimizer.resolver_hints(
+        prefetch_related=prefetch_keyed("fingerprint", models.DeviceFingerprint), only=models.DEVICE_KEY
+    )
+    def resolve_fingerprint(self, info):  # pylint: disable=unused-argument
+        """Return the fingerprint of the device."""
+        return self.fingerprint
+
+    @gql_optimizer.resolver_hints(select_related="blob", only="blob")
+    def resolve_config(self, info):  # pylint: disable=unused-argument
+        """Return the configuration recorded by the snapshot."""
+        return SnapshotStore.load(self)
+
+
+graphql_types = [DeviceFingerprintType, ConfigSnapshotType]
@@ -0,0 +1,178 @@
+"""Jobs for ipa."""
+
+from celery import current_app, group
+from django.utils import timezone
+from nautobot.apps.jobs import BooleanVar, Job, JSONVar, MultiObjectVar, register_jobs
+from nautobot.dcim.filters import DeviceFilterSet
+from nautobot.dcim.models import Device
+from nautobot.extras.choices import JobResultStatusChoices
+from nautobot.extras.models import JobResult
+
+from ipa.checkpoints import carry_over
+from ipa.models import CollectionCheckpoint
+from ipa.planning import plan_collection
+from ipa.sharding import backup_devices, collect_shard, merge_results, plan_shards
+from ipa.utils import get_app_setting
+
+name = "Ipa"  # pylint: disable=invalid-name
+
+# Statuses of job results whose run has not finished, and may still checkpoint devices.
+RUNNING_STATUSES = (
+    JobResultStatusChoices.STATUS_PENDING,
+    JobResultStatusChoices.STATUS_RECEIVED,
+    JobResultStatusChoices.STATUS_STARTED,
+    JobResultStatusChoices.STATUS_RETRY,
+)
+
+
+class ShardedBackup(Job):
+    """Back up devices through their APIs, sharded by controller across Celery workers."""
+
+    devices = MultiObjectVar(
+        model=Device,
+        required=False,
+        description="Devices to back up; every device with an API driver when empty",
+    )
+    force = BooleanVar(default=False, description="Fetch and write every device, ignoring stored fingerprints")
+    resume = BooleanVar(
+        default=False, description="Only back up the devices the last run left unfinished, if it did not succeed"
+    )
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """Meta attributes for job."""
+
+        name = "API backup"
+        description = "Back up devices through their controller or device APIs, one Celery task per shard."
+        has_sensitive_variables = False
+
+    def run(self, devices=None, force=False, resume=False):  # pylint: disable=arguments-differ
+        """Plan the shards, collect them in parallel and merge their results."""
+        settings = get_app_setting("collection_shards")
+        queryset = backup_devices()
+        if devices:
+            queryset = queryset.filter(pk__in=[device.pk for device in devices])
+        if resume:
+            queryset = self.resume_from_last_run(queryset)
+            if queryset is None:
+                return None
+        shards = plan_shards(queryset, settings["shard_size"])
+        if not shards:
+            self.logger.warning("No device to back up")
+            return merge_results([])
+        self.logger.info("Backing up %d devices in %d shards", sum(len(shard) for shard in shards), len(shards))
+
+        job_queue = self.celery_kwargs.get("queue") or current_app.conf.task_default_queue
+        queue = settings["queue"] or job_queue
+        if queue == job_queue and not current_app.conf.task_always_eager:
+            # The job blocks its worker process until the shards finish. Jobs filling every process
+            # of the queue would wait for shards queued behind them, and never finish.
+            self.fail(
+                "Shards would be queued behind this job on the %s queue: set collection_shards.queue "
+                "to a queue served by other workers",
+                queue,
+            )
+            return None
+        collected = timezone.now().isoformat()
+        tasks = group(
+            collect_shard.s([str(pk) for pk in shard], collected, str(self.job_result.pk), force).set(queue=queue)
+            for shard in shards
+        )
+        shard_results = tasks.apply_async().get(timeout=settings["timeout"], disable_sync_subtasks=False)
+
+        for results in shard_results:
+            for result in results:
+                if "error" in result:
+                    self.logger.error("Backup of %s failed: %s", result["controller"], result["error"])
+        summary = merge_results(shard_results)
+        self.logger.info(
+            "Backed up %(controllers)d controllers: %(changed)d devices changed, %(unchanged)d unchanged "
+            "and %(skipped)d skipped, %(failed)d controllers failed",
+            summary,
+        )
+        if summary["failed"]:
+            self.fail("%d of %d controllers failed", summary["failed"], summary["controllers"])
+        return summary
+
+    def resume_from_last_run(self, queryset):
+        """Carry the checkpoints of the last run over to this one and return `queryset` without their devices.
+
+        Only a run that finished without succeeding is resumed. Returns None, failing the job, while
+        another run is in progress, as its checkpoints are not final.
+        """
+        runs = JobResult.objects.filter(job_model=self.job_result.job_model).exclude(pk=self.job_result.pk)
+        running = runs.filter(status__in=RUNNING_STATUSES).order_by("-date_created").first()
+        if running is not None:
+            self.fail("%s is still running: resume once it has finished", running)
+            return None
+        previous = runs.order_by("-date_created").first()
+        if previous is None or previous.status == JobResultStatusChoices.STATUS_SUCCESS:
+            self.logger.info("The last run finished, backing up every device")
+            return queryset
+        done = carry_over(previous, self.job_result)
+        self.logger.info("Resuming %s, where %d devices were backed up", previous, len(done))
+        return queryset.exclude(pk__in=CollectionCheckpoint.objects.filter(job_result=self.job_result).values("device"))
+
+
+class BackupPlan(Job):
+    """Plan an API backup: its shards, API calls, rate-limit budget and expected duration."""
+
+    devices = MultiObjectVar(
+        model=Device,
+        required=False,
+        description="Devices to plan the backup of; every device with an API driver when empty",
+    )
+    device_filter = JSONVar(
+        required=False,
+        description='Device filter parameters narrowing the devices, e.g. {"location": ["Site 1"], "role": ["Leaf"]}',
+    )
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """Meta attributes for job."""
+
+        name = "API backup plan"
+        description = (
+            "Estimate the API calls and duration of an API backup from recorded latencies, without calling controllers."
+        )
+        has_sensitive_variables = False
+        read_only = True
+
+    def run(self, devices=None, device_filter=None):  # pylint: disable=arguments-differ
+        """Plan the backup of the selected devices and log it controller by controller."""
+        queryset = Device.objects.all()
+        if devices:
+            queryset = queryset.filter(pk__in=[device.pk for device in devices])
+        if device_filter:
+            filterset = DeviceFilterSet(device_filter, queryset)
+            if not filterset.is_valid():
+                self.fail("Invalid device filter: %s", filterset.errors.as_text())
+                return None
+            queryset = filterset.qs
+        plan = plan_collection(queryset)
+        for index, shard in enumerate(plan.shards, start=1):
+            for controller in shard:
+                if controller.error:
+                    self.logger.warning("Cannot plan %s: %s", controller.controller, controller.error)
+                elif controller.calls is None:
+                    self.logger.warning(
+                        "The %s driver cannot plan its calls to %s", controller.platform, controller.controller
+                    )
+                else:
+                    self.logger.info(
+                        "Shard %d: %s with %d devices takes %d calls and about %.1f seconds",
+                        index,
+                        controller.controller,
+                        len(controller.devices),
+                        controller.total_calls,
+                        controller.duration,
+                    )
+        summary = plan.as_dict()
+        self.logger.info(
+            "Backing up %(devices)d devices behind %(controllers)d controllers takes %(calls)d calls "
+            "and about %(duration).1f seconds",
+            summary,
+        )
+        return summary
+
+
+jobs = [ShardedBackup, BackupPlan]
+register_jobs(*jobs)
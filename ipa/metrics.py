@@ -0,0 +1,80 @@
+"""Prometheus metrics of ipa, served by Nautobot's `/metrics` endpoint.
+
+Request latency, rate-limit waits, failures and retries of controller API calls are
+observed as they happen, see `ipa.collectors.instrumentation`, as are the devices collected
+by backups. Rate-limit buckets and job queue depths are read from Redis on every scrape
+by the generators in `metrics`, which Nautobot discovers through `IpaConfig.metrics`.
+
+Nautobot also runs the generators once the database is ready, for example after `migrate`,
+to list the metric names: Redis and the broker being unavailable then yields the families
+without samples rather than failing the command.
+"""
+
+import logging
+
+from kombu.exceptions import OperationalError
+from nautobot.core.celery import app as celery_app
+from nautobot.extras.choices import JobQueueTypeChoices
+from nautobot.extras.models import JobQueue
+from prometheus_client import Counter
+from prometheus_client.core import GaugeMetricFamily
+from redis.exceptions import RedisError
+
+from ipa.collectors.ratelimit import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+DEVICES_COLLECTED = Counter(
+    "ipa_devices_collected",
+    "Devices processed by backups, by result: changed, unchanged after fetching, or skipped before fetching.",
+    ("platform", "controller", "result"),
+)
+COLLECTION_FAILURES = Counter(
+    "ipa_collection_failures", "Backups of a controller aborted by an error.", ("platform", "controller")
+)
+
+
+def metric_rate_limits():
+    """Yield the utilization and remaining Retry-After block of every active rate-limit bucket."""
+    utilization = GaugeMetricFamily(
+        "ipa_rate_limit_utilization", "Share of the rate-limit burst in use, from 0 to 1.", labels=["platform", "key"]
+    )
+    blocked = GaugeMetricFamily(
+        "ipa_rate_limit_blocked_seconds",
+        "Remaining Retry-After block of a rate-limit bucket.",
+        labels=["platform", "key"],
+    )
+    try:
+        buckets = rate_limiter.usage()
+    except RedisError as error:
+        logger.warning("Rate-limit buckets are unavailable: %s", error)
+        buckets = []
+    for bucket in buckets:
+        labels = [bucket["platform"], bucket["key"]]
+        utilization.add_metric(labels, bucket["utilization"])
+        blocked.add_metric(labels, bucket["blocked_for"])
+    yield utilization
+    yield blocked
+
+
+def metric_queue_depth():
+    """Yield the number of tasks waiting in every Celery job queue."""
+    depth = GaugeMetricFamily("ipa_job_queue_depth", "Tasks waiting in a Celery job queue.", labels=["queue"])
+    queues = JobQueue.objects.filter(queue_type=JobQueueTypeChoices.TYPE_CELERY).values_list("name", flat=True)
+    with celery_app.connection_for_read() as connection:
+        try:
+            connection.ensure_connection(max_retries=1)
+            channel = connection.default_channel
+            for queue in queues:
+                try:
+                    _, waiting, _ = channel.queue_declare(queue=queue, passive=True)
+                except connection.channel_errors:
+                    # The broker only creates a queue once a task is sent to it.
+                    waiting = 0
+                depth.add_metric([queue], waiting)
+        except (OperationalError, *connection.connection_errors) as error:
+            logger.warning("Job queue depths are unavailable: %s", error)
+    yield depth
+
+
+metrics = [metric_rate_limits, metric_queue_depth]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:18
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ipa", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeviceFingerprint",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True
+                    ),
+                ),
+                ("platform", models.CharField(max_length=50)),
+                ("controller", models.CharField(max_length=255)),
+                ("target", models.CharField(max_length=255)),
+                ("source", models.CharField(max_length=20)),
+                ("fingerprint", models.CharField(max_length=255)),
+                ("last_checked", models.DateTimeField()),
+                ("last_changed", models.DateTimeField()),
+            ],
+            options={
+                "ordering": ["platform", "controller", "target"],
+                "unique_together": {("platform", "controller", "target")},
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:22
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ipa", "0002_devicefingerprint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ConfigBlob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True
+                    ),
+                ),
+                ("digest", models.CharField(max_length=64, unique=True)),
+                ("compression", models.CharField(max_length=10)),
+                ("size", models.PositiveIntegerField()),
+                ("data", models.BinaryField()),
+            ],
+            options={
+                "ordering": ["digest"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ConfigSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True
+                    ),
+                ),
+                ("platform", models.CharField(max_length=50)),
+                ("controller", models.CharField(max_length=255)),
+                ("target", models.CharField(max_length=255)),
+                ("collected", models.DateTimeField()),
+                (
+                    "blob",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT, related_name="snapshots", to="ipa.configblob"
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["platform", "controller", "target", "-collected"],
+                "get_latest_by": "collected",
+                "indexes": [
+                    models.Index(
+                        fields=["platform", "controller", "target", "-collected"], name="ipa_configs_platfor_f1ef89_idx"
+                    )
+                ],
+            },
+        ),
+    ]
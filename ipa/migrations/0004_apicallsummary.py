@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:41
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("extras", "0132_approval_workflow_seed_data"),
+        ("ipa", "0003_configsnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ApiCallSummary",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True
+                    ),
+                ),
+                ("platform", models.CharField(max_length=50)),
+                ("controller", models.CharField(max_length=255)),
+                ("method", models.CharField(max_length=10)),
+                ("endpoint", models.CharField(max_length=255)),
+                ("calls", models.PositiveIntegerField(default=0)),
+                ("errors", models.PositiveIntegerField(default=0)),
+                ("retries", models.PositiveIntegerField(default=0)),
+                ("duration", models.FloatField(default=0)),
+                ("max_duration", models.FloatField(default=0)),
+                ("throttled", models.FloatField(default=0)),
+                ("bytes_received", models.BigIntegerField(default=0)),
+                ("status_codes", models.JSONField(default=dict)),
+                ("last_called", models.DateTimeField()),
+                (
+                    "job_result",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="extras.jobresult",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-duration"],
+                "indexes": [models.Index(fields=["platform", "controller"], name="ipa_apicall_platfor_62a7c2_idx")],
+                "unique_together": {("job_result", "platform", "controller", "method", "endpoint")},
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+"""Trigram GIN indexes serving the `q` search of IpaExampleModel on PostgreSQL.
+
+The indexes cover `UPPER(field)`, the expression compared by Django's `icontains` lookup, so
+substring searches of three or more characters use them instead of scanning the table. They
+are built concurrently so that large tables stay writable. Other databases, PostgreSQL
+servers without the `pg_trgm` extension, and roles not allowed to create it keep searching by
+scanning the table.
+"""
+
+import logging
+
+from django.db import ProgrammingError, migrations
+
+logger = logging.getLogger(__name__)
+
+TABLE = "ipa_ipaexamplemodel"
+SEARCH_FIELDS = ("name", "description")
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Create the pg_trgm extension and the trigram indexes when the database supports them."""
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            logger.warning("The pg_trgm extension is not available, %s searches will scan the table", TABLE)
+            return
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            try:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            except ProgrammingError as error:
+                # The role lacks CREATE on the database, or superuser before PostgreSQL 13. The
+                # migration is not atomic, so the failed statement leaves no aborted transaction.
+                logger.warning("Cannot create the pg_trgm extension, %s searches will scan the table: %s", TABLE, error)
+                return
+        for field in SEARCH_FIELDS:
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {TABLE}_{field}_trgm "  # noqa: S608
+                f"ON {TABLE} USING gin (UPPER({field}) gin_trgm_ops)"
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    """Drop the trigram indexes, leaving the extension to other users of the database."""
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        for field in SEARCH_FIELDS:
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {TABLE}_{field}_trgm")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("ipa", "0004_apicallsummary"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
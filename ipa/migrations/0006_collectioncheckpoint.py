@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:43
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dcim", "0081_alter_device_device_redundancy_group_priority_and_more"),
+        ("extras", "0132_approval_workflow_seed_data"),
+        ("ipa", "0005_ipaexamplemodel_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CollectionCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True
+                    ),
+                ),
+                ("completed", models.DateTimeField()),
+                (
+                    "device",
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to="dcim.device"),
+                ),
+                (
+                    "job_result",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="+", to="extras.jobresult"
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["job_result", "completed"],
+                "unique_together": {("job_result", "device")},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 22:22
+
+from collections import Counter
+
+from django.db import migrations, models
+
+SUM_FIELDS = ("calls", "errors", "retries", "duration", "throttled", "bytes_received")
+
+
+def merge_summaries_without_job(apps, schema_editor):
+    """Merge the summaries without a job recorded more than once for the same endpoint."""
+    ApiCallSummary = apps.get_model("ipa", "ApiCallSummary")  # pylint: disable=invalid-name
+    kept = {}
+    for summary in ApiCallSummary.objects.filter(job_result__isnull=True).order_by("last_called"):
+        key = (summary.platform, summary.controller, summary.method, summary.endpoint)
+        first = kept.setdefault(key, summary)
+        if first is summary:
+            continue
+        for name in SUM_FIELDS:
+            setattr(first, name, getattr(first, name) + getattr(summary, name))
+        first.max_duration = max(first.max_duration, summary.max_duration)
+        first.status_codes = dict(Counter(first.status_codes) + Counter(summary.status_codes))
+        first.last_called = summary.last_called
+        first.save()
+        summary.delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ipa", "0006_collectioncheckpoint"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_summaries_without_job, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="apicallsummary",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("job_result__isnull", True)),
+                fields=("platform", "controller", "method", "endpoint"),
+                name="ipa_apicallsummary_unique_without_job",
+            ),
+        ),
+    ]
@@ -4,17 +4,18 @@
 from django.db import models
 
 # Nautobot imports
-from nautobot.apps.models import PrimaryModel
+from nautobot.apps.models import BaseModel, PrimaryModel, extras_features
 
-# from nautobot.apps.models import extras_features
-# If you want to use the extras_features decorator please reference the following documentation
-# https://docs.nautobot.com/projects/core/en/latest/plugins/development/#using-the-extras_features-decorator-for-graphql
-# Then based on your reading you may decide to put the following decorator before the declaration of your class
-# @extras_features("custom_fields", "custom_validators", "relationships", "graphql")
+from ipa.choices import CompressionChoices, FingerprintSourceChoices
+from ipa.relations import KeyedRelation
+
+# Fields identifying one device behind an API controller.
+DEVICE_KEY = ("platform", "controller", "target")
 
 
 # If you want to choose a specific model to overload in your class declaration, please reference the following documentation:
 # how to chose a database model: https://docs.nautobot.com/projects/core/en/stable/plugins/development/#database-models
+@extras_features("custom_fields", "custom_validators", "relationships", "graphql")
 class IpaExampleModel(PrimaryModel):  # pylint: disable=too-many-ancestors
     """Base model for Ipa app."""
 
@@ -36,3 +37,143 @@ class IpaExampleModel(PrimaryModel):  # pylint: disable=too-many-ancestors
     def __str__(self):
         """Stringify instance."""
         return self.name
+
+
+class DeviceFingerprint(BaseModel):
+    """Last known configuration fingerprint of one device behind an API controller.
+
+    Backups compare the fingerprint reported by the controller with this one and skip
+    the fetch and write steps for devices that have not changed.
+    """
+
+    platform = models.CharField(max_length=50)
+    controller = models.CharField(max_length=255)
+    target = models.CharField(max_length=255)
+    source = models.CharField(max_length=20, choices=FingerprintSourceChoices)
+    fingerprint = models.CharField(max_length=255)
+    last_checked = models.DateTimeField()
+    last_changed = models.DateTimeField()
+
+    latest_snapshot = KeyedRelation("ipa.ConfigSnapshot", DEVICE_KEY, latest_by="collected")
+
+    class Meta:
+        """Meta class."""
+
+        ordering = ["platform", "controller", "target"]
+        unique_together = [["platform", "controller", "target"]]
+
+    def __str__(self):
+        """Stringify instance."""
+        return f"{self.controller} {self.target}"
+
+
+class ConfigBlob(BaseModel):
+    """One distinct configuration, stored once and compressed, addressed by its SHA-256."""
+
+    digest = models.CharField(max_length=64, unique=True)
+    compression = models.CharField(max_length=10, choices=CompressionChoices)
+    size = models.PositiveIntegerField(help_text="Uncompressed size in bytes")
+    data = models.BinaryField()
+
+    class Meta:
+        """Meta class."""
+
+        ordering = ["digest"]
+
+    def __str__(self):
+        """Stringify instance."""
+        return self.digest
+
+
+class ConfigSnapshot(BaseModel):
+    """A device configuration as collected at one point in time.
+
+    Snapshots are only recorded when the configuration differs from the previous one, so
+    the configuration at any time is the latest snapshot collected at or before it.
+    """
+
+    platform = models.CharField(max_length=50)
+    controller = models.CharField(max_length=255)
+    target = models.CharField(max_length=255)
+    collected = models.DateTimeField()
+    blob = models.ForeignKey(to=ConfigBlob, on_delete=models.PROTECT, related_name="snapshots")
+
+    fingerprint = KeyedRelation(DeviceFingerprint, DEVICE_KEY)
+
+    class Meta:
+        """Meta class."""
+
+        ordering = ["platform", "controller", "target", "-collected"]
+        get_latest_by = "collected"
+        indexes = [models.Index(fields=["platform", "controller", "target", "-collected"])]
+
+    def __str__(self):
+        """Stringify instance."""
+        return f"{self.controller} {self.target} @ {self.collected.isoformat()}"
+
+
+class ApiCallSummary(BaseModel):
+    """API calls to one endpoint of one controller, aggregated over one job.
+
+    Summaries of calls made outside a job have no `job_result`. As NULLs never collide in a
+    unique index, a constraint of their own keeps them to one per endpoint. Sorting by
+    `duration` surfaces the endpoints and controllers a job spent its time on.
+    """
+
+    job_result = models.ForeignKey(
+        to="extras.JobResult", on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+    platform = models.CharField(max_length=50)
+    controller = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    endpoint = models.CharField(max_length=255, help_text="Request path with object identifiers replaced by {id}")
+    calls = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0, help_text="Calls failing to connect or answered with 4xx/5xx")
+    retries = models.PositiveIntegerField(default=0, help_text="Calls repeating an earlier call")
+    duration = models.FloatField(default=0, help_text="Total seconds spent waiting for responses")
+    max_duration = models.FloatField(default=0, help_text="Slowest call, in seconds")
+    throttled = models.FloatField(default=0, help_text="Total seconds spent waiting for the rate limiter")
+    bytes_received = models.BigIntegerField(default=0)
+    status_codes = models.JSONField(default=dict, help_text="Number of calls per HTTP status, 0 for no response")
+    last_called = models.DateTimeField()
+
+    class Meta:
+        """Meta class."""
+
+        ordering = ["-duration"]
+        unique_together = [["job_result", "platform", "controller", "method", "endpoint"]]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["platform", "controller", "method", "endpoint"],
+                condition=models.Q(job_result__isnull=True),
+                name="ipa_apicallsummary_unique_without_job",
+            )
+        ]
+        indexes = [models.Index(fields=["platform", "controller"])]
+
+    def __str__(self):
+        """Stringify instance."""
+        return f"{self.method} {self.controller}{self.endpoint}"
+
+    @property
+    def mean_duration(self):
+        """Average seconds per call."""
+        return self.duration / self.calls if self.calls else 0.0
+
+
+class CollectionCheckpoint(BaseModel):
+    """A device whose backup completed during a job, so that resuming the job skips it."""
+
+    job_result = models.ForeignKey(to="extras.JobResult", on_delete=models.CASCADE, related_name="+")
+    device = models.ForeignKey(to="dcim.Device", on_delete=models.CASCADE, related_name="+")
+    completed = models.DateTimeField()
+
+    class Meta:
+        """Meta class."""
+
+        ordering = ["job_result", "completed"]
+        unique_together = [["job_result", "device"]]
+
+    def __str__(self):
+        """Stringify instance."""
+        return f"{self.device_id} @ {self.job_result_id}"
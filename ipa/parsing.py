@@ -0,0 +1,156 @@
+"""Incremental parsers for large controller responses."""
+
+import codecs
+import json
+import re
+
+from defusedxml.ElementTree import iterparse
+
+# Bytes read from a response per chunk while streaming.
+CHUNK_SIZE = 64 * 1024
+WHITESPACE_RE = re.compile(r"[ \t\n\r]*")
+
+
+class StreamParseError(ValueError):
+    """Raised when a streamed response is not the JSON document it should be."""
+
+
+class JsonItemParser:  # pylint: disable=too-many-instance-attributes
+    """Push parser yielding the items of one top-level array of a JSON object as they arrive.
+
+    Controllers wrap listings in an object such as `{"totalCount": "2", "imdata": [...]}`.
+    The items of the array under `key` are decoded one at a time and handed back from
+    `feed()`, so only the item being decoded is buffered. Every other top-level member is
+    small and is kept in `meta`.
+    """
+
+    def __init__(self, key, meta=None):
+        """Initialize the parser for the array under `key`; other members are stored in `meta`."""
+        self.key = key
+        self.meta = {} if meta is None else meta
+        self.streamed = False
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._state = "start"
+        self._member = None
+        # Length the buffer must reach before retrying a value that did not decode yet, so an
+        # item split over many chunks is decoded in amortized linear time.
+        self._retry_at = 0
+
+    def feed(self, data):
+        """Add a chunk of the document and return the array items it completed."""
+        self._buffer += self._text.decode(data) if isinstance(data, bytes) else data
+        if len(self._buffer) < self._retry_at:
+            return []
+        return self._parse(final=False)
+
+    def close(self):
+        """Signal the end of the document, returning any remaining items."""
+        self._buffer += self._text.decode(b"", final=True)
+        items = self._parse(final=True)
+        if self._state not in ("start", "done"):
+            raise StreamParseError(f"Truncated JSON document while reading {self.key!r}")
+        return items
+
+    def _decode(self, pos, final):
+        """Decode the value at `pos`, returning `(value, end)` or None when it is not complete yet."""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError as exc:
+            if final:
+                raise StreamParseError(str(exc)) from exc
+            self._retry_at = 2 * (len(self._buffer) - pos)
+            return None
+        # A number running to the end of the buffer may continue in the next chunk.
+        if end == len(self._buffer) and isinstance(value, (int, float)) and not final:
+            self._retry_at = len(self._buffer) - pos + 1
+            return None
+        self._retry_at = 0
+        return value, end
+
+    def _parse(self, final):  # pylint: disable=too-many-branches
+        """Consume as much of the buffer as possible, returning the array items completed."""
+        items, pos = [], 0
+        while self._state != "done":
+            pos = WHITESPACE_RE.match(self._buffer, pos).end()
+            if pos == len(self._buffer):
+                break
+            char = self._buffer[pos]
+            if self._state == "start":
+                if char != "{":
+                    raise StreamParseError(f"Expected a JSON object, got {char!r}")
+                self._state, pos = "member", pos + 1
+            elif self._state == "member" and char in ",}":
+                self._state = "done" if char == "}" else "member"
+                pos += 1
+            elif self._state == "member":
+                decoded = self._decode(pos, final)
+                if decoded is None:
+                    break
+                self._member, pos = decoded
+                if not isinstance(self._member, str):
+                    raise StreamParseError(f"Expected a member name, got {self._member!r}")
+                self._state = "colon"
+            elif self._state == "colon":
+                if char != ":":
+                    raise StreamParseError(f"Expected ':' after {self._member!r}, got {char!r}")
+                self._state, pos = "value", pos + 1
+            elif self._state == "value" and self._member == self.key and char == "[":
+                self._state, self.streamed, pos = "items", True, pos + 1
+            elif self._state == "items" and char in ",]":
+                self._state = "member" if char == "]" else "items"
+                pos += 1
+            else:
+                decoded = self._decode(pos, final)
+                if decoded is None:
+                    break
+                value, pos = decoded
+                if self._state == "items":
+                    items.append(value)
+                else:
+                    self.meta[self._member] = value
+                    self._state = "member"
+        self._buffer = self._buffer[pos:]
+        return items
+
+
+def iter_json_items(chunks, key, meta=None):
+    """Yield the items of the array under `key` from an iterable of JSON document chunks.
+
+    Args:
+        chunks (Iterable[bytes | str]): The document, in pieces, e.g. `response.iter_content(CHUNK_SIZE)`.
+        key (str): Top-level member holding the array to stream.
+        meta (dict): Filled in place with the other top-level members as they are read.
+    """
+    parser = JsonItemParser(key, meta)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def iter_xml_elements(source, meta=None):
+    """Yield each child of the root element of an XML document as soon as it is complete.
+
+    Parsing goes through defusedxml, so entity expansion and external references are
+    refused. Yielded elements are cleared and dropped from the tree once the consumer moves
+    on, keeping memory bounded by the largest single child.
+
+    Args:
+        source (file-like): Binary stream of the document, e.g. `response.raw`.
+        meta (dict): Filled in place with the attributes of the root element.
+    """
+    depth, root = 0, None
+    for event, element in iterparse(source, events=("start", "end")):
+        if event == "start":
+            if depth == 0:
+                root = element
+                if meta is not None:
+                    meta.update(element.attrib)
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            yield element
+            element.clear()
+            root.remove(element)
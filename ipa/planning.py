@@ -0,0 +1,207 @@
+"""Plans of API backups: the calls they make, their rate-limit budget and their expected duration.
+
+A plan packs devices into the same shards as the API backup job and asks the driver of
+each controller for the calls its backup makes, so calls shared by every device behind a
+controller (logins, inventories, organization listings) are counted once. Durations are
+estimated from the latencies recorded in `ApiCallSummary`. Planning never calls a controller.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.db.models import Count, Sum
+
+from ipa.collectors.ratelimit import rate_limiter
+from ipa.models import ApiCallSummary
+from ipa.sharding import backup_devices, controller_key, controller_of, create_driver, plan_shards
+from ipa.utils import get_app_setting
+
+
+class LatencyHistory:  # pylint: disable=too-few-public-methods
+    """Mean seconds per call of every endpoint, from the calls recorded in `ApiCallSummary`.
+
+    An endpoint never called on a controller gets the mean of the endpoint across its
+    platform, then the mean of every call to the platform, then `default`.
+    """
+
+    def __init__(self, platforms, default=None):
+        """Load the recorded calls of `platforms`."""
+        self.default = get_app_setting("planner_default_latency") if default is None else default
+        self.controllers = {}
+        endpoints, platform_totals = defaultdict(lambda: [0, 0.0]), defaultdict(lambda: [0, 0.0])
+        rows = (
+            ApiCallSummary.objects.filter(platform__in=platforms, calls__gt=0)
+            .order_by()
+            .values("platform", "controller", "method", "endpoint")
+            .annotate(total_calls=Sum("calls"), total_duration=Sum("duration"))
+        )
+        for row in rows:
+            calls, duration = row["total_calls"], row["total_duration"]
+            self.controllers[row["platform"], row["controller"], row["method"], row["endpoint"]] = duration / calls
+            for totals in (
+                endpoints[row["platform"], row["method"], row["endpoint"]],
+                platform_totals[row["platform"]],
+            ):
+                totals[0] += calls
+                totals[1] += duration
+        self.endpoints = {key: duration / calls for key, (calls, duration) in endpoints.items()}
+        self.platforms = {key: duration / calls for key, (calls, duration) in platform_totals.items()}
+
+    def mean(self, platform, controller, method, endpoint):
+        """Return the expected seconds of one call to `endpoint` of `controller`."""
+        for mean in (
+            self.controllers.get((platform, controller, method, endpoint)),
+            self.endpoints.get((platform, method, endpoint)),
+            self.platforms.get(platform),
+        ):
+            if mean is not None:
+                return mean
+        return self.default
+
+
+@dataclass
+class ControllerPlan:
+    """The calls backing up the devices behind one controller, or the `error` preventing it."""
+
+    platform: str
+    controller: str
+    devices: list
+    calls: dict = None
+    error: str = None
+    latency: float = 0.0
+    throttled: float = 0.0
+
+    @property
+    def total_calls(self):
+        """Number of calls planned; 0 when the driver cannot tell."""
+        return sum((self.calls or {}).values())
+
+    @property
+    def duration(self):
+        """Expected seconds: waiting for responses, or for the rate limiter when it holds the calls back longer."""
+        return max(self.latency, self.throttled)
+
+    def estimate(self, history):
+        """Set the expected `latency` from `history` and the `throttled` time from the rate limit."""
+        if not self.calls:
+            return
+        self.latency = sum(
+            count * history.mean(self.platform, self.controller, method, endpoint)
+            for (method, endpoint), count in self.calls.items()
+        )
+        limit = rate_limiter.limit(self.platform)
+        self.throttled = max(0, self.total_calls - limit["burst"]) / limit["rate"]
+
+    def as_dict(self):
+        """Return the plan as JSON-serializable data."""
+        calls = self.calls
+        if calls is not None:
+            calls = {f"{method} {endpoint}": count for (method, endpoint), count in calls.items()}
+        data = {
+            "platform": self.platform,
+            "controller": self.controller,
+            "devices": [str(pk) for pk in self.devices],
+            "calls": calls,
+            "total_calls": self.total_calls,
+            "duration": round(self.duration, 3),
+        }
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+@dataclass
+class CollectionPlan:
+    """Shards of an API backup, each a list of `ControllerPlan` backed up one after the other."""
+
+    shards: list = field(default_factory=list)
+
+    @property
+    def controllers(self):
+        """Every `ControllerPlan`, shard by shard."""
+        return [controller for shard in self.shards for controller in shard]
+
+    @staticmethod
+    def shard_duration(shard):
+        """Expected seconds of a shard, whose controllers are backed up in turn."""
+        return sum(controller.duration for controller in shard)
+
+    @property
+    def duration(self):
+        """Expected seconds of the backup, with a worker free for every shard."""
+        return max((self.shard_duration(shard) for shard in self.shards), default=0.0)
+
+    def as_dict(self):
+        """Return the plan as JSON-serializable data, listing the devices of every shard."""
+        return {
+            "devices": sum(len(controller.devices) for controller in self.controllers),
+            "controllers": len(self.controllers),
+            "calls": sum(controller.total_calls for controller in self.controllers),
+            "duration": round(self.duration, 3),
+            "shards": [
+                {
+                    "duration": round(self.shard_duration(shard), 3),
+                    "controllers": [controller.as_dict() for controller in shard],
+                }
+                for shard in self.shards
+            ],
+        }
+
+
+def controller_sizes(devices):
+    """Return `{controller pk: number of devices}` counting every device behind the controllers of `devices`."""
+    controllers = {controller.pk for controller in map(controller_of, devices) if controller is not None}
+    counts = (
+        backup_devices()
+        .filter(controller_managed_device_group__controller__in=controllers)
+        .order_by()
+        .values_list("controller_managed_device_group__controller")
+        .annotate(count=Count("pk"))
+    )
+    return dict(counts)
+
+
+def plan_controller(devices, sizes):
+    """Return the `ControllerPlan` of `devices`, which share one controller, without its estimates."""
+    controller = controller_of(devices[0])
+    size = sizes.get(controller.pk, len(devices)) if controller is not None else len(devices)
+    plan = ControllerPlan(platform=None, controller=devices[0].name, devices=[device.pk for device in devices])
+    try:
+        driver, targets = create_driver(devices)
+        plan.platform, plan.controller = driver.platform, driver.host
+        plan.calls = driver.plan_calls(targets, size)
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        plan.error = f"{type(error).__name__}: {error}"
+    return plan
+
+
+def plan_collection(devices, shard_size=None, history=None):
+    """Plan the API backup of `devices`, a `Device` queryset such as the one of a filter set.
+
+    Devices without an API driver are left out. Shards are planned as `plan_shards()` does
+    for the API backup job, with `collection_shards.shard_size` devices at most by default.
+
+    Args:
+        devices (QuerySet[Device]): Devices to back up.
+        shard_size (int): Devices per shard.
+        history (LatencyHistory): Latencies to estimate durations with, loaded for the
+            platforms planned when None.
+
+    Returns:
+        (CollectionPlan): The shards, controller by controller.
+    """
+    devices = list(backup_devices().filter(pk__in=devices.values("pk")))
+    shard_size = shard_size or get_app_setting("collection_shards")["shard_size"]
+    by_pk = {device.pk: device for device in devices}
+    sizes = controller_sizes(devices)
+    plan = CollectionPlan()
+    for pks in plan_shards(devices, shard_size):
+        controllers = defaultdict(list)
+        for pk in pks:
+            controllers[controller_key(by_pk[pk])].append(by_pk[pk])
+        plan.shards.append([plan_controller(members, sizes) for members in controllers.values()])
+    if history is None:
+        history = LatencyHistory({controller.platform for controller in plan.controllers})
+    for controller in plan.controllers:
+        controller.estimate(history)
+    return plan
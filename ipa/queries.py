@@ -0,0 +1,79 @@
+"""Compiled JMESPath expressions shared by every collector and compliance feature."""
+
+import json
+import threading
+from functools import lru_cache
+
+import jmespath
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(expression):
+    """Return the compiled form of a JMESPath `expression`, parsing each distinct expression once per process."""
+    return jmespath.compile(expression)
+
+
+def search(expression, data):
+    """Evaluate `expression` against `data` with the cached compiled expression."""
+    return compile_expression(expression).search(data)
+
+
+class QueryBatch:  # pylint: disable=too-few-public-methods
+    """Many named expressions evaluated against one document in a single pass.
+
+    The expressions are combined into one multiselect hash, `{"name": (expression), ...}`,
+    compiled once, so extracting every field of a feature costs one evaluation call instead
+    of one parse and one call per field.
+    """
+
+    def __init__(self, expressions):
+        """Compile `expressions`, a `{name: expression}` mapping."""
+        self.expressions = dict(expressions)
+        combined = ", ".join(f"{json.dumps(name)}: ({expression})" for name, expression in self.expressions.items())
+        self._expression = compile_expression(f"{{{combined}}}") if self.expressions else None
+
+    def search(self, data):
+        """Return `{name: result}` for every expression evaluated against `data`."""
+        if self._expression is None:
+            return {}
+        # A multiselect hash evaluated against null is null rather than a hash of nulls.
+        return self._expression.search(data) or dict.fromkeys(self.expressions)
+
+
+class QueryRegistry:
+    """Named JMESPath expressions, validated and compiled when they are registered.
+
+    Collectors and compliance features register the fields they extract under dotted names
+    such as `cisco_apic.interfaces`, so an invalid expression fails at import time rather
+    than on the first device, and every caller shares the same compiled expression.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._expressions = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, expression):
+        """Register `expression` under `name`, raising `jmespath.exceptions.ParseError` if it is invalid."""
+        compile_expression(expression)
+        with self._lock:
+            self._expressions[name] = expression
+
+    def names(self, prefix=""):
+        """Return the registered names starting with `prefix`."""
+        return sorted(name for name in self._expressions if name.startswith(prefix))
+
+    def get(self, name):
+        """Return the compiled expression registered under `name`."""
+        return compile_expression(self._expressions[name])
+
+    def search(self, name, data):
+        """Evaluate the expression registered under `name` against `data`."""
+        return self.get(name).search(data)
+
+    def batch(self, names):
+        """Return a `QueryBatch` of the expressions registered under `names`."""
+        return QueryBatch({name: self._expressions[name] for name in names})
+
+
+queries = QueryRegistry()
@@ -0,0 +1,77 @@
+"""Relations between ipa models sharing key fields rather than a foreign key."""
+
+from django.apps import apps
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+class KeyedRelation:
+    """Descriptor returning the object of another model with the same values of `fields`, or None.
+
+    Fingerprints and snapshots both identify a device by `(platform, controller, target)`, so
+    they relate without a foreign key. `latest_by` picks the object with the greatest value of
+    that field when several share a key. Accessing the descriptor runs one query per instance;
+    `prefetch_related()` loads the related objects of every instance of a queryset at once.
+    """
+
+    def __init__(self, to, fields, latest_by=None):
+        """Relate to model `to`, a class or an `app_label.ModelName` string, on `fields`."""
+        self.to = to
+        self.fields = tuple(fields)
+        self.latest_by = latest_by
+        self.name = None
+        self.cache_name = None
+
+    def __set_name__(self, owner, name):
+        """Name the attribute caching the related object after the descriptor."""
+        self.name = name
+        self.cache_name = f"_{name}_cache"
+
+    @property
+    def related_model(self):
+        """Return the related model class."""
+        return apps.get_model(self.to) if isinstance(self.to, str) else self.to
+
+    def key(self, obj):
+        """Return the values of the key fields of `obj`."""
+        return tuple(getattr(obj, field) for field in self.fields)
+
+    def related_queryset(self, instances, queryset=None):
+        """Return the related objects of `instances`, at most one per key."""
+        if queryset is None:
+            queryset = self.related_model._default_manager.all()  # pylint: disable=protected-access
+        keys = {self.key(instance) for instance in instances}
+        # A superset of the keys, filtered on each field with an indexable IN; objects of
+        # other key combinations are ignored when matched with the instances.
+        queryset = queryset.filter(
+            **{f"{field}__in": {key[index] for key in keys} for index, field in enumerate(self.fields)}
+        )
+        if self.latest_by:
+            queryset = queryset.annotate(
+                _keyed_rank=Window(
+                    RowNumber(),
+                    partition_by=[F(field) for field in self.fields],
+                    order_by=F(self.latest_by).desc(),
+                )
+            ).filter(_keyed_rank=1)
+        return queryset
+
+    def is_cached(self, instance):
+        """Return whether the related object of `instance` is loaded."""
+        return hasattr(instance, self.cache_name)
+
+    def get_prefetch_queryset(self, instances, queryset=None):
+        """Return the query loading the related objects of `instances`, for `prefetch_related()`."""
+        return (self.related_queryset(instances, queryset), self.key, self.key, True, self.cache_name, True)
+
+    def get_prefetch_querysets(self, instances, querysets=None):
+        """Return `get_prefetch_queryset()` with the signature of Django 5."""
+        return self.get_prefetch_queryset(instances, querysets[0] if querysets else None)
+
+    def __get__(self, instance, owner=None):
+        """Return the related object of `instance`, loading it if needed."""
+        if instance is None:
+            return self
+        if not self.is_cached(instance):
+            setattr(instance, self.cache_name, self.related_queryset([instance]).first())
+        return getattr(instance, self.cache_name)
@@ -0,0 +1,180 @@
+"""Backups split into shards of whole controllers, collected by parallel Celery tasks.
+
+Devices managed by a Nautobot controller (a Meraki organization, a vManage, an APIC fabric)
+are backed up through that controller, other devices through their own API. Shards never
+split a controller, so each controller is logged into and paged through by a single task,
+while small controllers are packed together up to `collection_shards.shard_size` devices.
+"""
+
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from nautobot.core.celery import nautobot_task
+from nautobot.dcim.models import Device
+from nautobot.extras.choices import SecretsGroupAccessTypeChoices, SecretsGroupSecretTypeChoices
+from nautobot.extras.models import JobResult
+
+from ipa.api_calls import record_api_calls
+from ipa.backups import IncrementalBackup
+from ipa.checkpoints import Checkpointer
+from ipa.collectors.registry import registry
+from ipa.snapshots import SnapshotStore
+
+
+def backup_devices(platforms=None):
+    """Return the devices with an API driver, directly or through their controller."""
+    platforms = registry.platforms() if platforms is None else platforms
+    return Device.objects.filter(
+        Q(platform__network_driver__in=platforms)
+        | Q(controller_managed_device_group__controller__platform__network_driver__in=platforms)
+    ).select_related(
+        "platform",
+        "primary_ip4",
+        "primary_ip6",
+        "secrets_group",
+        "controller_managed_device_group__controller__platform",
+        "controller_managed_device_group__controller__external_integration__secrets_group",
+    )
+
+
+def controller_of(device):
+    """Return the Nautobot controller managing `device`, or None for devices with their own API."""
+    group = device.controller_managed_device_group
+    return group.controller if group is not None else None
+
+
+def controller_key(device):
+    """Return the key shared by `device` and every other device backed up through the same API."""
+    controller = controller_of(device)
+    return ("controller", controller.pk) if controller is not None else ("device", device.pk)
+
+
+def plan_shards(devices, shard_size):
+    """Return lists of device primary keys, each holding whole controllers and at most `shard_size` devices.
+
+    A controller managing more than `shard_size` devices gets a shard of its own. Others are
+    packed, largest first, into the emptiest shard they fit in.
+    """
+    controllers = defaultdict(list)
+    for device in devices:
+        controllers[controller_key(device)].append(device.pk)
+    shards = []
+    for pks in sorted(controllers.values(), key=len, reverse=True):
+        fitting = [shard for shard in shards if len(shard) + len(pks) <= shard_size]
+        if fitting:
+            min(fitting, key=len).extend(pks)
+        else:
+            shards.append(list(pks))
+    return shards
+
+
+def get_secret(secrets_group, secret_type, device):
+    """Return the HTTP secret of `secret_type` in `secrets_group` for `device`, None when not set."""
+    try:
+        return secrets_group.get_secret_value(SecretsGroupAccessTypeChoices.TYPE_HTTP, secret_type, obj=device)
+    except (AttributeError, ObjectDoesNotExist):
+        return None
+
+
+def get_credentials(secrets_group, device):
+    """Return the HTTP `(username, password)` of `secrets_group` for `device`."""
+    return (
+        get_secret(secrets_group, SecretsGroupSecretTypeChoices.TYPE_USERNAME, device),
+        get_secret(secrets_group, SecretsGroupSecretTypeChoices.TYPE_PASSWORD, device),
+    )
+
+
+def create_driver(devices):
+    """Return the driver backing up `devices`, which share one controller, and their targets.
+
+    The targets are None when the controller is backed up as a whole: for devices with their
+    own API, and when a device has no target its driver can identify it by.
+    """
+    device = devices[0]
+    controller = controller_of(device)
+    if controller is None:
+        platform = device.platform.network_driver
+        host = str(device.primary_ip.host) if device.primary_ip else device.name
+        username, password = get_credentials(device.secrets_group, device)
+        return registry.create(platform, host, username, password), None
+
+    platform = (controller.platform or device.platform).network_driver
+    integration = controller.external_integration
+    options = {}
+    if integration is None:
+        host, username, password = controller.name, None, None
+    else:
+        url = urlsplit(integration.remote_url)
+        host = url.netloc or controller.name
+        username, password = get_credentials(integration.secrets_group, device)
+        options = {
+            "verify_ssl": integration.verify_ssl,
+            "timeout": integration.timeout,
+            **(integration.extra_config or {}),
+        }
+        if url.scheme:
+            options["scheme"] = url.scheme
+    driver_class = registry.get(platform)
+    targets = [driver_class.device_target(member) for member in devices]
+    driver = registry.create(platform, host, username, password, **options)
+    return driver, (None if None in targets else sorted(set(targets)))
+
+
+@nautobot_task(name="ipa.collect_shard")
+def collect_shard(device_pks, collected, job_result_pk=None, force=False):  # pylint: disable=too-many-locals
+    """Back up the devices of one shard, controller by controller.
+
+    Devices are checkpointed under the job result as their targets are done, or all at once
+    when their controller is backed up as a whole.
+
+    Args:
+        device_pks (list[str]): Devices of the shard, as planned by `plan_shards()`.
+        collected (str): ISO 8601 time the snapshots are recorded at, shared by every shard.
+        job_result_pk (str): Job result the API calls are recorded under.
+        force (bool): Fetch and write every target, ignoring stored fingerprints.
+
+    Returns:
+        (list[dict]): Per controller, its `platform`, `controller` host and the targets
+            `changed`, `skipped` and `unchanged`, or the `error` aborting its backup.
+    """
+    controllers = defaultdict(list)
+    for device in backup_devices().filter(pk__in=device_pks):
+        controllers[controller_key(device)].append(device)
+    job_result = JobResult.objects.filter(pk=job_result_pk).first() if job_result_pk else None
+    store = SnapshotStore()
+    checkpointer = Checkpointer(job_result)
+    results = []
+    with record_api_calls(job_result):
+        for devices in controllers.values():
+            result = {"platform": None, "controller": devices[0].name, "changed": [], "skipped": [], "unchanged": []}
+            try:
+                driver, targets = create_driver(devices)
+                result.update(platform=driver.platform, controller=driver.host)
+                progress = None if targets is None else checkpointer.for_targets(devices, driver.device_target)
+                writer = store.writer(driver, parse_datetime(collected))
+                summary = IncrementalBackup(driver, writer, force, progress).run(targets)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                result["error"] = f"{type(error).__name__}: {error}"
+            else:
+                result.update(changed=summary.changed, skipped=summary.skipped, unchanged=summary.unchanged)
+                if targets is None:
+                    checkpointer.add(device.pk for device in devices)
+            results.append(result)
+            checkpointer.flush()
+    return results
+
+
+def merge_results(shard_results):
+    """Merge the results of every shard into `{"controllers", "changed", "skipped", "unchanged", "failed"}` totals."""
+    summary = {"controllers": 0, "changed": 0, "skipped": 0, "unchanged": 0, "failed": 0}
+    for results in shard_results:
+        for result in results:
+            summary["controllers"] += 1
+            if "error" in result:
+                summary["failed"] += 1
+            for key in ("changed", "skipped", "unchanged"):
+                summary[key] += len(result[key])
+    return summary
@@ -0,0 +1,112 @@
+"""Content-addressed, compressed store of device configuration snapshots."""
+
+import gzip
+import hashlib
+import json
+import logging
+
+from django.db import IntegrityError, transaction
+
+from ipa.backups import canonical_json
+from ipa.choices import CompressionChoices
+from ipa.models import ConfigBlob, ConfigSnapshot
+from ipa.utils import get_app_setting
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+def compress(data, compression):
+    """Compress `data` with `compression`."""
+    if compression == CompressionChoices.ZSTD:
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def decompress(data, compression):
+    """Decompress `data` stored with `compression`."""
+    if compression == CompressionChoices.ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Reading zstd-compressed snapshots requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class SnapshotStore:
+    """Store device configurations as a deduplicated, time-indexed history.
+
+    Each distinct configuration is stored once, compressed, in a `ConfigBlob` keyed by the
+    SHA-256 of its canonical JSON. A `ConfigSnapshot` row is only added when a device's
+    configuration differs from its latest snapshot, so storage grows with distinct
+    configurations rather than with runs times devices. Any snapshot is read with one
+    indexed query joining its blob.
+    """
+
+    def __init__(self, compression=None):
+        """Initialize the store; `compression` defaults to the `snapshot_compression` setting."""
+        compression = compression or get_app_setting("snapshot_compression")
+        if compression == CompressionChoices.ZSTD and zstandard is None:
+            logger.warning("snapshot_compression is zstd but the zstandard package is not installed, using gzip")
+            compression = CompressionChoices.GZIP
+        self.compression = compression
+
+    def put_blob(self, payload):
+        """Return the blob holding `payload`, storing it if this configuration is new."""
+        data = canonical_json(payload)
+        digest = hashlib.sha256(data).hexdigest()
+        blob = ConfigBlob.objects.filter(digest=digest).defer("data").first()
+        if blob is not None:
+            return blob
+        try:
+            with transaction.atomic():
+                return ConfigBlob.objects.create(
+                    digest=digest,
+                    compression=self.compression,
+                    size=len(data),
+                    data=compress(data, self.compression),
+                )
+        except IntegrityError:
+            # Another worker stored the same configuration first.
+            return ConfigBlob.objects.defer("data").get(digest=digest)
+
+    def save(self, platform, controller, target, payload, collected):  # pylint: disable=too-many-arguments
+        """Record `payload` as the configuration of `target` at `collected`.
+
+        Returns:
+            tuple[ConfigSnapshot, bool]: The latest snapshot, and whether it was created.
+        """
+        blob = self.put_blob(payload)
+        latest = self.history(platform, controller, target).filter(collected__lte=collected).first()
+        if latest is not None and latest.blob_id == blob.pk:
+            return latest, False
+        snapshot = ConfigSnapshot.objects.create(
+            platform=platform, controller=controller, target=target, collected=collected, blob=blob
+        )
+        return snapshot, True
+
+    @staticmethod
+    def history(platform, controller, target):
+        """Return the snapshots of `target`, newest first."""
+        return ConfigSnapshot.objects.filter(platform=platform, controller=controller, target=target)
+
+    def at(self, platform, controller, target, when):
+        """Return the snapshot in effect for `target` at `when`, or None."""
+        return self.history(platform, controller, target).filter(collected__lte=when).select_related("blob").first()
+
+    @staticmethod
+    def load(snapshot):
+        """Return the configuration recorded by `snapshot`."""
+        blob = snapshot.blob
+        return json.loads(decompress(bytes(blob.data), blob.compression))
+
+    def writer(self, driver, collected):
+        """Return an `IncrementalBackup` writer recording the snapshots of `driver`'s targets at `collected`."""
+
+        def write(target, payload):
+            self.save(driver.platform, driver.host, target, payload, collected)
+
+        return write
@@ -0,0 +1,132 @@
+"""Test recording, storing and serving the API calls made by the collectors."""
+
+import unittest
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from nautobot.extras.models import JobResult
+from nautobot.users.models import Token
+from rest_framework.test import APIClient
+
+from ipa.api_calls import record_api_calls, save_call_stats
+from ipa.benchmarks.mock_meraki import ORGANIZATION_ID, MockMeraki
+from ipa.collectors.instrumentation import ApiCallRecorder, endpoint_template
+from ipa.collectors.meraki import MerakiOrganizationCollector
+from ipa.collectors.pool import SessionPool
+from ipa.models import ApiCallSummary
+
+User = get_user_model()
+
+
+class EndpointTemplateTest(TestCase):
+    """Test grouping calls to the same endpoint."""
+
+    def test_identifiers_are_replaced(self):
+        self.assertEqual(
+            endpoint_template("https://apic/api/mo/topology/pod-1/node-101/sys.json?rsp-subtree=full"),
+            "/api/mo/topology/pod-{id}/node-{id}/sys.json",
+        )
+        self.assertEqual(
+            endpoint_template("/api/v1/organizations/549236/devices"), "/api/v1/organizations/{id}/devices"
+        )
+        self.assertEqual(endpoint_template("/api/v1/devices/Q2XX-0000-0001/lldpCdp"), "/api/v1/devices/{id}/lldpCdp")
+        self.assertEqual(endpoint_template("/nitro/v1/config/lbvserver"), "/nitro/v1/config/lbvserver")
+
+
+class RecordApiCallsTest(TestCase):
+    """Test that driver calls are recorded and stored per job."""
+
+    def setUp(self):
+        self.recorder = ApiCallRecorder()
+        self.mock = MockMeraki(devices=25, error_rate=0.3).start()
+        self.addCleanup(self.mock.stop)
+
+    def collect(self):
+        """Back up the mock organization with a driver recording into `self.recorder`."""
+        collector = MerakiOrganizationCollector(
+            self.mock.host,
+            password=self.mock.api_key,
+            scheme="http",
+            organization_ids=[ORGANIZATION_ID],
+            pool=SessionPool(),
+            recorder=self.recorder,
+        )
+        return dict(collector.collect())
+
+    def test_calls_are_aggregated_per_endpoint(self):
+        self.assertEqual(len(self.collect()), 25)
+        stats = self.recorder.snapshot()
+        devices = stats["cisco_meraki", self.mock.host, "GET", "/api/v1/organizations/{id}/devices"]
+        self.assertEqual(len(stats), 3)
+        total = sum(call.calls for call in stats.values())
+        self.assertEqual(total, sum(self.mock.stats()["calls"].values()))
+        throttled = sum(call.status_codes["429"] for call in stats.values())
+        self.assertEqual(throttled, self.mock.calls["error"])
+        self.assertEqual(sum(call.retries for call in stats.values()), throttled)
+        self.assertGreater(devices.bytes_received, 0)
+        self.assertGreaterEqual(devices.duration, devices.max_duration)
+
+    def test_calls_are_stored_per_job(self):
+        job_result = JobResult.objects.create(name="ipa backup")
+        self.collect()
+        with record_api_calls(job_result, recorder=self.recorder):
+            self.collect()
+        self.assertEqual(self.recorder.snapshot(), {})
+        self.collect()
+        save_call_stats(self.recorder.drain())
+        summaries = ApiCallSummary.objects.filter(controller=self.mock.host)
+        self.assertEqual(summaries.filter(job_result=job_result).count(), 3)
+        self.assertEqual(summaries.filter(job_result__isnull=True).count(), 3)
+        self.assertEqual(sum(summary.calls for summary in summaries), sum(self.mock.stats()["calls"].values()))
+
+    @unittest.skipUnless(connection.features.supports_partial_indexes, "Needs partial unique indexes")
+    def test_one_summary_per_endpoint_without_job(self):
+        fields = {"platform": "wti", "controller": "pdu1", "method": "GET", "endpoint": "/api/v2/config"}
+        ApiCallSummary.objects.create(last_called=timezone.now(), **fields)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ApiCallSummary.objects.create(last_called=timezone.now(), **fields)
+        job_result = JobResult.objects.create(name="ipa backup")
+        ApiCallSummary.objects.create(job_result=job_result, last_called=timezone.now(), **fields)
+
+
+class ApiCallSummaryAPITest(TestCase):
+    """Test the API call statistics endpoints."""
+
+    def setUp(self):
+        user = User.objects.create(username="testuser", is_superuser=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        now = timezone.now()
+        for controller, endpoint, duration in (
+            ("apic1", "/api/class/topSystem.json", 9.0),
+            ("apic1", "/api/aaaLogin.json", 1.0),
+            ("apic2", "/api/class/topSystem.json", 4.0),
+        ):
+            ApiCallSummary.objects.create(
+                platform="cisco_apic",
+                controller=controller,
+                method="GET",
+                endpoint=endpoint,
+                calls=2,
+                duration=duration,
+                max_duration=duration / 2,
+                status_codes={"200": 2},
+                last_called=now,
+            )
+
+    def test_list_slowest_first(self):
+        response = self.client.get(reverse("plugins-api:ipa-api:apicallsummary-list"), {"controller": "apic1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["duration"] for row in response.data["results"]], [9.0, 1.0])
+        self.assertEqual(response.data["results"][0]["mean_duration"], 4.5)
+
+    def test_totals_per_controller(self):
+        response = self.client.get(reverse("plugins-api:ipa-api:apicallsummary-controllers"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row["controller"], row["calls"], row["duration"], row["max_duration"]) for row in response.data],
+            [("apic1", 4, 10.0, 4.5), ("apic2", 2, 4.0, 2.0)],
+        )
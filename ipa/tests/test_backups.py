@@ -0,0 +1,142 @@
+"""Test incremental backups driven by device fingerprints."""
+
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+
+from ipa import backups, models
+from ipa.benchmarks.mock_apic import MockApic
+from ipa.choices import FingerprintSourceChoices
+from ipa.collectors import apic
+
+
+class FakeDriver:
+    """In-memory driver serving canned configurations."""
+
+    platform = "fake"
+    host = "controller.example.com"
+
+    def __init__(self, configs, revisions=None):
+        self.configs = configs
+        self.revisions = revisions
+        self.collected = []
+
+    def fingerprints(self, targets=None):  # pylint: disable=unused-argument
+        """Report revisions when configured with some."""
+        if self.revisions is None:
+            return {}
+        return {target: (FingerprintSourceChoices.REVISION, revision) for target, revision in self.revisions.items()}
+
+    def collect(self, targets=None):
+        """Yield the configuration of each requested target."""
+        for target in self.configs if targets is None else targets:
+            self.collected.append(target)
+            yield target, self.configs[target]
+
+
+class IncrementalBackupTest(TestCase):
+    """Test which targets are fetched and written."""
+
+    def setUp(self):
+        self.written = {}
+
+    def backup(self, driver, **kwargs):
+        """Run one backup of `driver`, recording what was written."""
+        return backups.IncrementalBackup(driver, self.written.__setitem__, **kwargs).run()
+
+    def test_content_hash_ignores_key_order(self):
+        self.assertEqual(backups.content_hash({"a": 1, "b": [1, 2]}), backups.content_hash({"b": [1, 2], "a": 1}))
+        self.assertNotEqual(backups.content_hash({"a": 1}), backups.content_hash({"a": 2}))
+
+    def test_content_hash_skips_unchanged_writes(self):
+        driver = FakeDriver({"sw1": {"hostname": "sw1"}, "sw2": {"hostname": "sw2"}})
+        self.assertEqual(self.backup(driver).changed, ["sw1", "sw2"])
+        self.written.clear()
+        driver.configs["sw2"] = {"hostname": "sw2-new"}
+
+        summary = self.backup(driver)
+        self.assertEqual((summary.changed, summary.unchanged, summary.fetched), (["sw2"], ["sw1"], 2))
+        self.assertEqual(self.written, {"sw2": {"hostname": "sw2-new"}})
+        fingerprint = models.DeviceFingerprint.objects.get(target="sw1")
+        self.assertEqual(fingerprint.source, FingerprintSourceChoices.CONTENT)
+        self.assertGreater(fingerprint.last_checked, fingerprint.last_changed)
+
+    def test_revisions_skip_unchanged_fetches(self):
+        driver = FakeDriver({"sw1": {}, "sw2": {}, "sw3": {}}, revisions={"sw1": "1", "sw2": "1", "sw3": "1"})
+        self.backup(driver)
+        driver.collected.clear()
+        driver.revisions["sw3"] = "2"
+
+        summary = self.backup(driver)
+        self.assertEqual((summary.skipped, summary.changed), (["sw1", "sw2"], ["sw3"]))
+        self.assertEqual(driver.collected, ["sw3"])
+
+    def test_fingerprints_without_conflict_target(self):
+        # MySQL and MariaDB reject `unique_fields`: stored fingerprints are updated, new ones inserted.
+        driver = FakeDriver({"sw1": {}, "sw2": {}}, revisions={"sw1": "1", "sw2": "1"})
+        with mock.patch.object(connection.features, "supports_update_conflicts_with_target", False):
+            self.backup(driver)
+            driver.revisions.update(sw2="2", sw3="1")
+            driver.configs["sw3"] = {}
+            summary = self.backup(driver)
+            self.assertEqual((summary.skipped, summary.changed), (["sw1"], ["sw2", "sw3"]))
+            self.assertEqual(self.backup(driver).skipped, ["sw1", "sw2", "sw3"])
+        self.assertEqual(models.DeviceFingerprint.objects.get(target="sw2").fingerprint, "2")
+
+    def test_force_fetches_everything(self):
+        driver = FakeDriver({"sw1": {}}, revisions={"sw1": "1"})
+        self.backup(driver)
+        self.written.clear()
+        summary = self.backup(driver, force=True)
+        self.assertEqual(summary.changed, ["sw1"])
+        self.assertEqual(list(self.written), ["sw1"])
+
+
+class ApicIncrementalBackupTest(TestCase):
+    """Test APIC audit log fingerprints end to end."""
+
+    def setUp(self):
+        self.mock = MockApic(nodes=12, interfaces=2).start()
+        self.addCleanup(self.mock.stop)
+        for node in range(101, 113):
+            self.mock.change(f"topology/pod-1/node-{node}/sys")
+        self.driver = apic.ApicFabricCollector(self.mock.host, "admin", "admin", scheme="http", page_size=5)
+        self.written = {}
+        self.backup = backups.IncrementalBackup(self.driver, self.written.__setitem__)
+
+    def test_only_changed_nodes_are_fetched(self):
+        self.assertEqual(len(self.backup.run().changed), 12)
+        self.written.clear()
+        self.assertEqual(len(self.backup.run().skipped), 12)
+        self.assertEqual(self.written, {})
+
+        self.mock.change("topology/pod-1/node-105/sys/phys-[eth1/1]")
+        self.mock.calls.clear()
+        summary = self.backup.run()
+        self.assertEqual(summary.changed, ["105"])
+        self.assertEqual(self.written["105"]["attributes"]["name"], "leaf-105")
+        # One audit log query, one node listing and one filtered subtree query.
+        self.assertEqual(self.mock.calls, {"audit": 1, "class": 2})
+
+    def test_nodes_outside_the_audit_window_are_fetched(self):
+        self.driver.audit_window = 4
+        self.backup.run()
+        self.mock.change("topology/pod-1/node-101/sys/phys-[eth1/1]")
+        summary = self.backup.run()
+        # Only nodes 110 to 112 and 101 have a record in the window: the others are fetched, then hashed.
+        self.assertEqual(summary.skipped, ["110", "111", "112"])
+        # Node 109 left the window, so its fingerprint is now the content hash.
+        self.assertEqual(summary.changed, ["101", "109"])
+        self.assertEqual(len(summary.unchanged), 7)
+        self.assertEqual(len(self.backup.run().unchanged), 8)
+
+    def test_policy_changes_touch_every_node(self):
+        self.backup.run()
+        self.mock.change("uni/tn-common/ctx-default")
+        self.assertEqual(len(self.backup.run().changed), 12)
+
+    def test_collect_filters_nodes(self):
+        backup = dict(self.driver.collect(["103", "110"]))
+        self.assertEqual(sorted(backup), ["103", "110"])
+        self.assertEqual(len(backup["110"]["children"]), 2)
@@ -0,0 +1,46 @@
+"""Test the collector benchmark suite and its mock controllers."""
+
+import unittest
+
+from ipa.benchmarks import suite
+
+
+class MockCollectTest(unittest.TestCase):
+    """Test every benchmark scenario against its mock controller, in process."""
+
+    def run_scenario(self, collector, devices, **kwargs):
+        """Collect from a mock of `collector` and return `(collected, errors)` and the mock's statistics."""
+        factory, collect = suite.COLLECTORS[collector]
+        with factory(devices=devices, **kwargs) as mock:
+            result = collect(mock.server.server_address[1], devices, 4)
+            return result, mock.stats()
+
+    def test_every_device_is_collected(self):
+        for collector in suite.COLLECTORS:
+            with self.subTest(collector=collector):
+                (collected, errors), stats = self.run_scenario(collector, 60)
+                self.assertEqual((collected, errors), (60, 0))
+                self.assertEqual(len(stats["timings"]), sum(stats["calls"].values()))
+
+    def test_injected_errors_are_counted(self):
+        (collected, errors), stats = self.run_scenario("vmanage", 20, error_rate=1.0)
+        self.assertEqual((collected, errors), (0, 20))
+        self.assertEqual(stats["calls"]["error"], 20)
+
+    def test_throttled_meraki_calls_are_retried(self):
+        (collected, errors), stats = self.run_scenario("meraki", 300, error_rate=0.3)
+        self.assertEqual((collected, errors), (300, 0))
+        self.assertGreater(stats["calls"]["error"], 0)
+
+
+class RegressionTest(unittest.TestCase):
+    """Test comparing results against a baseline."""
+
+    def test_regressions(self):
+        baseline = [{"collector": "apic", "devices": 100, "throughput": 1000.0, "peak_rss_mb": 100.0}]
+        within = [{"collector": "apic", "devices": 100, "throughput": 850.0, "peak_rss_mb": 110.0}]
+        worse = [{"collector": "apic", "devices": 100, "throughput": 700.0, "peak_rss_mb": 130.0}]
+        unknown = [{"collector": "apic", "devices": 1000, "throughput": 1.0, "peak_rss_mb": 999.0}]
+        self.assertEqual(suite.regressions(within, baseline), [])
+        self.assertEqual(len(suite.regressions(worse, baseline)), 2)
+        self.assertEqual(suite.regressions(unknown, baseline), [])
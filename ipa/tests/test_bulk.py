@@ -0,0 +1,128 @@
+"""Test the bulk upsert of IpaExampleModel records."""
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from nautobot.extras.choices import ObjectChangeActionChoices
+from nautobot.extras.models import ObjectChange
+from nautobot.users.models import ObjectPermission, Token
+from rest_framework.test import APIClient
+
+from ipa.bulk import upsert_examples
+from ipa.models import IpaExampleModel
+from ipa.tests import fixtures
+
+User = get_user_model()
+
+
+class UpsertExamplesTest(TestCase):
+    """Test writing records in chunks."""
+
+    def setUp(self):
+        fixtures.create_ipaexamplemodel()
+
+    def test_counts(self):
+        rows = [
+            {"name": "Test One"},
+            {"name": "Test Two", "description": "changed"},
+            *({"name": f"New {index}", "description": "new"} for index in range(5)),
+        ]
+        before = IpaExampleModel.objects.get(name="Test Two")
+        self.assertEqual(upsert_examples(rows, chunk_size=2), {"created": 5, "updated": 1, "unchanged": 1})
+        after = IpaExampleModel.objects.get(name="Test Two")
+        self.assertEqual((after.pk, after.created, after.description), (before.pk, before.created, "changed"))
+        self.assertGreater(after.last_updated, before.last_updated)
+        self.assertEqual(IpaExampleModel.objects.filter(description="new").count(), 5)
+        self.assertEqual(upsert_examples(rows), {"created": 0, "updated": 0, "unchanged": 7})
+
+    def test_without_conflict_target(self):
+        # MySQL and MariaDB reject `unique_fields`: existing records are updated, new ones inserted.
+        before = IpaExampleModel.objects.get(name="Test Two")
+        rows = [{"name": "Test Two", "description": "changed"}, {"name": "New", "description": "new"}]
+        with mock.patch.object(connection.features, "supports_update_conflicts_with_target", False):
+            # The lookups of the chunk and of the stored rows, the update, the insert and the savepoint.
+            with self.assertNumQueries(6):
+                self.assertEqual(upsert_examples(rows), {"created": 1, "updated": 1, "unchanged": 0})
+        after = IpaExampleModel.objects.get(name="Test Two")
+        self.assertEqual((after.pk, after.created, after.description), (before.pk, before.created, "changed"))
+        self.assertGreater(after.last_updated, before.last_updated)
+        self.assertEqual(IpaExampleModel.objects.get(name="New").description, "new")
+
+    def test_queries_per_chunk(self):
+        rows = [{"name": f"New {index}"} for index in range(10)]
+        # One lookup and one upsert per chunk, and the savepoint around them all.
+        with self.assertNumQueries(6):
+            upsert_examples(rows, chunk_size=5)
+
+
+class BulkUpsertAPITest(TestCase):
+    """Test the bulk upsert endpoint."""
+
+    def setUp(self):
+        fixtures.create_ipaexamplemodel()
+        self.user = User.objects.create(username="testuser", is_superuser=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+        self.url = reverse("plugins-api:ipa-api:ipaexamplemodel-bulk-upsert")
+
+    def test_upsert_is_change_logged(self):
+        response = self.client.post(
+            self.url,
+            [{"name": "Test One", "description": "changed"}, {"name": "Test Two"}, {"name": "Test Four"}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"created": 1, "updated": 1, "unchanged": 1})
+        changes = ObjectChange.objects.filter(user=self.user).order_by("object_repr")
+        self.assertEqual(
+            [(change.object_repr, change.action) for change in changes],
+            [
+                ("Test Four", ObjectChangeActionChoices.ACTION_CREATE),
+                ("Test One", ObjectChangeActionChoices.ACTION_UPDATE),
+            ],
+        )
+        self.assertEqual(changes[1].object_data["description"], "changed")
+        self.assertEqual(changes[0].request_id, changes[1].request_id)
+
+    def test_invalid_rows_are_rejected(self):
+        response = self.client.post(self.url, [{"name": "Test Four"}, {"name": "Test Four"}], format="json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, [{"description": "no name"}], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IpaExampleModel.objects.filter(name="Test Four").exists())
+
+    def test_permissions_are_required(self):
+        self.user.is_superuser = False
+        self.user.save()
+        response = self.client.post(self.url, [{"name": "Test Four"}], format="json")
+        self.assertEqual(response.status_code, 403)
+
+    def test_permission_constraints(self):
+        self.user.is_superuser = False
+        self.user.save()
+        permission = ObjectPermission.objects.create(
+            name="ipa", actions=["add", "change"], constraints={"name__startswith": "Test"}
+        )
+        permission.object_types.add(ContentType.objects.get_for_model(IpaExampleModel))
+        permission.users.add(self.user)
+        IpaExampleModel.objects.create(name="Other")
+
+        for rows in (
+            [{"name": "Test Four"}, {"name": "Other", "description": "changed"}],
+            [{"name": "Test Four"}, {"name": "Forbidden"}],
+        ):
+            response = self.client.post(self.url, rows, format="json")
+            self.assertEqual(response.status_code, 403)
+            self.assertIn(rows[1]["name"], str(response.data["detail"]))
+        self.assertFalse(IpaExampleModel.objects.filter(name__in=["Test Four", "Forbidden"]).exists())
+        self.assertEqual(IpaExampleModel.objects.get(name="Other").description, "")
+
+        response = self.client.post(self.url, [{"name": "Test One", "description": "changed"}], format="json")
+        self.assertEqual(response.data, {"created": 0, "updated": 1, "unchanged": 0})
+        # Rows matching their record are not written, so they need no permission.
+        response = self.client.post(self.url, [{"name": "Test Five"}, {"name": "Other"}], format="json")
+        self.assertEqual(response.data, {"created": 1, "updated": 0, "unchanged": 1})
@@ -0,0 +1,105 @@
+"""Test the cache of ipa API responses."""
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.urls import reverse
+from nautobot.apps.testing import TransactionTestCase
+from nautobot.extras.models import Tag
+from nautobot.users.models import ObjectPermission, Token
+from rest_framework.test import APIClient
+
+from ipa.bulk import upsert_examples
+from ipa.cache import ResponseCache, response_cache
+from ipa.models import IpaExampleModel
+
+User = get_user_model()
+
+
+class ResponseCacheTest(TestCase):
+    """Test the eviction of cached responses."""
+
+    def test_least_recently_used_are_evicted(self):
+        cache = ResponseCache(max_entries=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual([cache.get(key) for key in "abc"], [1, None, 3])
+
+    def test_entries_expire(self):
+        cache = ResponseCache(max_entries=2, ttl=60)
+        with mock.patch("ipa.cache.time.monotonic", return_value=0):
+            cache.set("a", 1)
+        with mock.patch("ipa.cache.time.monotonic", return_value=61):
+            self.assertIsNone(cache.get("a"))
+
+
+class CachedResponsesTest(TransactionTestCase):
+    """Test serving API responses from the cache until their model changes."""
+
+    def setUp(self):
+        super().setUp()
+        response_cache.clear()
+        self.user = User.objects.create(username="testuser", is_superuser=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+        self.url = reverse("plugins-api:ipa-api:ipaexamplemodel-list")
+        self.model = IpaExampleModel.objects.create(name="Model 1")
+
+    def get(self, url=None, client=None, **params):
+        """Return whether the response was cached, and its results."""
+        response = (client or self.client).get(url or self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.get("X-Cache"), [row["name"] for row in response.data.get("results", [response.data])]
+
+    def test_cached_until_changed(self):
+        self.assertEqual(self.get(limit=10, offset=0), ("MISS", ["Model 1"]))
+        self.assertEqual(self.get(offset=0, limit=10), ("HIT", ["Model 1"]))
+        IpaExampleModel.objects.create(name="Model 2")
+        self.assertEqual(self.get(limit=10, offset=0), ("MISS", ["Model 1", "Model 2"]))
+        detail = reverse("plugins-api:ipa-api:ipaexamplemodel-detail", args=[self.model.pk])
+        self.assertEqual(self.get(detail), ("MISS", ["Model 1"]))
+        self.assertEqual(self.get(detail), ("HIT", ["Model 1"]))
+        self.model.delete()
+        self.assertEqual(self.get(limit=10, offset=0), ("MISS", ["Model 2"]))
+        self.assertEqual(self.client.get(detail).status_code, 404)
+
+    def test_related_changes(self):
+        self.get()
+        tag = Tag.objects.create(name="Tag")
+        tag.content_types.add(ContentType.objects.get_for_model(IpaExampleModel))
+        self.assertEqual(self.get()[0], "HIT")
+        self.model.tags.add(tag)
+        self.assertEqual(self.get()[0], "MISS")
+        upsert_examples([{"name": "Model 1", "description": "changed"}])
+        self.assertEqual(self.get()[0], "MISS")
+        self.assertIsNone(self.get(depth=1)[0])
+        self.assertIsNone(self.get(include="relationships")[0])
+        self.assertEqual(self.get()[0], "HIT")
+        # Deleting the tag deletes its tagged items.
+        tag.delete()
+        self.assertEqual(self.get()[0], "MISS")
+
+    def test_cached_per_host(self):
+        self.get()
+        self.assertEqual(self.get()[0], "HIT")
+        response = self.client.get(self.url, HTTP_HOST="nautobot.example.com")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertTrue(response.data["results"][0]["url"].startswith("http://nautobot.example.com/"))
+
+    def test_cached_per_permissions(self):
+        self.get()
+        user = User.objects.create(username="constrained")
+        permission = ObjectPermission.objects.create(name="ipa", actions=["view"], constraints={"name": "Model 2"})
+        permission.object_types.add(ContentType.objects.get_for_model(IpaExampleModel))
+        permission.users.add(user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        self.assertEqual(self.get(client=client), ("MISS", []))
+        self.assertEqual(self.get(client=client), ("HIT", []))
+        permission.constraints = {"name": "Model 1"}
+        permission.save()
+        self.assertEqual(self.get(client=client), ("MISS", ["Model 1"]))
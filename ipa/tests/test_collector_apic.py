@@ -0,0 +1,55 @@
+"""Test the APIC class-query collector against the mock APIC."""
+
+import unittest
+
+from ipa.benchmarks import apic as apic_benchmark
+from ipa.benchmarks.mock_apic import MockApic
+from ipa.collectors import apic
+
+
+class ApicFabricCollectorTest(unittest.TestCase):
+    """Test fabric-wide collection and its per-node split."""
+
+    def setUp(self):
+        self.mock = MockApic(nodes=23, interfaces=4).start()
+        self.collector = apic.ApicFabricCollector(self.mock.host, "admin", "admin", scheme="http", page_size=10)
+
+    def tearDown(self):
+        self.mock.stop()
+
+    def test_iter_node_backups_pages_through_fabric(self):
+        backups = dict(self.collector.iter_node_backups())
+        self.assertEqual(len(backups), 23)
+        self.assertEqual(backups["101"]["attributes"]["name"], "leaf-101")
+        self.assertEqual(len(backups["101"]["children"]), 4)
+        self.assertEqual(self.mock.calls, {"aaaLogin": 1, "class": 3})
+
+    def test_class_query_matches_per_node_query(self):
+        backups = dict(self.collector.iter_node_backups())
+        self.assertEqual(self.collector.get_node_backup("1", "117"), backups["117"])
+
+    def test_expired_token_logs_in_again(self):
+        self.collector.login()
+        self.mock.tokens.clear()
+        self.assertEqual(len(dict(self.collector.iter_node_backups())), 23)
+        self.assertEqual(self.mock.calls["aaaLogin"], 2)
+
+    def test_login_failure_raises(self):
+        self.collector.password = "wrong"
+        with self.assertRaises(apic.ApicError):
+            next(self.collector.iter_node_backups())
+
+    def test_xml_output_matches_json(self):
+        xml_collector = apic.ApicFabricCollector(
+            self.mock.host, "admin", "admin", scheme="http", page_size=10, output="xml"
+        )
+        self.assertEqual(dict(xml_collector.iter_node_backups()), dict(self.collector.iter_node_backups()))
+
+    def test_node_from_dn(self):
+        self.assertEqual(apic.node_from_dn("topology/pod-2/node-204/sys/phys-[eth1/1]"), ("2", "204"))
+        self.assertIsNone(apic.node_from_dn("uni/tn-common"))
+
+    def test_benchmark_reduces_calls(self):
+        results = apic_benchmark.run(nodes=40, interfaces=2, latency=0, page_size=20)
+        self.assertEqual(results["per_node"], {**results["per_node"], "calls": 41, "nodes": 40})
+        self.assertEqual(results["class_query"], {**results["class_query"], "calls": 3, "nodes": 40})
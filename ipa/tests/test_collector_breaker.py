@@ -0,0 +1,121 @@
+"""Test the per-controller circuit breaker."""
+
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from ipa.collectors import breaker, pool, ratelimit, wti
+
+SETTINGS = {"failure_threshold": 3, "reset_timeout": 0.3, "failure_window": 60}
+
+
+class FailingHandler(BaseHTTPRequestHandler):
+    """Answer every request with a 500, counting them on the server."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Fail."""
+        self.server.calls += 1
+        self.send_response(500)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep test output quiet."""
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    """Test the circuit states against a cache of its own."""
+
+    def setUp(self):
+        self.breaker = breaker.CircuitBreaker(cache=LocMemCache(uuid.uuid4().hex, {}), settings=SETTINGS)
+        self.key = "vmanage1.example.com"
+
+    def record_failures(self, times):
+        """Record `times` failed calls to the controller."""
+        for _ in range(times):
+            self.breaker.before_call("cisco_vmanage", self.key)
+            self.breaker.failure("cisco_vmanage", self.key)
+
+    def test_opens_after_consecutive_failures(self):
+        self.record_failures(2)
+        self.assertEqual(self.breaker.state("cisco_vmanage", self.key), "closed")
+        self.record_failures(1)
+        self.assertEqual(self.breaker.state("cisco_vmanage", self.key), "open")
+        with self.assertRaises(breaker.CircuitOpen):
+            self.breaker.before_call("cisco_vmanage", self.key)
+        # Other controllers and platforms have circuits of their own.
+        self.assertEqual(self.breaker.before_call("cisco_vmanage", "vmanage2.example.com"), 0)
+        self.assertEqual(self.breaker.before_call("cisco_meraki", self.key), 0)
+
+    def test_success_resets_the_count(self):
+        self.record_failures(2)
+        failures = self.breaker.before_call("cisco_vmanage", self.key)
+        self.assertEqual(failures, 2)
+        self.breaker.record("cisco_vmanage", self.key, 200, failures)
+        self.record_failures(2)
+        self.assertEqual(self.breaker.state("cisco_vmanage", self.key), "closed")
+
+    def test_throttled_responses_are_not_failures(self):
+        for _ in range(5):
+            failures = self.breaker.before_call("cisco_vmanage", self.key)
+            self.breaker.record("cisco_vmanage", self.key, 503, failures, throttled=True)
+        self.assertEqual(self.breaker.state("cisco_vmanage", self.key), "closed")
+
+    def test_half_open_probe_closes_the_circuit(self):
+        self.record_failures(3)
+        time.sleep(SETTINGS["reset_timeout"])
+        self.assertEqual(self.breaker.state("cisco_vmanage", self.key), "half-open")
+        failures = self.breaker.before_call("cisco_vmanage", self.key)
+        # A single caller probes, the others keep failing fast.
+        with self.assertRaisesRegex(breaker.CircuitOpen, "probing"):
+            self.breaker.before_call("cisco_vmanage", self.key)
+        self.breaker.record("cisco_vmanage", self.key, 200, failures)
+        self.assertEqual(self.breaker.state("cisco_vmanage", self.key), "closed")
+        self.assertEqual(self.breaker.before_call("cisco_vmanage", self.key), 0)
+
+    def test_failed_probe_reopens_the_circuit(self):
+        self.record_failures(3)
+        time.sleep(SETTINGS["reset_timeout"])
+        failures = self.breaker.before_call("cisco_vmanage", self.key)
+        self.breaker.record("cisco_vmanage", self.key, 502, failures)
+        self.assertEqual(self.breaker.state("cisco_vmanage", self.key), "open")
+        time.sleep(SETTINGS["reset_timeout"])
+        # The next probe is not held back by the failed one.
+        self.breaker.before_call("cisco_vmanage", self.key)
+
+    def test_disabled(self):
+        disabled = breaker.CircuitBreaker(cache=self.breaker.cache, settings={"failure_threshold": 0})
+        for _ in range(10):
+            disabled.before_call("cisco_vmanage", self.key)
+            disabled.failure("cisco_vmanage", self.key)
+        self.assertEqual(self.breaker.state("cisco_vmanage", self.key), "closed")
+
+
+class DriverCircuitTest(SimpleTestCase):
+    """Test that drivers stop calling a failing controller."""
+
+    def test_open_circuit_fails_fast(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FailingHandler)
+        server.calls = 0
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host = ":".join(str(part) for part in server.server_address)
+        limiter = ratelimit.RateLimiter(limits={"default": {"rate": 100, "burst": 100}})
+        self.addCleanup(limiter.client.delete, limiter.key("wti", host))
+        circuits = breaker.CircuitBreaker(cache=LocMemCache(uuid.uuid4().hex, {}), settings=SETTINGS)
+        driver = wti.WtiDriver(
+            host, "admin", "secret", scheme="http", pool=pool.SessionPool(), rate_limiter=limiter, breaker=circuits
+        )
+
+        for _ in range(3):
+            with self.assertRaises(wti.WtiError):
+                driver.get_section("hostname")
+        with self.assertRaises(breaker.CircuitOpen):
+            driver.get_section("hostname")
+        self.assertEqual(server.calls, 3)
+        self.assertEqual(circuits.state("wti", host), "open")
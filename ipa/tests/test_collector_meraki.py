@@ -0,0 +1,123 @@
+"""Test the Meraki organization-wide collector against a stub dashboard."""
+
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from ipa.collectors import meraki
+
+DEVICES = [{"serial": f"Q2XX-{index:04d}", "networkId": f"N_{index % 2}", "model": "MS120"} for index in range(7)]
+SWITCH_PORTS = [{"serial": device["serial"], "ports": [{"portId": "1"}]} for device in DEVICES]
+VPN_EXCLUSIONS = [{"networkId": "N_0", "custom": []}, {"networkId": "N_1", "custom": [{"protocol": "tcp"}]}]
+
+
+class StubDashboardHandler(BaseHTTPRequestHandler):
+    """Serve organization listings with cursor pagination."""
+
+    listings = {
+        "/api/v1/organizations/1/devices": DEVICES,
+        "/api/v1/organizations/1/switch/ports/bySwitch": SWITCH_PORTS,
+        "/api/v1/organizations/1/appliance/trafficShaping/vpnExclusions/byNetwork": VPN_EXCLUSIONS,
+    }
+    calls = []
+    throttle = 0
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Return one page of a listing, or 429 while throttled."""
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        type(self).calls.append(url.path)
+        if type(self).throttle:
+            type(self).throttle -= 1
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        items = self.listings[url.path]
+        per_page = int(query["perPage"][0])
+        start = int(query.get("startingAfter", ["0"])[0])
+        page = items[start : start + per_page]
+        body = json.dumps(page).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if start + per_page < len(items):
+            host, port = self.server.server_address
+            next_url = f"http://{host}:{port}{url.path}?perPage={per_page}&startingAfter={start + per_page}"
+            self.send_header("Link", f'<{next_url}>; rel="next"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep test output quiet."""
+
+
+class MerakiOrganizationCollectorTest(unittest.TestCase):
+    """Test bulk collection and per-device fan out."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubDashboardHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        host, port = cls.server.server_address
+        cls.host = f"{host}:{port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubDashboardHandler.calls = []
+        StubDashboardHandler.throttle = 0
+        self.collector = meraki.MerakiOrganizationCollector(
+            self.host,
+            password="key",
+            scheme="http",
+            organization_ids=["1"],
+            endpoints={
+                "switch_ports": ("/organizations/{organization_id}/switch/ports/bySwitch", "serial", 3),
+                "vpn_exclusions": (
+                    "/organizations/{organization_id}/appliance/trafficShaping/vpnExclusions/byNetwork",
+                    "networkId",
+                    1000,
+                ),
+            },
+        )
+
+    def test_paginate_follows_next_links(self):
+        items = list(self.collector.paginate("/organizations/1/devices", per_page=3))
+        self.assertEqual(items, DEVICES)
+        self.assertEqual(len(StubDashboardHandler.calls), 3)
+
+    def test_collect_fans_out_per_device(self):
+        backups = self.collector.collect_organization("1")
+        self.assertEqual(set(backups), {device["serial"] for device in DEVICES})
+        backup = backups["Q2XX-0003"]
+        self.assertEqual(backup["device"]["networkId"], "N_1")
+        self.assertEqual(backup["switch_ports"], [{"serial": "Q2XX-0003", "ports": [{"portId": "1"}]}])
+        self.assertEqual(backup["vpn_exclusions"], [{"networkId": "N_1", "custom": [{"protocol": "tcp"}]}])
+        # One devices page, three switch port pages and one VPN exclusions page for seven devices.
+        self.assertEqual(len(StubDashboardHandler.calls), 5)
+
+    def test_collect_filters_serials(self):
+        backups = dict(self.collector.collect(["Q2XX-0000", "Q2XX-0006"]))
+        self.assertEqual(set(backups), {"Q2XX-0000", "Q2XX-0006"})
+
+    def test_throttled_requests_are_retried(self):
+        StubDashboardHandler.throttle = 2
+        items = list(self.collector.paginate("/organizations/1/devices"))
+        self.assertEqual(items, DEVICES)
+        self.assertEqual(len(StubDashboardHandler.calls), 3)
+
+    def test_organizations_are_required(self):
+        with self.assertRaises(ValueError):
+            meraki.MerakiOrganizationCollector(self.host, password="key")
+
+    def test_errors_raise(self):
+        StubDashboardHandler.throttle = 10
+        self.collector.max_retries = 1
+        with self.assertRaises(meraki.MerakiError):
+            list(self.collector.paginate("/organizations/1/devices"))
@@ -0,0 +1,168 @@
+"""Test the asyncio Nitro collector against a stub Nitro server."""
+
+import secrets
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ipa.benchmarks.mock_netscaler import MockNetScaler
+from ipa.collectors import netscaler, pool
+
+
+class StubNitroServer:
+    """Minimal Nitro API serving canned config resources."""
+
+    def __init__(self, password="nsroot"):
+        self.password = password
+        self.tokens = set()
+        self.logins = 0
+        self.gets = 0
+        self.app = web.Application()
+        self.app.router.add_post("/nitro/v1/config/login", self.login)
+        self.app.router.add_get("/nitro/v1/config/{resource}", self.get_resource)
+        self.server = TestServer(self.app)
+
+    @property
+    def host(self):
+        """Address of the stub appliance."""
+        return f"{self.server.host}:{self.server.port}"
+
+    async def login(self, request):
+        """Issue a session token for the right password."""
+        self.logins += 1
+        body = await request.json()
+        if body["login"]["password"] != self.password:
+            return web.json_response({"errorcode": 354, "message": "Invalid username or password"}, status=401)
+        token = secrets.token_hex(8)
+        self.tokens.add(token)
+        return web.json_response({"errorcode": 0, "message": "Done", "sessionid": token})
+
+    async def get_resource(self, request):
+        """Return a one-object collection for any resource when the session is valid."""
+        self.gets += 1
+        if request.cookies.get(netscaler.NITRO_AUTH_COOKIE) not in self.tokens:
+            return web.json_response({"errorcode": 444, "message": "Invalid session"}, status=401)
+        resource = request.match_info["resource"]
+        if resource == "missing":
+            return web.json_response({"errorcode": 258, "message": "No such resource [missing]"}, status=400)
+        if resource == "html":
+            return web.Response(text="<html><body>Bad gateway</body></html>", content_type="text/html")
+        return web.json_response({"errorcode": 0, "message": "Done", resource: [{"name": f"{resource}-1"}]})
+
+
+class NitroCollectorTest(unittest.IsolatedAsyncioTestCase):
+    """Test the Nitro collector session reuse and error handling."""
+
+    async def asyncSetUp(self):
+        self.servers = [StubNitroServer() for _ in range(3)]
+        for server in self.servers:
+            await server.server.start_server()
+        self.cache = netscaler.NitroSessionCache()
+
+    async def asyncTearDown(self):
+        for server in self.servers:
+            await server.server.close()
+
+    def appliances(self, password="nsroot"):
+        """One appliance per stub server."""
+        return [netscaler.NitroAppliance(server.host, "nsroot", password, scheme="http") for server in self.servers]
+
+    async def test_collect_fetches_every_resource(self):
+        results = await netscaler.collect(self.appliances(), resources=["lbvserver", "server"], token_cache=self.cache)
+        self.assertEqual([result.host for result in results], [server.host for server in self.servers])
+        for result in results:
+            self.assertFalse(result.failed)
+            self.assertEqual(result.resources["lbvserver"], [{"name": "lbvserver-1"}])
+            self.assertEqual(result.resources["server"], [{"name": "server-1"}])
+
+    async def test_objects_are_handed_over_as_decoded(self):
+        items = []
+        results = await netscaler.collect(
+            self.appliances()[:1],
+            resources=["lbvserver", "server"],
+            token_cache=self.cache,
+            on_item=lambda host, resource, item: items.append((host, resource, item)),
+        )
+        host = self.servers[0].host
+        self.assertEqual(results[0].resources, {"lbvserver": 1, "server": 1})
+        self.assertCountEqual(
+            items, [(host, "lbvserver", {"name": "lbvserver-1"}), (host, "server", {"name": "server-1"})]
+        )
+
+    async def test_session_token_reused_across_runs(self):
+        for _ in range(3):
+            await netscaler.collect(self.appliances(), resources=["lbvserver", "server"], token_cache=self.cache)
+        for server in self.servers:
+            self.assertEqual(server.logins, 1)
+            self.assertEqual(server.gets, 6)
+
+    async def test_expired_session_logs_in_again(self):
+        await netscaler.collect(self.appliances(), resources=["lbvserver"], token_cache=self.cache)
+        for server in self.servers:
+            server.tokens.clear()
+        results = await netscaler.collect(self.appliances(), resources=["lbvserver", "server"], token_cache=self.cache)
+        for server, result in zip(self.servers, results):
+            self.assertFalse(result.failed)
+            self.assertEqual(server.logins, 2)
+
+    async def test_resource_error_is_reported(self):
+        results = await netscaler.collect(self.appliances(), resources=["lbvserver", "missing"], token_cache=self.cache)
+        for result in results:
+            self.assertIn("lbvserver", result.resources)
+            self.assertIn("No such resource", result.errors["missing"])
+
+    async def test_invalid_body_is_reported(self):
+        results = await netscaler.collect(self.appliances(), resources=["lbvserver", "html"], token_cache=self.cache)
+        for result in results:
+            self.assertIn("lbvserver", result.resources)
+            self.assertIn("Invalid Nitro response", result.errors["html"])
+
+    async def test_login_failure_is_reported(self):
+        results = await netscaler.collect(self.appliances(password="wrong"), token_cache=self.cache)
+        for server, result in zip(self.servers, results):
+            self.assertEqual(list(result.errors), ["login"])
+            self.assertEqual(server.gets, 0)
+
+
+class NitroDriverTest(unittest.TestCase):
+    """Test the registry driver on the process-wide engine against a mock NetScaler."""
+
+    def setUp(self):
+        self.mock = MockNetScaler(devices=3).start()
+        self.addCleanup(self.mock.stop)
+        self.connections = 0
+        accept = self.mock.server.get_request
+
+        def count_connections():
+            self.connections += 1
+            return accept()
+
+        self.mock.server.get_request = count_connections
+        self.pool = pool.SessionPool()
+
+    def driver(self, host, password="nsroot", **kwargs):
+        """Return a driver for the mock appliance at `host`."""
+        return netscaler.NitroDriver(host, "nsroot", password, scheme="http", pool=self.pool, **kwargs)
+
+    def test_connections_are_kept_across_collections(self):
+        host = self.mock.hosts[0]
+        self.assertEqual(next(self.driver(host).collect())[0], host)
+        connections = self.connections
+        self.assertEqual(next(self.driver(host).collect())[0], host)
+        self.assertEqual(self.connections, connections)
+
+    def test_collect_many_reports_each_appliance(self):
+        first, second, third = self.mock.hosts
+        results = netscaler.NitroDriver.collect_many(
+            [
+                self.driver(first, resources=["lbvserver"]),
+                self.driver(second, password="wrong"),
+                self.driver(third, resources=["server"]),
+            ]
+        )
+        self.assertEqual([result.host for result in results], [first, second, third])
+        self.assertEqual(list(results[0].resources), ["lbvserver"])
+        self.assertEqual(list(results[1].errors), ["login"])
+        self.assertEqual(list(results[2].resources), ["server"])
+        self.assertFalse(results[2].failed)
@@ -0,0 +1,101 @@
+"""Test the distributed token-bucket rate limiter."""
+
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase
+
+from ipa.collectors import pool, ratelimit, wti
+
+LIMITS = {"default": {"rate": 20, "burst": 3}, "wti": {"rate": 10, "burst": 2}}
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """Answer every request with 429 and a Retry-After delay."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Throttle the caller."""
+        self.send_response(429)
+        self.send_header("Retry-After", "2")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep test output quiet."""
+
+
+class RateLimiterTest(SimpleTestCase):
+    """Test bucket accounting against the Redis behind the Django cache."""
+
+    def setUp(self):
+        self.limiter = ratelimit.RateLimiter(limits=LIMITS, max_wait=5)
+        self.key = uuid.uuid4().hex
+
+    def tearDown(self):
+        self.limiter.client.delete(self.limiter.key("wti", self.key), self.limiter.key("default", self.key))
+
+    def test_burst_then_wait(self):
+        self.assertEqual([self.limiter.try_acquire("wti", self.key) for _ in range(2)], [0, 0])
+        wait = self.limiter.try_acquire("wti", self.key)
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 0.1)
+
+    def test_acquire_paces_requests(self):
+        start = time.monotonic()
+        for _ in range(5):
+            self.limiter.acquire("wti", self.key)
+        # Two requests fit the burst, the other three wait 0.1s each.
+        self.assertGreaterEqual(time.monotonic() - start, 0.25)
+
+    def test_unknown_platform_uses_default(self):
+        self.assertEqual(self.limiter.limit("juniper_junos"), LIMITS["default"])
+
+    def test_block_holds_every_caller(self):
+        self.limiter.block("wti", self.key, 1.5)
+        wait = self.limiter.try_acquire("wti", self.key)
+        self.assertGreater(wait, 1)
+        self.assertLessEqual(wait, 1.5)
+
+    def test_acquire_gives_up_after_max_wait(self):
+        self.limiter.block("wti", self.key, 10)
+        with self.assertRaises(ratelimit.RateLimitExceeded):
+            self.limiter.acquire("wti", self.key)
+
+    def test_utilization(self):
+        self.limiter.try_acquire("default", self.key)
+        self.limiter.try_acquire("default", self.key)
+        bucket = self.limiter.utilization("default", self.key)
+        self.assertEqual((bucket["rate"], bucket["burst"], bucket["blocked_for"]), (20, 3, 0))
+        self.assertAlmostEqual(bucket["utilization"], 2 / 3, delta=0.05)
+        self.assertIn(bucket["key"], [active["key"] for active in self.limiter.usage()])
+
+    def test_retry_after(self):
+        self.assertIsNone(ratelimit.retry_after(200, None))
+        self.assertIsNone(ratelimit.retry_after(503, None))
+        self.assertEqual(ratelimit.retry_after(429, None), 1.0)
+        self.assertEqual(ratelimit.retry_after(429, "7"), 7.0)
+        self.assertEqual(ratelimit.retry_after(503, "3"), 3.0)
+        self.assertAlmostEqual(ratelimit.retry_after(429, formatdate(time.time() + 30, usegmt=True)), 30, delta=2)
+
+
+class DriverRateLimitTest(SimpleTestCase):
+    """Test that drivers charge the limiter and honor Retry-After."""
+
+    def test_throttled_response_blocks_bucket(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingHandler)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host = ":".join(str(part) for part in server.server_address)
+        limiter = ratelimit.RateLimiter(limits=LIMITS)
+        self.addCleanup(limiter.client.delete, limiter.key("wti", host))
+        driver = wti.WtiDriver(host, "admin", "secret", scheme="http", pool=pool.SessionPool(), rate_limiter=limiter)
+
+        with self.assertRaises(wti.WtiError):
+            driver.get_section("hostname")
+        bucket = limiter.utilization("wti", host)
+        self.assertGreater(bucket["blocked_for"], 1)
+        self.assertLess(bucket["tokens"], LIMITS["wti"]["burst"])
@@ -0,0 +1,123 @@
+"""Test the driver registry and the shared session pool."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase, override_settings
+
+from ipa.collectors import apic, meraki, netscaler, pool, registry, vmanage, wti
+
+
+class StubWtiHandler(BaseHTTPRequestHandler):
+    """Serve WTI configuration sections over kept-alive connections."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        """Count every new TCP connection."""
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Return the requested section name."""
+        body = json.dumps({"section": self.path.rsplit("/", 1)[-1]}).encode()
+        self.send_response(200 if self.headers.get("Authorization") else 401)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "JSESSIONID=abc; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep test output quiet."""
+
+
+class DriverRegistryTest(SimpleTestCase):
+    """Test driver resolution from settings and registration."""
+
+    def test_default_drivers(self):
+        expected = {
+            "citrix_netscaler": netscaler.NitroDriver,
+            "cisco_meraki": meraki.MerakiOrganizationCollector,
+            "cisco_vmanage": vmanage.VManageClient,
+            "cisco_apic": apic.ApicFabricCollector,
+            "wti": wti.WtiDriver,
+        }
+        drivers = registry.DriverRegistry()
+        for platform, driver_class in expected.items():
+            self.assertIs(drivers.get(platform), driver_class)
+            self.assertEqual(driver_class.platform, platform)
+
+    def test_unknown_platform_raises(self):
+        with self.assertRaises(registry.DriverNotFound):
+            registry.DriverRegistry().get("juniper_junos")
+
+    @override_settings(PLUGINS_CONFIG={"ipa": {"drivers": {"custom_wti": "ipa.collectors.wti.WtiDriver"}}})
+    def test_configured_drivers_extend_defaults(self):
+        drivers = registry.DriverRegistry()
+        self.assertIs(drivers.get("custom_wti"), wti.WtiDriver)
+        self.assertIs(drivers.get("cisco_apic"), apic.ApicFabricCollector)
+        self.assertIn("custom_wti", drivers.platforms())
+
+    def test_register_driver(self):
+        # Leave the process-wide registry as other tests expect it.
+        self.addCleanup(registry.registry._drivers.pop, "test_platform", None)  # pylint: disable=protected-access
+
+        @registry.register_driver("test_platform")
+        class TestDriver(wti.WtiDriver):
+            """Driver registered from another app."""
+
+        self.assertIs(registry.registry.get("test_platform"), TestDriver)
+        driver = registry.registry.create("test_platform", "198.51.100.1", "admin", "secret")
+        self.assertIsInstance(driver, TestDriver)
+
+
+class SessionPoolTest(SimpleTestCase):
+    """Test that drivers share one pooled session per controller."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubWtiHandler)
+        cls.server.daemon_threads = True
+        cls.server.connections = 0
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.host = ":".join(str(part) for part in cls.server.server_address)
+
+    def setUp(self):
+        self.pool = pool.SessionPool(pool_size=2)
+        self.server.connections = 0
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_sessions_are_shared_per_host(self):
+        first = wti.WtiDriver(self.host, "admin", "secret", scheme="http", pool=self.pool)
+        second = apic.ApicFabricCollector(self.host, "admin", "secret", scheme="http", pool=self.pool)
+        other = wti.WtiDriver("192.0.2.1", "admin", "secret", scheme="http", pool=self.pool)
+        self.assertIs(first.session, second.session)
+        self.assertIsNot(first.session, other.session)
+        self.assertEqual(first.session.get_adapter("http://").poolmanager.connection_pool_kw["maxsize"], 2)
+
+    def test_devices_reuse_kept_alive_connections(self):
+        for _ in range(10):
+            driver = wti.WtiDriver(self.host, "admin", "secret", scheme="http", pool=self.pool)
+            host, backup = next(driver.collect())
+            self.assertEqual(host, self.host)
+            self.assertEqual(backup["hostname"], {"section": "hostname"})
+        self.assertEqual(self.server.connections, 1)
+
+    def test_sessions_are_rebuilt_after_fork(self):
+        driver = wti.WtiDriver(self.host, "admin", "secret", scheme="http", pool=self.pool)
+        session = driver.session
+        self.pool._pid = -1  # pylint: disable=protected-access
+        self.assertIsNot(driver.session, session)
+
+    def test_sessions_do_not_keep_cookies(self):
+        driver = wti.WtiDriver(self.host, "admin", "secret", scheme="http", pool=self.pool)
+        driver.get_section("hostname")
+        self.assertEqual(len(driver.session.cookies), 0)
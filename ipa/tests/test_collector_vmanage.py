@@ -0,0 +1,131 @@
+"""Test the vManage client and its worker-shared session cache."""
+
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.test import SimpleTestCase
+
+from ipa.collectors import vmanage
+
+
+class StubVManageHandler(BaseHTTPRequestHandler):
+    """Serve the vManage login handshake and device configs."""
+
+    def _reply(self, status, body=b"", content_type="application/json", headers=None):
+        """Send a complete response."""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _session(self):
+        """Return the JSESSIONID sent by the client."""
+        for cookie in self.headers.get("Cookie", "").split(";"):
+            name, _, value = cookie.strip().partition("=")
+            if name == "JSESSIONID":
+                return value
+        return None
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle `j_security_check`."""
+        stub = self.server.stub
+        length = int(self.headers["Content-Length"])
+        form = parse_qs(self.rfile.read(length).decode())
+        with stub.lock:
+            stub.logins += 1
+        if form["j_password"] != ["admin"]:
+            self._reply(200, b"<html><body>login</body></html>", "text/html")
+            return
+        jsessionid = secrets.token_hex(8)
+        stub.sessions[jsessionid] = secrets.token_hex(8)
+        self._reply(200, headers={"Set-Cookie": f"JSESSIONID={jsessionid}; Path=/"})
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle the XSRF token and authenticated dataservice calls."""
+        stub = self.server.stub
+        url = urlparse(self.path)
+        token = stub.sessions.get(self._session())
+        if token is None:
+            self._reply(200, b"<html><body>login</body></html>", "text/html")
+            return
+        if url.path == "/dataservice/client/token":
+            with stub.lock:
+                stub.token_fetches += 1
+            self._reply(200, token.encode(), "text/plain")
+            return
+        if self.headers.get("X-XSRF-TOKEN") != token:
+            self._reply(403)
+            return
+        device_id = parse_qs(url.query)["deviceId"][0]
+        self._reply(200, f"hostname edge-{device_id}\n".encode(), "text/plain")
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep test output quiet."""
+
+
+class StubVManage:
+    """Threaded stub vManage counting logins."""
+
+    def __init__(self):
+        self.sessions = {}
+        self.logins = 0
+        self.token_fetches = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubVManageHandler)
+        self.server.stub = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def host(self):
+        """Address of the stub controller."""
+        host, port = self.server.server_address
+        return f"{host}:{port}"
+
+    def close(self):
+        """Stop serving."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class VManageClientTest(SimpleTestCase):
+    """Test session sharing, refresh on expiry and login failures."""
+
+    def setUp(self):
+        self.stub = StubVManage()
+        self.cache = vmanage.VManageSessionCache()
+
+    def tearDown(self):
+        self.cache.cache.delete(self.cache.key(self.stub.host, "admin"))
+        self.stub.close()
+
+    def make_client(self, password="admin"):
+        """Return a new client, as a separate worker would build it."""
+        return vmanage.VManageClient(self.stub.host, "admin", password, scheme="http", token_cache=self.cache)
+
+    def test_one_login_serves_many_workers(self):
+        def fetch(index):
+            return self.make_client().get_device_config(f"10.0.0.{index}")
+
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            configs = list(pool.map(fetch, range(100)))
+        self.assertEqual(configs[7], "hostname edge-10.0.0.7\n")
+        self.assertEqual(self.stub.logins, 1)
+        self.assertEqual(self.stub.token_fetches, 1)
+
+    def test_expired_session_is_refreshed_once(self):
+        self.make_client().get_device_config("10.0.0.1")
+        self.stub.sessions.clear()
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            list(pool.map(lambda index: self.make_client().get_device_config(f"10.0.0.{index}"), range(30)))
+        self.assertEqual(self.stub.logins, 2)
+
+    def test_login_failure_raises(self):
+        with self.assertRaises(vmanage.VManageError):
+            self.make_client(password="wrong").get_device_config("10.0.0.1")
+        self.assertIsNone(self.cache.get(self.stub.host, "admin"))
@@ -0,0 +1,64 @@
+"""Test the streaming export of the ipa REST API."""
+
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from nautobot.users.models import Token
+from rest_framework.test import APIClient
+
+from ipa.models import ApiCallSummary, IpaExampleModel
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    """Test exporting every object in one response."""
+
+    def setUp(self):
+        user = User.objects.create(username="testuser", is_superuser=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        self.url = reverse("plugins-api:ipa-api:ipaexamplemodel-export")
+        for index in range(5):
+            IpaExampleModel.objects.create(name=f"Model {index}", description="odd" if index % 2 else "even")
+
+    def export(self, url, **params):
+        """Return the streamed content of the export."""
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export(self.url, description="odd").splitlines()]
+        self.assertEqual([row["name"] for row in rows], ["Model 1", "Model 3"])
+        self.assertEqual(set(rows[0]), {"id", "created", "last_updated", "name", "description"})
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(self.export(self.url, export_format="csv", fields="name,description"))))
+        self.assertEqual(rows[0], ["name", "description"])
+        self.assertEqual(rows[1:3], [["Model 0", "even"], ["Model 1", "odd"]])
+        self.assertEqual(len(rows), 6)
+
+    def test_metrics(self):
+        ApiCallSummary.objects.create(
+            platform="cisco_apic",
+            controller="apic1",
+            method="GET",
+            endpoint="/api/class/topSystem.json",
+            calls=2,
+            status_codes={"200": 2},
+            last_called=timezone.now(),
+        )
+        url = reverse("plugins-api:ipa-api:apicallsummary-export")
+        rows = list(csv.DictReader(io.StringIO(self.export(url, export_format="csv", controller="apic1"))))
+        self.assertEqual((rows[0]["job_result"], json.loads(rows[0]["status_codes"])), ("", {"200": 2}))
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {"export_format": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"fields": "tags"}).status_code, 400)
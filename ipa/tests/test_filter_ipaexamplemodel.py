@@ -1,5 +1,9 @@
 """Test IpaExampleModel Filter."""
 
+import importlib
+from unittest import mock
+
+from django.db import ProgrammingError, connection
 from django.test import TestCase
 
 from ipa import filters, models
@@ -22,7 +26,56 @@ class IpaExampleModelFilterTestCase(TestCase):
         params = {"q": "Test One"}
         self.assertEqual(self.filterset(params, self.queryset).qs.count(), 1)
 
+    def test_q_search_description(self):
+        """Test using Q search with part of the description of IpaExampleModel."""
+        models.IpaExampleModel.objects.filter(name="Test Two").update(description="Core switch of Lab 2")
+        params = {"q": "switch of lab"}
+        self.assertEqual(list(self.filterset(params, self.queryset).qs.values_list("name", flat=True)), ["Test Two"])
+
     def test_q_invalid(self):
         """Test using invalid Q search for IpaExampleModel."""
         params = {"q": "test-five"}
         self.assertEqual(self.filterset(params, self.queryset).qs.count(), 0)
+
+
+def trigram_available():
+    """Return whether the database has the pg_trgm extension installed."""
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+class IpaExampleModelSearchIndexTestCase(TestCase):
+    """Test the trigram indexes serving the Q search."""
+
+    def test_search_uses_trigram_index(self):
+        """Test that the Q search can be answered from the trigram indexes."""
+        if not trigram_available():
+            self.skipTest("Trigram indexes need PostgreSQL with pg_trgm")
+        queryset = filters.IpaExampleModelFilterSet({"q": "switch"}, models.IpaExampleModel.objects.all()).qs
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+        self.assertIn("ipa_ipaexamplemodel_name_trgm", plan)
+        self.assertIn("ipa_ipaexamplemodel_description_trgm", plan)
+
+    def test_migration_skips_indexes_without_extension(self):
+        """Test that the migration carries on when the role may not create the pg_trgm extension."""
+        migration = importlib.import_module("ipa.migrations.0005_ipaexamplemodel_trigram_indexes")
+        cursor = mock.Mock()
+        # The extension is available, but not installed.
+        cursor.fetchone.side_effect = [(1,), None]
+
+        def execute(sql):
+            if sql.startswith("CREATE EXTENSION"):
+                raise ProgrammingError("permission denied to create extension")
+
+        cursor.execute.side_effect = execute
+        schema_editor = mock.MagicMock()
+        schema_editor.connection.vendor = "postgresql"
+        schema_editor.connection.cursor.return_value.__enter__.return_value = cursor
+        with self.assertLogs(migration.logger, "WARNING"):
+            migration.create_trigram_indexes(None, schema_editor)
+        self.assertFalse(any("CREATE INDEX" in call.args[0] for call in cursor.execute.call_args_list))
@@ -0,0 +1,230 @@
+"""Test the GraphQL types of ipa models and the batching of their relations."""
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.utils import timezone
+from nautobot.core.graphql import execute_query
+from nautobot.dcim.models import (
+    Controller,
+    ControllerManagedDeviceGroup,
+    Device,
+    DeviceType,
+    Location,
+    LocationType,
+    Manufacturer,
+    Platform,
+)
+from nautobot.extras.models import Role, Status
+from nautobot.ipam.models import IPAddress, Namespace, Prefix
+
+from ipa import models, snapshots
+from ipa.choices import CompressionChoices, FingerprintSourceChoices
+
+User = get_user_model()
+
+FINGERPRINTS_QUERY = """
+query {
+  device_fingerprints(platform: "cisco_apic") {
+    target
+    latest_snapshot { collected config fingerprint { fingerprint } }
+  }
+}
+"""
+
+SNAPSHOTS_QUERY = """
+query {
+  config_snapshots(controller: "apic1") {
+    target
+    collected
+    config
+    fingerprint { fingerprint latest_snapshot { collected } }
+  }
+}
+"""
+
+DEVICE_QUERY = """
+query ($device_id: ID!) {
+  device_fingerprints(device: [$device_id]) {
+    target
+    latest_snapshot { config }
+  }
+}
+"""
+
+
+class GraphQLTest(TestCase):
+    """Query fingerprints and snapshots and count the SQL queries run."""
+
+    def setUp(self):
+        self.user = User.objects.create(username="testuser", is_superuser=True)
+        self.store = snapshots.SnapshotStore(compression=CompressionChoices.GZIP)
+        self.now = timezone.now()
+        self.add_devices(3)
+
+    def add_devices(self, count):
+        """Create fingerprints and two snapshots each for devices up to `count` in total."""
+        for index in range(models.DeviceFingerprint.objects.count(), count):
+            target = f"leaf-{index:03}"
+            for days_ago in (2, 1):
+                self.store.save("cisco_apic", "apic1", target, {"hostname": target, "age": days_ago}, self.now)
+                self.now += timedelta(seconds=1)
+            models.DeviceFingerprint.objects.create(
+                platform="cisco_apic",
+                controller="apic1",
+                target=target,
+                source=FingerprintSourceChoices.CONTENT,
+                fingerprint=f"hash-{index}",
+                last_checked=self.now,
+                last_changed=self.now,
+            )
+
+    def execute(self, query, variables=None):
+        """Run `query` and return its data, failing on errors."""
+        result = execute_query(query, variables=variables, user=self.user)
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def assertConstantQueries(self, query):  # pylint: disable=invalid-name
+        """Assert that `query` runs as many SQL queries for 30 devices as for 3, and return its data."""
+        self.execute(query)  # Warm the per-process caches.
+        with self.assertNumQueries(3):
+            self.execute(query)
+        self.add_devices(30)
+        with self.assertNumQueries(3):
+            return self.execute(query)
+
+    def test_fingerprints_with_latest_snapshot(self):
+        data = self.assertConstantQueries(FINGERPRINTS_QUERY)["device_fingerprints"]
+        self.assertEqual(len(data), 30)
+        self.assertEqual(data[0]["target"], "leaf-000")
+        self.assertEqual(data[0]["latest_snapshot"]["config"], {"hostname": "leaf-000", "age": 1})
+        self.assertEqual(data[0]["latest_snapshot"]["fingerprint"], {"fingerprint": "hash-0"})
+
+    def test_snapshots_with_fingerprint(self):
+        data = self.assertConstantQueries(SNAPSHOTS_QUERY)["config_snapshots"]
+        self.assertEqual(len(data), 60)
+        latest, previous = data[:2]
+        self.assertEqual(latest["config"], {"hostname": "leaf-000", "age": 1})
+        self.assertEqual(previous["config"], {"hostname": "leaf-000", "age": 2})
+        self.assertEqual(previous["fingerprint"]["fingerprint"], "hash-0")
+        self.assertEqual(previous["fingerprint"]["latest_snapshot"]["collected"], latest["collected"])
+
+    def create_device(self, name, **kwargs):
+        """Create the device `name` with its location, role, type and status."""
+        content_type = ContentType.objects.get_for_model(Device)
+        status, _ = Status.objects.get_or_create(name="Active")
+        status.content_types.add(
+            content_type,
+            *ContentType.objects.get_for_models(Location, Controller, Prefix, IPAddress).values(),
+        )
+        location_type, _ = LocationType.objects.get_or_create(name="Site")
+        location_type.content_types.add(content_type, ContentType.objects.get_for_model(Controller))
+        role, _ = Role.objects.get_or_create(name="Leaf")
+        role.content_types.add(content_type)
+        location, _ = Location.objects.get_or_create(name="Site 1", location_type=location_type, status=status)
+        device_type, _ = DeviceType.objects.get_or_create(
+            manufacturer=Manufacturer.objects.get_or_create(name="Cisco")[0], model="N9K"
+        )
+        return Device.objects.create(
+            name=name, role=role, status=status, location=location, device_type=device_type, **kwargs
+        )
+
+    def create_ip_address(self, host):
+        """Create the IP address `host` in a prefix of the global namespace."""
+        status = Status.objects.get(name="Active")
+        namespace, _ = Namespace.objects.get_or_create(name="Global")
+        Prefix.objects.get_or_create(prefix="192.0.2.0/24", namespace=namespace, status=status)
+        return IPAddress.objects.create(address=f"{host}/24", namespace=namespace, status=status)
+
+    def add_fingerprint(self, platform, controller, target):
+        """Create the fingerprint and one snapshot of `target`."""
+        self.store.save(platform, controller, target, {"hostname": target}, self.now)
+        models.DeviceFingerprint.objects.create(
+            platform=platform,
+            controller=controller,
+            target=target,
+            source=FingerprintSourceChoices.CONTENT,
+            fingerprint="hash",
+            last_checked=self.now,
+            last_changed=self.now,
+        )
+
+    def test_device_filter(self):
+        device = self.create_device("Leaf 1", serial="leaf-001")
+        data = self.execute(DEVICE_QUERY, {"device_id": str(device.pk)})["device_fingerprints"]
+        self.assertEqual(
+            data, [{"target": "leaf-001", "latest_snapshot": {"config": {"hostname": "leaf-001", "age": 1}}}]
+        )
+
+    def test_device_filter_by_driver_target(self):
+        device = self.create_device("Edge 1")
+        vmanage = Controller.objects.create(
+            name="vmanage1",
+            status=device.status,
+            location=device.location,
+            platform=Platform.objects.create(name="vManage", network_driver="cisco_vmanage"),
+        )
+        device.controller_managed_device_group = ControllerManagedDeviceGroup.objects.create(
+            name="vmanage1 devices", controller=vmanage
+        )
+        device.primary_ip4 = self.create_ip_address("192.0.2.1")
+        device.save()
+        self.add_fingerprint("cisco_vmanage", "vmanage1", "192.0.2.1")
+        data = self.execute(DEVICE_QUERY, {"device_id": str(device.pk)})["device_fingerprints"]
+        self.assertEqual(data, [{"target": "192.0.2.1", "latest_snapshot": {"config": {"hostname": "192.0.2.1"}}}])
+
+    def test_device_filter_by_primary_ip(self):
+        device = self.create_device(
+            "ADC 1", platform=Platform.objects.create(name="NetScaler", network_driver="citrix_netscaler")
+        )
+        device.primary_ip4 = self.create_ip_address("192.0.2.2")
+        device.save()
+        self.add_fingerprint("citrix_netscaler", "192.0.2.2", "192.0.2.2")
+        data = self.execute(DEVICE_QUERY, {"device_id": str(device.pk)})["device_fingerprints"]
+        self.assertEqual(data, [{"target": "192.0.2.2", "latest_snapshot": {"config": {"hostname": "192.0.2.2"}}}])
+
+
+class KeyedRelationTest(TestCase):
+    """Test loading the related objects of a `KeyedRelation`."""
+
+    def setUp(self):
+        store = snapshots.SnapshotStore(compression=CompressionChoices.GZIP)
+        now = timezone.now()
+        self.old, _ = store.save("cisco_apic", "apic1", "101", {"version": 1}, now - timedelta(days=1))
+        self.new, _ = store.save("cisco_apic", "apic1", "101", {"version": 2}, now)
+        store.save("cisco_apic", "apic2", "102", {"version": 1}, now)
+        for controller, target in (("apic1", "101"), ("apic1", "102"), ("apic2", "102")):
+            models.DeviceFingerprint.objects.create(
+                platform="cisco_apic",
+                controller=controller,
+                target=target,
+                source=FingerprintSourceChoices.CONTENT,
+                fingerprint="hash",
+                last_checked=now,
+                last_changed=now,
+            )
+
+    def test_prefetch_matches_whole_keys(self):
+        with self.assertNumQueries(2):
+            fingerprints = list(models.DeviceFingerprint.objects.prefetch_related("latest_snapshot"))
+            latest = {
+                (fingerprint.controller, fingerprint.target): fingerprint.latest_snapshot
+                for fingerprint in fingerprints
+            }
+        # apic1/102 has no snapshot although both apic1 and 102 have one on their own.
+        self.assertEqual(
+            latest, {("apic1", "101"): self.new, ("apic1", "102"): None, ("apic2", "102"): latest[("apic2", "102")]}
+        )
+        self.assertEqual(latest[("apic2", "102")].controller, "apic2")
+
+    def test_lazy_access(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.old.fingerprint.target, "101")
+            self.assertEqual(self.old.fingerprint.controller, "apic1")
+            fingerprint = models.DeviceFingerprint.objects.get(controller="apic1", target="102")
+        with self.assertNumQueries(1):
+            self.assertIsNone(fingerprint.latest_snapshot)
+            self.assertIsNone(fingerprint.latest_snapshot)
@@ -0,0 +1,115 @@
+"""Test the Prometheus metrics of ipa."""
+
+import uuid
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase
+from kombu.exceptions import OperationalError
+from nautobot.extras.choices import JobQueueTypeChoices
+from nautobot.extras.models import JobQueue
+from prometheus_client import REGISTRY
+from redis.exceptions import RedisError
+
+from ipa import backups, metrics
+from ipa.benchmarks.mock_vmanage import MockVManage
+from ipa.collectors.instrumentation import ApiCallRecorder
+from ipa.collectors.pool import SessionPool
+from ipa.collectors.ratelimit import rate_limiter
+from ipa.collectors.vmanage import VManageClient, VManageError, VManageSessionCache
+from ipa.tests.test_backups import FakeDriver
+
+
+def sample(name, **labels):
+    """Return the current value of a sample of the default registry, 0 when it does not exist yet."""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class RequestMetricsTest(TestCase):
+    """Test that controller API calls are observed as they happen."""
+
+    def test_requests_are_observed(self):
+        with MockVManage(devices=3, error_rate=0.5, seed=1) as vmanage:
+            labels = {"platform": "cisco_vmanage", "controller": vmanage.host}
+            client = VManageClient(
+                vmanage.host,
+                "admin",
+                vmanage.password,
+                scheme="http",
+                token_cache=VManageSessionCache(cache=LocMemCache("ipa-test-metrics", {})),
+                pool=SessionPool(),
+                recorder=ApiCallRecorder(),
+            )
+            for device in client.get_devices():
+                try:
+                    client.get_device_config(device["system-ip"])
+                except VManageError:
+                    pass
+            calls = sum(vmanage.stats()["calls"].values())
+            self.assertEqual(sample("ipa_api_request_duration_seconds_count", **labels), calls)
+            self.assertEqual(sample("ipa_rate_limit_wait_seconds_count", **labels), calls)
+            self.assertEqual(sample("ipa_api_request_failures_total", **labels), vmanage.calls["error"])
+            self.assertGreater(sample("ipa_api_response_bytes_total", **labels), 0)
+
+
+class BackupMetricsTest(TestCase):
+    """Test the devices collected and failures counters."""
+
+    def test_devices_are_counted_by_result(self):
+        driver = FakeDriver({"sw1": {"a": 1}, "sw2": {"a": 2}}, revisions={"sw1": "1", "sw2": "1"})
+        driver.host = f"{uuid.uuid4()}.example.com"
+        backups.IncrementalBackup(driver, lambda target, payload: None).run()
+        driver.revisions["sw2"] = "2"
+        backups.IncrementalBackup(driver, lambda target, payload: None).run()
+        labels = {"platform": "fake", "controller": driver.host}
+        self.assertEqual(sample("ipa_devices_collected_total", result="changed", **labels), 3)
+        self.assertEqual(sample("ipa_devices_collected_total", result="skipped", **labels), 1)
+
+    def test_failures_are_counted(self):
+        driver = FakeDriver({"sw1": {"a": 1}})
+        driver.host = f"{uuid.uuid4()}.example.com"
+        with self.assertRaises(KeyError):
+            backups.IncrementalBackup(driver, lambda target, payload: None).run(["missing"])
+        self.assertEqual(sample("ipa_collection_failures_total", platform="fake", controller=driver.host), 1)
+
+
+class ScrapeMetricsTest(TestCase):
+    """Test the metrics generated on every scrape."""
+
+    def test_rate_limit_buckets(self):
+        key = str(uuid.uuid4())
+        rate_limiter.try_acquire("cisco_apic", key)
+        rate_limiter.block("cisco_apic", key, 30)
+        utilization, blocked = metrics.metric_rate_limits()
+        samples = {
+            point.name: point.value
+            for family in (utilization, blocked)
+            for point in family.samples
+            if point.labels["key"] == key
+        }
+        self.assertGreater(samples["ipa_rate_limit_utilization"], 0)
+        self.assertGreater(samples["ipa_rate_limit_blocked_seconds"], 25)
+
+    def test_queue_depth(self):
+        JobQueue.objects.get_or_create(name="ipa-backups", defaults={"queue_type": JobQueueTypeChoices.TYPE_CELERY})
+        (depth,) = metrics.metric_queue_depth()
+        self.assertIn(("ipa-backups", 0), [(point.labels["queue"], point.value) for point in depth.samples])
+
+    def test_unavailable_backends_yield_no_samples(self):
+        with (
+            mock.patch.object(rate_limiter, "usage", side_effect=RedisError("down")),
+            mock.patch.object(metrics, "celery_app") as app,
+            self.assertLogs(metrics.logger, "WARNING"),
+        ):
+            connection = app.connection_for_read.return_value.__enter__.return_value
+            connection.connection_errors = ()
+            connection.ensure_connection.side_effect = OperationalError("down")
+            families = [*metrics.metric_rate_limits(), *metrics.metric_queue_depth()]
+        self.assertEqual(
+            [(family.name, family.samples) for family in families],
+            [
+                ("ipa_rate_limit_utilization", []),
+                ("ipa_rate_limit_blocked_seconds", []),
+                ("ipa_job_queue_depth", []),
+            ],
+        )
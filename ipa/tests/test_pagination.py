@@ -0,0 +1,59 @@
+"""Test the keyset pagination of the ipa REST API."""
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from nautobot.users.models import Token
+from rest_framework.test import APIClient
+
+from ipa.api.pagination import decode_cursor, encode_cursor
+from ipa.models import IpaExampleModel
+
+User = get_user_model()
+
+
+class KeysetPaginationTest(TestCase):
+    """Test walking IpaExampleModel records with a cursor."""
+
+    def setUp(self):
+        user = User.objects.create(username="testuser", is_superuser=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        self.url = reverse("plugins-api:ipa-api:ipaexamplemodel-list")
+        for index in range(7):
+            IpaExampleModel.objects.create(name=f"Model {index}", description="odd" if index % 2 else "even")
+
+    def walk(self, **params):
+        """Return the names of every page requested from the first one, following `next` links."""
+        pages = []
+        response = self.client.get(self.url, {"cursor": "", "limit": 3, **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            pages.append([row["name"] for row in response.data["results"]])
+            if not response.data["next"]:
+                return pages
+            response = self.client.get(response.data["next"])
+
+    def test_pages_follow_the_cursor(self):
+        self.assertEqual(
+            self.walk(),
+            [["Model 0", "Model 1", "Model 2"], ["Model 3", "Model 4", "Model 5"], ["Model 6"]],
+        )
+        self.assertEqual(self.walk(description="odd"), [["Model 1", "Model 3", "Model 5"]])
+
+    def test_pages_skip_the_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {"cursor": encode_cursor(["Model 2", IpaExampleModel.objects.first().pk])})
+        self.assertFalse([query for query in queries if "COUNT(" in query["sql"]])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {"limit": 3})
+        self.assertTrue([query for query in queries if "COUNT(" in query["sql"]])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(decode_cursor(encode_cursor(["a", 1]), 2), ["a", "1"])
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor(["a"]), 2)
+        self.assertEqual(self.client.get(self.url, {"cursor": "garbage"}).status_code, 404)
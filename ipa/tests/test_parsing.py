@@ -0,0 +1,81 @@
+"""Test the incremental JSON and XML parsers."""
+
+import io
+import json
+import tracemalloc
+import unittest
+
+from defusedxml import EntitiesForbidden
+
+from ipa import parsing
+
+DOCUMENT = {
+    "totalCount": "300",
+    "imdata": [{"l1PhysIf": {"attributes": {"id": f"eth1/{port}", "descr": 'uplink "é" \\ ✓'}}} for port in range(300)],
+    "trailer": [1, 2.5, None],
+}
+
+
+def chunked(data, size):
+    """Split `data` into pieces of `size` bytes."""
+    return (data[start : start + size] for start in range(0, len(data), size))
+
+
+class JsonItemParserTest(unittest.TestCase):
+    """Test streaming the items of a top-level JSON array."""
+
+    def test_items_survive_any_chunk_boundary(self):
+        data = json.dumps(DOCUMENT, ensure_ascii=False, indent=1).encode()
+        for size in (1, 3, 17, 4096, len(data)):
+            meta = {}
+            items = list(parsing.iter_json_items(chunked(data, size), "imdata", meta))
+            self.assertEqual(items, DOCUMENT["imdata"])
+            self.assertEqual(meta, {"totalCount": "300", "trailer": [1, 2.5, None]})
+
+    def test_numbers_split_across_chunks(self):
+        self.assertEqual(list(parsing.iter_json_items([b'{"n": [12', b"34, 5", b"6]}"], "n")), [1234, 56])
+
+    def test_non_array_member_goes_to_meta(self):
+        parser = parsing.JsonItemParser("nsconfig")
+        self.assertEqual(parser.feed(b'{"errorcode": 0, "nsconfig": {"ipaddress": "10.0.0.1"}}'), [])
+        parser.close()
+        self.assertFalse(parser.streamed)
+        self.assertEqual(parser.meta["nsconfig"], {"ipaddress": "10.0.0.1"})
+
+    def test_truncated_document_raises(self):
+        data = json.dumps(DOCUMENT).encode()
+        with self.assertRaises(parsing.StreamParseError):
+            list(parsing.iter_json_items(chunked(data[:-40], 1000), "imdata"))
+
+    def test_not_an_object_raises(self):
+        with self.assertRaises(parsing.StreamParseError):
+            list(parsing.iter_json_items([b"<html>"], "imdata"))
+
+    def test_memory_is_bounded_by_one_item(self):
+        item = json.dumps({"topSystem": {"attributes": {"id": "101"}, "children": ["x" * 1000] * 50}})
+        data = ('{"totalCount": "2000", "imdata": [' + ",".join([item] * 2000) + "]}").encode()
+        tracemalloc.start()
+        try:
+            count = sum(1 for _ in parsing.iter_json_items(chunked(data, parsing.CHUNK_SIZE), "imdata"))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(count, 2000)
+        # The 100 MB document never needs more than a few chunks and one decoded item.
+        self.assertLess(peak, 2 * 1024 * 1024)
+
+
+class XmlElementsTest(unittest.TestCase):
+    """Test streaming the children of an XML document root."""
+
+    def test_children_and_root_attributes(self):
+        xml = b'<imdata totalCount="2"><topSystem id="101"><l1PhysIf id="eth1/1"/></topSystem><topSystem id="102"/></imdata>'
+        meta = {}
+        ids = [(element.get("id"), len(element)) for element in parsing.iter_xml_elements(io.BytesIO(xml), meta)]
+        self.assertEqual(ids, [("101", 1), ("102", 0)])
+        self.assertEqual(meta, {"totalCount": "2"})
+
+    def test_entities_are_refused(self):
+        xml = b'<!DOCTYPE imdata [<!ENTITY a "aaaa">]><imdata><topSystem id="&a;"/></imdata>'
+        with self.assertRaises(EntitiesForbidden):
+            list(parsing.iter_xml_elements(io.BytesIO(xml)))
@@ -0,0 +1,201 @@
+"""Test the planning of API backups."""
+
+import uuid
+from collections import Counter
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from nautobot.apps.testing import TransactionTestCase, run_job_for_testing
+from nautobot.dcim.models import (
+    Controller,
+    ControllerManagedDeviceGroup,
+    Device,
+    DeviceType,
+    Location,
+    LocationType,
+    Manufacturer,
+    Platform,
+)
+from nautobot.extras.models import ExternalIntegration, Job, Role, Status
+
+from ipa import jobs, planning
+from ipa.benchmarks.mock_meraki import ORGANIZATION_ID, MockMeraki
+from ipa.benchmarks.mock_vmanage import MockVManage
+from ipa.collectors.apic import ApicFabricCollector
+from ipa.collectors.instrumentation import ApiCallRecorder
+from ipa.collectors.meraki import MerakiOrganizationCollector
+from ipa.collectors.pool import SessionPool
+from ipa.collectors.vmanage import VManageClient, VManageSessionCache
+from ipa.models import ApiCallSummary
+
+
+def recorded_calls(recorder):
+    """Return the `Counter` of `(method, endpoint)` calls recorded by `recorder`."""
+    return Counter({(method, endpoint): call.calls for (_, _, method, endpoint), call in recorder.snapshot().items()})
+
+
+class PlanCallsTest(SimpleTestCase):
+    """Test the calls drivers plan against the calls they make."""
+
+    def test_vmanage_plan_is_exact(self):
+        token_cache = VManageSessionCache(cache=LocMemCache(uuid.uuid4().hex, {}))
+        with MockVManage(devices=4) as mock:
+            options = {"scheme": "http", "token_cache": token_cache, "pool": SessionPool()}
+            client = VManageClient(mock.host, "admin", mock.password, recorder=ApiCallRecorder(), **options)
+            planned = client.plan_calls(None, 4)
+            self.assertEqual(len(dict(client.collect())), 4)
+        self.assertEqual(planned, recorded_calls(client.recorder))
+        # The session is now shared, and the targets are known.
+        self.assertEqual(
+            client.plan_calls(["10.0.0.1", "10.0.0.2"]), Counter({("GET", "/dataservice/device/config"): 2})
+        )
+
+    def test_meraki_plan_bounds_the_listings(self):
+        with MockMeraki(devices=120) as mock:
+            collector = MerakiOrganizationCollector(
+                mock.host,
+                password=mock.api_key,
+                scheme="http",
+                organization_ids=[ORGANIZATION_ID],
+                pool=SessionPool(),
+                recorder=ApiCallRecorder(),
+            )
+            planned = collector.plan_calls(["Q2XX-0000-0001"], 120)
+            dict(collector.collect())
+        recorded = recorded_calls(collector.recorder)
+        self.assertEqual(set(planned), set(recorded))
+        self.assertEqual(planned["GET", "/api/v1/organizations/{id}/switch/ports/bySwitch"], 3)
+        self.assertTrue(all(planned[call] >= count for call, count in recorded.items()))
+
+    def test_apic_pages(self):
+        collector = ApicFabricCollector("apic1", "admin", "admin", page_size=50)
+        self.assertEqual(collector.plan_calls(None, 120)["GET", "/api/class/topSystem.json"], 1 + 3)
+        self.assertEqual(
+            collector.plan_calls([str(101 + node) for node in range(60)])["GET", "/api/class/topSystem.json"], 1 + 2
+        )
+        self.assertEqual(collector.plan_calls([])["GET", "/api/class/topSystem.json"], 1)
+
+
+def create_devices():
+    """Create a vManage managing three devices and a standalone WTI device."""
+    device_content_type = ContentType.objects.get_for_model(Device)
+    status = Status.objects.get_or_create(name="Active")[0]
+    status.content_types.add(
+        device_content_type, ContentType.objects.get_for_model(Location), ContentType.objects.get_for_model(Controller)
+    )
+    location_type = LocationType.objects.create(name="Site")
+    location_type.content_types.add(device_content_type, ContentType.objects.get_for_model(Controller))
+    location = Location.objects.create(name="Site 1", location_type=location_type, status=status)
+    role = Role.objects.create(name="Edge")
+    role.content_types.add(device_content_type)
+    device_type = DeviceType.objects.create(manufacturer=Manufacturer.objects.create(name="Cisco"), model="C8K")
+    controller = Controller.objects.create(
+        name="vmanage1",
+        status=status,
+        location=location,
+        platform=Platform.objects.create(name="vManage", network_driver="cisco_vmanage"),
+        external_integration=ExternalIntegration.objects.create(
+            name="vmanage1", remote_url=f"https://{uuid.uuid4().hex}.example.com"
+        ),
+    )
+    group = ControllerManagedDeviceGroup.objects.create(name="vmanage1 devices", controller=controller)
+    for index in range(3):
+        Device.objects.create(
+            name=f"edge{index}",
+            role=role,
+            status=status,
+            location=location,
+            device_type=device_type,
+            controller_managed_device_group=group,
+        )
+    Device.objects.create(
+        name="pdu1",
+        role=role,
+        status=status,
+        location=location,
+        device_type=device_type,
+        platform=Platform.objects.create(name="WTI", network_driver="wti"),
+    )
+    return controller
+
+
+class PlanCollectionTest(TestCase):
+    """Plan the backup of a vManage and a WTI device from recorded latencies."""
+
+    def setUp(self):
+        self.controller = create_devices()
+        ApiCallSummary.objects.create(
+            platform="cisco_vmanage",
+            controller="elsewhere.example.com",
+            method="GET",
+            endpoint="/dataservice/device/config",
+            calls=10,
+            duration=20.0,
+            last_called=timezone.now(),
+        )
+
+    def test_controller_calls_are_counted_once(self):
+        plan = planning.plan_collection(Device.objects.all())
+        self.assertEqual(len(plan.shards), 1)
+        vmanage, wti = sorted(plan.controllers, key=lambda controller: controller.platform)
+        self.assertEqual(vmanage.controller, self.controller.external_integration.remote_url[8:])
+        self.assertEqual(len(vmanage.devices), 3)
+        # One login, one inventory and a config per device, at the 2s recorded for the platform.
+        self.assertEqual(vmanage.total_calls, 6)
+        self.assertAlmostEqual(vmanage.duration, 12.0)
+        # Five sections and an ETag check at the default latency.
+        self.assertEqual(wti.total_calls, 6)
+        self.assertAlmostEqual(wti.duration, 3.0)
+        summary = plan.as_dict()
+        self.assertEqual((summary["devices"], summary["calls"], summary["duration"]), (4, 12, 15.0))
+
+    def test_shards_run_in_parallel(self):
+        plan = planning.plan_collection(Device.objects.all(), shard_size=3)
+        self.assertEqual(len(plan.shards), 2)
+        self.assertAlmostEqual(plan.duration, 12.0)
+
+    def test_filtered_devices_size_controller_listings(self):
+        plan = planning.plan_collection(Device.objects.filter(name="edge0"))
+        (vmanage,) = plan.controllers
+        # The vManage is backed up as a whole: its three devices are fetched.
+        self.assertEqual(vmanage.calls["GET", "/dataservice/device/config"], 3)
+
+    @override_settings(PLUGINS_CONFIG={"ipa": {"rate_limits": {"default": {"rate": 1, "burst": 2}}}})
+    def test_rate_limit_budget(self):
+        (wti,) = planning.plan_collection(Device.objects.filter(name="pdu1")).controllers
+        self.assertAlmostEqual(wti.throttled, 4.0)
+        self.assertAlmostEqual(wti.duration, 4.0)
+
+    def test_latency_fallbacks(self):
+        history = planning.LatencyHistory(["cisco_vmanage"], default=0.1)
+        self.assertEqual(
+            history.mean("cisco_vmanage", "elsewhere.example.com", "GET", "/dataservice/device/config"), 2.0
+        )
+        self.assertEqual(history.mean("cisco_vmanage", "other", "POST", "/j_security_check"), 2.0)
+        self.assertEqual(history.mean("wti", "pdu1", "HEAD", "/api/v2/config"), 0.1)
+
+
+class BackupPlanJobTest(TransactionTestCase):
+    """Run the plan job with a device filter."""
+
+    def setUp(self):
+        super().setUp()
+        create_devices()
+
+    def run_job(self, **kwargs):
+        """Run the plan job and return the messages it logged."""
+        job = Job.objects.get(module_name=jobs.__name__, job_class_name=jobs.BackupPlan.__name__)
+        job_result = run_job_for_testing(job, **kwargs)
+        return job_result, list(job_result.job_log_entries.values_list("message", flat=True))
+
+    def test_job_plans_filtered_devices(self):
+        job_result, messages = self.run_job(devices=[], device_filter={"name": ["pdu1"]})
+        self.assertEqual(job_result.status, "SUCCESS")
+        self.assertEqual(job_result.result["calls"], 6)
+        self.assertIn("Backing up 1 devices behind 1 controllers takes 6 calls and about 3.0 seconds", messages)
+
+    def test_invalid_filter(self):
+        _, messages = self.run_job(devices=[], device_filter={"status": ["Nonexistent"]})
+        self.assertTrue(any(message.startswith("Invalid device filter") for message in messages))
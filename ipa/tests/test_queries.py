@@ -0,0 +1,66 @@
+"""Test the compiled JMESPath query cache."""
+
+import unittest
+
+from jmespath.exceptions import ParseError
+
+from ipa import queries
+
+DOCUMENT = {
+    "hostname": "leaf-101",
+    "interfaces": [{"name": "eth1/1", "mtu": 9216, "enabled": True}, {"name": "eth1/2", "mtu": 1500, "enabled": False}],
+}
+
+
+class CompileCacheTest(unittest.TestCase):
+    """Test that expressions are parsed once."""
+
+    def test_expressions_are_compiled_once(self):
+        queries.compile_expression.cache_clear()
+        for _ in range(100):
+            self.assertEqual(queries.search("interfaces[?enabled].name", DOCUMENT), ["eth1/1"])
+        info = queries.compile_expression.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 99))
+
+
+class QueryBatchTest(unittest.TestCase):
+    """Test evaluating many expressions in one pass."""
+
+    def test_batch_matches_individual_searches(self):
+        expressions = {
+            "hostname": "hostname",
+            "jumbo": "interfaces[?mtu > `1500`].name",
+            "interface count": "length(interfaces)",
+        }
+        batch = queries.QueryBatch(expressions)
+        self.assertEqual(
+            batch.search(DOCUMENT),
+            {name: queries.search(expression, DOCUMENT) for name, expression in expressions.items()},
+        )
+
+    def test_batch_of_null_document(self):
+        self.assertEqual(queries.QueryBatch({"a": "a", "b": "b.c"}).search(None), {"a": None, "b": None})
+
+    def test_empty_batch(self):
+        self.assertEqual(queries.QueryBatch({}).search(DOCUMENT), {})
+
+
+class QueryRegistryTest(unittest.TestCase):
+    """Test named expressions."""
+
+    def setUp(self):
+        self.registry = queries.QueryRegistry()
+        self.registry.register("test.hostname", "hostname")
+        self.registry.register("test.mtus", "interfaces[].mtu")
+
+    def test_search_and_batch(self):
+        self.assertEqual(self.registry.search("test.hostname", DOCUMENT), "leaf-101")
+        self.assertEqual(
+            self.registry.batch(self.registry.names("test.")).search(DOCUMENT),
+            {"test.hostname": "leaf-101", "test.mtus": [9216, 1500]},
+        )
+
+    def test_invalid_expression_fails_on_register(self):
+        with self.assertRaises(ParseError):
+            self.registry.register("test.broken", "interfaces[?")
+        self.assertNotIn("test.broken", self.registry.names())
@@ -0,0 +1,73 @@
+"""Test that the IpaExampleModel views run a constant number of queries, however many rows they render."""
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from nautobot.extras.models import Tag
+from nautobot.users.models import ObjectPermission, Token
+from rest_framework.test import APIClient
+
+from ipa.models import IpaExampleModel
+
+User = get_user_model()
+
+
+class QueryCountTest(TestCase):
+    """Compare the queries of every view rendering few and many rows."""
+
+    def setUp(self):
+        content_type = ContentType.objects.get_for_model(IpaExampleModel)
+        self.tags = [Tag.objects.create(name=f"Tag {index}") for index in range(5)]
+        for tag in self.tags:
+            tag.content_types.add(content_type)
+        # A constrained permission, checked for every row by the action buttons of the table.
+        self.user = User.objects.create(username="testuser")
+        permission = ObjectPermission.objects.create(
+            name="ipa", actions=["view", "change", "delete"], constraints={"name__startswith": "Model"}
+        )
+        permission.object_types.add(content_type)
+        permission.users.add(self.user)
+        self.client.force_login(self.user)
+        self.api_client = APIClient()
+        self.api_client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+        self.add_models(3)
+
+    def add_models(self, count):
+        """Create tagged models up to `count` in total."""
+        for index in range(IpaExampleModel.objects.count(), count):
+            IpaExampleModel.objects.create(name=f"Model {index:03}").tags.set(self.tags[: index % 3 + 1])
+
+    def count_queries(self, client, url, params=None):
+        """Request `url` and return the number of queries it ran."""
+        client.get(url, params)  # Warm the per-process caches of content types, custom fields and the like.
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get(url, params).status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, client, url, params=None):  # pylint: disable=invalid-name
+        """Assert that `url` runs as many queries with 50 models as with 3."""
+        budget = self.count_queries(client, url, params)
+        self.add_models(50)
+        with self.assertNumQueries(budget):
+            self.assertEqual(client.get(url, params).status_code, 200)
+
+    def test_ui_list(self):
+        self.assertConstantQueries(self.client, reverse("plugins:ipa:ipaexamplemodel_list"), {"per_page": 100})
+
+    def test_ui_detail(self):
+        model = IpaExampleModel.objects.first()
+        budget = self.count_queries(self.client, model.get_absolute_url())
+        model.tags.set(self.tags)
+        with self.assertNumQueries(budget):
+            self.client.get(model.get_absolute_url())
+
+    def test_api_list(self):
+        url = reverse("plugins-api:ipa-api:ipaexamplemodel-list")
+        self.assertConstantQueries(self.api_client, url, {"limit": 100})
+
+    def test_api_nested_list(self):
+        url = reverse("plugins-api:ipa-api:ipaexamplemodel-list")
+        self.assertConstantQueries(self.api_client, url, {"limit": 100, "depth": 1})
@@ -0,0 +1,217 @@
+"""Test the backup job sharded by controller."""
+
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import SimpleTestCase, override_settings
+from nautobot.apps.testing import TransactionTestCase, run_job_for_testing
+from nautobot.dcim.models import (
+    Controller,
+    ControllerManagedDeviceGroup,
+    Device,
+    DeviceType,
+    Location,
+    LocationType,
+    Manufacturer,
+    Platform,
+)
+from nautobot.extras.choices import JobResultStatusChoices
+from nautobot.extras.models import ExternalIntegration, Job, JobResult, Role, Status
+
+from ipa import checkpoints, jobs, models, sharding
+from ipa.collectors.base import BaseDriver
+
+PLUGINS_CONFIG = {"ipa": {"drivers": {"fake_api": "ipa.tests.test_sharding.FakeApiDriver"}}}
+
+
+class FakeApiDriver(BaseDriver):
+    """Driver serving a configuration naming its controller, failing for `down.example.com`."""
+
+    platform = "fake_api"
+    controllers = {}
+
+    def collect(self, targets=None):
+        """Yield a configuration for each target, or for the controller itself."""
+        if self.host == "down.example.com":
+            raise ConnectionError("unreachable")
+        self.controllers[self.host] = (targets, self.username, self.password, self.timeout)
+        for target in [self.host] if targets is None else targets:
+            yield target, {"controller": self.host, "target": target}
+
+
+def fake_device(pk, controller=None):
+    """Return a stand-in device, managed by the controller with primary key `controller` if any."""
+    group = SimpleNamespace(controller=SimpleNamespace(pk=controller)) if controller else None
+    return SimpleNamespace(pk=pk, controller_managed_device_group=group)
+
+
+class PlanShardsTest(SimpleTestCase):
+    """Test the packing of controllers into shards."""
+
+    def test_controllers_are_never_split(self):
+        devices = [fake_device(f"big-{index}", "big") for index in range(5)]
+        devices += [fake_device(f"small-{index}", "small") for index in range(2)]
+        devices += [fake_device(f"single-{index}") for index in range(3)]
+        shards = sharding.plan_shards(devices, shard_size=3)
+        self.assertEqual(len(shards), 3)
+        self.assertEqual(shards[0], [f"big-{index}" for index in range(5)])
+        self.assertEqual(sorted(pk for shard in shards[1:] for pk in shard)[:2], ["single-0", "single-1"])
+        self.assertTrue(any(shard[:2] == ["small-0", "small-1"] for shard in shards[1:]))
+        self.assertTrue(all(len(shard) <= 3 for shard in shards[1:]))
+
+    def test_no_devices(self):
+        self.assertEqual(sharding.plan_shards([], shard_size=10), [])
+
+
+@override_settings(PLUGINS_CONFIG=PLUGINS_CONFIG)
+class ShardedBackupTest(TransactionTestCase):
+    """Back up devices behind fake controllers and standalone fake devices.
+
+    Job logs are written through a second connection, which only sees committed job results.
+    """
+
+    def setUp(self):
+        super().setUp()
+        FakeApiDriver.controllers.clear()
+        device_content_type = ContentType.objects.get_for_model(Device)
+        status = Status.objects.get(name="Active")
+        status.content_types.add(
+            device_content_type,
+            ContentType.objects.get_for_model(Location),
+            ContentType.objects.get_for_model(Controller),
+        )
+        location_type = LocationType.objects.create(name="Site")
+        location_type.content_types.add(device_content_type, ContentType.objects.get_for_model(Controller))
+        location = Location.objects.create(name="Site 1", location_type=location_type, status=status)
+        role = Role.objects.create(name="Switch")
+        role.content_types.add(device_content_type)
+        device_type = DeviceType.objects.create(manufacturer=Manufacturer.objects.create(name="Fake"), model="F1")
+        self.platform = Platform.objects.create(name="Fake API", network_driver="fake_api")
+
+        def create_device(name, group=None, platform=None):
+            return Device.objects.create(
+                name=name,
+                role=role,
+                status=status,
+                location=location,
+                device_type=device_type,
+                platform=platform,
+                controller_managed_device_group=group,
+            )
+
+        for host in ("ctrl1.example.com", "down.example.com"):
+            controller = Controller.objects.create(
+                name=host.split(".", maxsplit=1)[0],
+                status=status,
+                location=location,
+                platform=self.platform,
+                external_integration=ExternalIntegration.objects.create(
+                    name=host, remote_url=f"https://{host}", timeout=15
+                ),
+            )
+            group = ControllerManagedDeviceGroup.objects.create(name=f"{host} devices", controller=controller)
+            for index in range(3):
+                create_device(f"{controller.name}-sw{index}", group=group)
+        create_device("appliance1", platform=self.platform)
+        create_device("unmanaged")
+
+    def test_backup_devices(self):
+        self.assertEqual(sharding.backup_devices().count(), 7)
+
+    def test_collect_shard(self):
+        pks = [str(pk) for pk in Device.objects.exclude(name="unmanaged").values_list("pk", flat=True)]
+        job_result = JobResult.objects.create(name="backup")
+        results = sharding.collect_shard(pks, "2026-01-01T00:00:00+00:00", str(job_result.pk))
+        by_controller = {result["controller"]: result for result in results}
+        self.assertEqual(by_controller["ctrl1.example.com"]["changed"], ["ctrl1-sw0", "ctrl1-sw1", "ctrl1-sw2"])
+        self.assertEqual(by_controller["appliance1"]["changed"], ["appliance1"])
+        self.assertEqual(by_controller["down.example.com"]["error"], "ConnectionError: unreachable")
+        self.assertEqual(
+            FakeApiDriver.controllers,
+            {
+                "ctrl1.example.com": (["ctrl1-sw0", "ctrl1-sw1", "ctrl1-sw2"], None, None, 15),
+                "appliance1": (None, None, None, 60),
+            },
+        )
+        self.assertEqual(models.ConfigSnapshot.objects.filter(controller="ctrl1.example.com").count(), 3)
+        self.assertEqual(sharding.merge_results([results[:1], results[1:]])["failed"], 1)
+        checkpointed = models.CollectionCheckpoint.objects.filter(job_result=job_result)
+        self.assertEqual(
+            sorted(checkpointed.values_list("device__name", flat=True)),
+            ["appliance1", "ctrl1-sw0", "ctrl1-sw1", "ctrl1-sw2"],
+        )
+
+    def test_checkpoints_are_batched(self):
+        checkpointer = checkpoints.Checkpointer(JobResult.objects.create(name="backup"), batch_size=2)
+        progress = checkpointer.for_targets(Device.objects.all(), lambda device: device.name)
+        progress(["ctrl1-sw0"])
+        self.assertEqual(models.CollectionCheckpoint.objects.count(), 0)
+        progress(["ctrl1-sw1", "ctrl1-sw2", "unknown"])
+        self.assertEqual(models.CollectionCheckpoint.objects.count(), 3)
+        checkpointer.add([Device.objects.get(name="appliance1").pk])
+        checkpointer.flush()
+        self.assertEqual(models.CollectionCheckpoint.objects.count(), 4)
+        self.assertIsNone(checkpoints.Checkpointer(None).add([Device.objects.first().pk]))
+
+    def run_job(self, devices, resume=False, queue="ipa-backups"):
+        """Run the backup job for `devices` in shards of at most 3 devices and return its result."""
+        job = Job.objects.get(module_name=jobs.__name__, job_class_name=jobs.ShardedBackup.__name__)
+        settings = {"ipa": {**PLUGINS_CONFIG["ipa"], "collection_shards": {"shard_size": 3, "queue": queue}}}
+        with override_settings(PLUGINS_CONFIG=settings):
+            return run_job_for_testing(job, devices=[str(device.pk) for device in devices], force=False, resume=resume)
+
+    def test_job_merges_shards(self):
+        job_result = self.run_job(Device.objects.exclude(controller_managed_device_group__name__startswith="down"))
+        self.assertEqual(job_result.status, "SUCCESS")
+        self.assertEqual(job_result.result, {"controllers": 2, "changed": 4, "skipped": 0, "unchanged": 0, "failed": 0})
+        self.assertTrue(job_result.job_log_entries.filter(message="Backing up 4 devices in 2 shards").exists())
+        self.assertEqual(models.DeviceFingerprint.objects.count(), 4)
+
+    def test_job_reports_failed_controllers(self):
+        job_result = self.run_job([])
+        messages = list(job_result.job_log_entries.values_list("message", flat=True))
+        self.assertIn("Backing up 7 devices in 3 shards", messages)
+        self.assertIn("Backup of down.example.com failed: ConnectionError: unreachable", messages)
+        self.assertIn("1 of 3 controllers failed", messages)
+        self.assertEqual(models.DeviceFingerprint.objects.count(), 4)
+
+    def test_job_refuses_to_queue_shards_behind_itself(self):
+        with mock.patch.object(jobs, "current_app") as app:
+            app.conf.task_default_queue, app.conf.task_always_eager = "default", False
+            job_result = self.run_job([], queue=None)
+        messages = list(job_result.job_log_entries.values_list("message", flat=True))
+        self.assertTrue(any(message.startswith("Shards would be queued behind this job") for message in messages))
+        self.assertEqual(models.DeviceFingerprint.objects.count(), 0)
+
+    def test_job_resumes_unfinished_devices(self):
+        first = self.run_job([])
+        self.assertEqual(models.CollectionCheckpoint.objects.filter(job_result=first).count(), 4)
+        FakeApiDriver.controllers.clear()
+        job_result = self.run_job([], resume=True)
+        messages = list(job_result.job_log_entries.values_list("message", flat=True))
+        self.assertIn(f"Resuming {first}, where 4 devices were backed up", messages)
+        self.assertIn("Backing up 3 devices in 1 shards", messages)
+        # Only the failed controller was contacted again.
+        self.assertEqual(FakeApiDriver.controllers, {})
+        self.assertEqual(models.CollectionCheckpoint.objects.filter(job_result=job_result).count(), 4)
+
+    def test_resume_skips_runs_in_progress(self):
+        first = self.run_job([])
+        first.status = JobResultStatusChoices.STATUS_STARTED
+        first.save()
+        job_result = self.run_job([], resume=True)
+        self.assertNotEqual(job_result.status, JobResultStatusChoices.STATUS_SUCCESS)
+        self.assertTrue(
+            job_result.job_log_entries.filter(message=f"{first} is still running: resume once it has finished").exists()
+        )
+        self.assertEqual(models.CollectionCheckpoint.objects.filter(job_result=job_result).count(), 0)
+
+    def test_resume_after_success_backs_up_every_device(self):
+        self.run_job(Device.objects.filter(name="appliance1"))
+        job_result = self.run_job(Device.objects.filter(name="appliance1"), resume=True)
+        self.assertEqual(job_result.result["changed"], 0)
+        self.assertEqual(job_result.result["unchanged"], 1)
+        self.assertTrue(
+            job_result.job_log_entries.filter(message="The last run finished, backing up every device").exists()
+        )
@@ -0,0 +1,64 @@
+"""Test the content-addressed configuration snapshot store."""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ipa import backups, models, snapshots
+from ipa.choices import CompressionChoices
+
+CONFIG = {"hostname": "leaf-101", "interfaces": [{"name": f"eth1/{port}", "mtu": 9216} for port in range(48)]}
+
+
+class SnapshotStoreTest(TestCase):
+    """Test deduplication, compression and point-in-time reads."""
+
+    def setUp(self):
+        self.store = snapshots.SnapshotStore(compression=CompressionChoices.GZIP)
+        self.now = timezone.now()
+
+    def save(self, target, payload, days_ago=0):
+        """Save a snapshot collected `days_ago` days ago."""
+        return self.store.save("cisco_apic", "apic1", target, payload, self.now - timedelta(days=days_ago))
+
+    def test_identical_configs_share_one_blob(self):
+        for target in ("101", "102", "103"):
+            self.save(target, CONFIG)
+        self.assertEqual(models.ConfigBlob.objects.count(), 1)
+        self.assertEqual(models.ConfigSnapshot.objects.count(), 3)
+
+    def test_unchanged_runs_do_not_add_snapshots(self):
+        for days_ago in (3, 2, 1):
+            _, created = self.save("101", CONFIG, days_ago)
+        self.assertFalse(created)
+        self.save("101", {**CONFIG, "hostname": "leaf-101-new"})
+        self.assertEqual(models.ConfigSnapshot.objects.count(), 2)
+        self.assertEqual(models.ConfigBlob.objects.count(), 2)
+
+    def test_blobs_are_compressed(self):
+        snapshot, _ = self.save("101", CONFIG)
+        blob = models.ConfigBlob.objects.get(pk=snapshot.blob_id)
+        self.assertEqual(blob.digest, backups.content_hash(CONFIG))
+        self.assertLess(len(blob.data), blob.size / 5)
+
+    def test_point_in_time_reads(self):
+        self.save("101", {"hostname": "old"}, days_ago=10)
+        self.save("101", {"hostname": "new"}, days_ago=2)
+        with self.assertNumQueries(1):
+            snapshot = self.store.at("cisco_apic", "apic1", "101", self.now - timedelta(days=5))
+            self.assertEqual(self.store.load(snapshot), {"hostname": "old"})
+        self.assertEqual(self.store.load(self.store.at("cisco_apic", "apic1", "101", self.now)), {"hostname": "new"})
+        self.assertIsNone(self.store.at("cisco_apic", "apic1", "101", self.now - timedelta(days=30)))
+
+    @override_settings(PLUGINS_CONFIG={"ipa": {"snapshot_compression": "zstd"}})
+    def test_zstd_falls_back_to_gzip(self):
+        with mock.patch.object(snapshots, "zstandard", None), self.assertLogs(snapshots.logger, "WARNING"):
+            self.assertEqual(snapshots.SnapshotStore().compression, CompressionChoices.GZIP)
+
+    def test_writer_records_backups(self):
+        driver = mock.Mock(platform="cisco_apic", host="apic1")
+        write = self.store.writer(driver, self.now)
+        write("101", CONFIG)
+        self.assertEqual(self.store.load(self.store.history("cisco_apic", "apic1", "101").get()), CONFIG)
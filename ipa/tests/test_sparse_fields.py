@@ -0,0 +1,52 @@
+"""Test the sparse fieldsets of the ipa REST API."""
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from nautobot.users.models import Token
+from rest_framework.test import APIClient
+
+from ipa.models import IpaExampleModel
+
+User = get_user_model()
+
+
+class SparseFieldsTest(TestCase):
+    """Test limiting IpaExampleModel responses to some fields."""
+
+    def setUp(self):
+        user = User.objects.create(username="testuser", is_superuser=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        self.url = reverse("plugins-api:ipa-api:ipaexamplemodel-list")
+        self.model = IpaExampleModel.objects.create(name="Model 1", description="first")
+        IpaExampleModel.objects.create(name="Model 2")
+
+    def test_lean_list(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {"fields": "id,name"})
+        self.assertEqual(response.status_code, 200)
+        selects = [query["sql"] for query in queries if 'FROM "ipa_ipaexamplemodel"' in query["sql"]]
+        self.assertIn('SELECT "ipa_ipaexamplemodel"."id", "ipa_ipaexamplemodel"."name" FROM', selects[-1])
+        self.assertEqual(response.json()["results"][0], {"id": str(self.model.pk), "name": "Model 1"})
+        response = self.client.get(self.url, {"fields": "name", "cursor": "", "limit": 1})
+        self.assertEqual(response.json()["results"], [{"name": "Model 1"}])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.json()["results"], [{"name": "Model 2"}])
+
+    def test_serialized_fields(self):
+        response = self.client.get(self.url, {"fields": "name,tags,url"})
+        self.assertEqual(set(response.json()["results"][0]), {"name", "tags", "url"})
+        response = self.client.get(
+            reverse("plugins-api:ipa-api:ipaexamplemodel-detail", args=[self.model.pk]),
+            {"exclude": "tags,custom_fields"},
+        )
+        self.assertNotIn("tags", response.json())
+        self.assertEqual(response.json()["description"], "first")
+
+    def test_unknown_fields(self):
+        response = self.client.get(self.url, {"fields": "name,nope"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("nope", str(response.data["fields"]))
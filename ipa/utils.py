@@ -0,0 +1,54 @@
+"""Utility functions for ipa."""
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+
+
+def get_app_setting(name):
+    """Return an ipa setting from `PLUGINS_CONFIG`, falling back to `IpaConfig.default_settings`.
+
+    Dictionary settings are merged over their defaults, so overriding a single key keeps the others.
+    """
+    default = apps.get_app_config("ipa").default_settings.get(name)
+    value = settings.PLUGINS_CONFIG.get("ipa", {}).get(name, default)
+    if isinstance(default, dict) and isinstance(value, dict):
+        return {**default, **value}
+    return value
+
+
+def bulk_upsert(model, instances, unique_fields, update_fields):
+    """Insert `instances` of `model`, updating the `update_fields` of those whose `unique_fields` are already stored.
+
+    Databases accepting a conflict target run a single `INSERT ... ON CONFLICT (...) DO UPDATE`.
+    MySQL and MariaDB reject one, so there the stored rows are looked up and updated with
+    `bulk_update()`, and the others inserted, leaving out any row a concurrent writer inserted first.
+    """
+    if not instances:
+        return
+    if connections[router.db_for_write(model)].features.supports_update_conflicts_with_target:
+        model.objects.bulk_create(
+            instances, update_conflicts=True, unique_fields=unique_fields, update_fields=update_fields
+        )
+        return
+    condition = Q()
+    for instance in instances:
+        condition |= Q(**{name: getattr(instance, name) for name in unique_fields})
+    stored = {tuple(row[1:]): row[0] for row in model.objects.filter(condition).values_list("pk", *unique_fields)}
+    updates, inserts = [], []
+    for instance in instances:
+        pk = stored.get(tuple(getattr(instance, name) for name in unique_fields))
+        if pk is None:
+            inserts.append(instance)
+        else:
+            instance.pk = pk
+            updates.append(instance)
+    # bulk_update() does not stamp `auto_now` fields as bulk_create() does.
+    for name in update_fields:
+        field = model._meta.get_field(name)  # pylint: disable=protected-access
+        if getattr(field, "auto_now", False):
+            for instance in updates:
+                field.pre_save(instance, add=False)
+    model.objects.bulk_update(updates, update_fields)
+    model.objects.bulk_create(inserts, ignore_conflicts=True)
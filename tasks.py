@@ -849,6 +849,38 @@ def unittest_coverage(context):
     run_command(context, command)
 
 
+@task(
+    help={
+        "collectors": "Comma-separated collectors to benchmark. (default: all of apic, meraki, netscaler, vmanage)",
+        "devices": "Comma-separated device counts to benchmark each collector with. (default: 100,1000)",
+        "latency": "Seconds added to every mock controller response. (default: 0.005)",
+        "error_rate": "Share of mock controller responses that are errors, from 0 to 1. (default: 0)",
+        "output": "Write the results as JSON to this file.",
+        "baseline": "Compare against this results file and fail on throughput or memory regressions.",
+    }
+)
+def benchmark(  # noqa: PLR0913
+    context,
+    collectors="",
+    devices="100,1000",
+    latency=0.005,
+    error_rate=0.0,
+    output="",
+    baseline="",
+):
+    """Benchmark the collectors at scale against local mock controllers."""
+    command = f"python -m ipa.benchmarks --devices {devices.replace(',', ' ')} --latency {latency}"
+    command += f" --error-rate {error_rate}"
+    if collectors:
+        command += f" --collectors {collectors.replace(',', ' ')}"
+    if output:
+        command += f" --output {output}"
+    if baseline:
+        command += f" --baseline {baseline}"
+
+    run_command(context, command)
+
+
 @task(
     help={
         "failfast": "fail as soon as a single test fails don't run the entire test suite. (default: False)",